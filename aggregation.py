@@ -0,0 +1,346 @@
+import argparse
+import bisect
+import json
+import os
+import sys
+from dataclasses import asdict, dataclass, field
+from typing import IO, Any, Dict, Iterable, List, Optional, Sequence
+
+from homework import InfoMessage, PackageError, read_package
+
+DAY = 86400
+WEEK = 7 * DAY
+# 1970-01-01 — четверг; недели начинаются с понедельника 1970-01-05.
+WEEK_OFFSET = 4 * DAY
+WINDOWS = {'day': (DAY, 0), 'week': (WEEK, WEEK_OFFSET)}
+
+
+@dataclass
+class Stats:
+    """
+    Класс. Накопленные показатели группы тренировок.
+
+    При устаревании окна итоги серии пересчитываются
+    по оставшимся окнам.
+
+    Атрибуты
+    --------
+    count: int
+        количество тренировок
+    duration, distance, speed, calories: float
+        суммы показателей
+    max_distance, max_speed, max_calories: Optional[float]
+        максимумы показателей
+    """
+
+    count: int = 0
+    duration: float = 0.0
+    distance: float = 0.0
+    speed: float = 0.0
+    calories: float = 0.0
+    max_distance: Optional[float] = None
+    max_speed: Optional[float] = None
+    max_calories: Optional[float] = None
+
+    def add(self, info: InfoMessage) -> None:
+        """Учесть одну тренировку."""
+        self.count += 1
+        self.duration += info.duration
+        self.distance += info.distance
+        self.speed += info.speed
+        self.calories += info.calories
+        self.max_distance = _max(self.max_distance, info.distance)
+        self.max_speed = _max(self.max_speed, info.speed)
+        self.max_calories = _max(self.max_calories, info.calories)
+
+    def merge(self, other: 'Stats') -> None:
+        """Прибавить показатели другой группы."""
+        self.count += other.count
+        self.duration += other.duration
+        self.distance += other.distance
+        self.speed += other.speed
+        self.calories += other.calories
+        self.max_distance = _max(self.max_distance, other.max_distance)
+        self.max_speed = _max(self.max_speed, other.max_speed)
+        self.max_calories = _max(self.max_calories, other.max_calories)
+
+    @property
+    def mean_distance(self) -> float:
+        return self.distance / self.count if self.count else 0.0
+
+    @property
+    def mean_speed(self) -> float:
+        return self.speed / self.count if self.count else 0.0
+
+    @property
+    def mean_calories(self) -> float:
+        return self.calories / self.count if self.count else 0.0
+
+
+def _max(current: Optional[float], value: Optional[float]) -> Optional[float]:
+    if value is None:
+        return current
+    if current is None or value > current:
+        return value
+    return current
+
+
+@dataclass
+class _Series:
+    """Окна одного пользователя и вида тренировки плюс суммы по ним."""
+
+    starts: List[float] = field(default_factory=list)
+    buckets: Dict[float, Stats] = field(default_factory=dict)
+    totals: Stats = field(default_factory=Stats)
+
+
+class Aggregator:
+    """
+    Класс. Инкрементальные итоги тренировок по пользователям.
+
+    Каждая тренировка учитывается один раз: в окне (день или неделя)
+    и в скользящих суммах по пользователю и виду тренировки.
+    Обновление — O(1): поиск окна по словарю и прибавление сумм.
+    Хранятся окна за последние retention дней (недель) от самого
+    нового окна серии или от момента, переданного в advance();
+    итоги серии после этого складываются заново из оставшихся
+    окон, так что ошибки округления не накапливаются. Серии
+    и пользователи, у которых не осталось окон, удаляются.
+
+    Атрибуты
+    --------
+    window: str
+        'day' или 'week'
+    retention: int
+        сколько последних окон хранить
+    late: int
+        количество тренировок, пришедших в уже выброшенное окно
+
+    Методы
+    ------
+    add(self, user_id, timestamp, info) -> None:
+        Учесть тренировку.
+    advance(self, timestamp) -> None:
+        Выбросить окна, устаревшие к моменту timestamp.
+    totals(self, user_id, training_type=None) -> Stats:
+        Итоги пользователя за хранимые окна.
+    bucket(self, user_id, training_type, timestamp) -> Optional[Stats]:
+        Показатели окна, в которое попадает timestamp.
+    snapshot(self) -> Dict[str, Any]:
+        Состояние в виде JSON-совместимого словаря.
+    """
+
+    def __init__(self, window: str = 'day', retention: int = 7) -> None:
+        if window not in WINDOWS:
+            raise ValueError(f'Окно должно быть одним из {", ".join(WINDOWS)}')
+        if retention <= 0:
+            raise ValueError('retention должен быть положительным')
+        self.window = window
+        self.retention = retention
+        self.late = 0
+        self._size, self._offset = WINDOWS[window]
+        self._users: Dict[str, Dict[str, _Series]] = {}
+
+    def window_start(self, timestamp: float) -> float:
+        """Начало окна (UTC, секунды эпохи), в которое попадает timestamp."""
+        return ((timestamp - self._offset) // self._size * self._size
+                + self._offset)
+
+    def add(self, user_id: str, timestamp: float, info: InfoMessage) -> None:
+        """Учесть тренировку info пользователя user_id в момент timestamp."""
+        kinds = self._users.get(user_id)
+        if kinds is None:
+            kinds = self._users[user_id] = {}
+        series = kinds.get(info.training_type)
+        if series is None:
+            series = kinds[info.training_type] = _Series()
+        start = self.window_start(timestamp)
+        bucket = series.buckets.get(start)
+        if bucket is None:
+            if series.starts and start < self._cutoff(series.starts[-1]):
+                self.late += 1
+                return
+            bucket = series.buckets[start] = Stats()
+            if not series.starts or start > series.starts[-1]:
+                series.starts.append(start)
+                self._expire(series, self._cutoff(start))
+            else:
+                bisect.insort(series.starts, start)
+        bucket.add(info)
+        series.totals.add(info)
+
+    def _cutoff(self, newest_start: float) -> float:
+        """Начало самого старого хранимого окна."""
+        return newest_start - (self.retention - 1) * self._size
+
+    def advance(self, timestamp: float) -> None:
+        """Выбросить у всех пользователей окна, устаревшие к timestamp."""
+        cutoff = self._cutoff(self.window_start(timestamp))
+        for user in list(self._users):
+            kinds = self._users[user]
+            for kind in list(kinds):
+                self._expire(kinds[kind], cutoff)
+                if not kinds[kind].starts:
+                    del kinds[kind]
+            if not kinds:
+                del self._users[user]
+
+    def _expire(self, series: _Series, cutoff: float) -> None:
+        """Выбросить окна раньше cutoff и пересчитать итоги серии."""
+        expired = bisect.bisect_left(series.starts, cutoff)
+        if not expired:
+            return
+        for start in series.starts[:expired]:
+            del series.buckets[start]
+        del series.starts[:expired]
+        totals = Stats()
+        for start in series.starts:
+            totals.merge(series.buckets[start])
+        series.totals = totals
+
+    def totals(self,
+               user_id: str,
+               training_type: Optional[str] = None) -> Stats:
+        """Итоги пользователя за хранимые окна.
+
+        Параметры
+        ---------
+        user_id: str
+            пользователь
+        training_type: str
+            имя класса тренировки ('Running', 'SportsWalking',
+            'Swimming'); None — по всем видам
+        """
+
+        result = Stats()
+        for kind, series in self._users.get(user_id, {}).items():
+            if training_type in (None, kind):
+                result.merge(series.totals)
+        return result
+
+    def bucket(self,
+               user_id: str,
+               training_type: str,
+               timestamp: float) -> Optional[Stats]:
+        """Показатели окна, в которое попадает timestamp, или None."""
+        series = self._users.get(user_id, {}).get(training_type)
+        if series is None:
+            return None
+        return series.buckets.get(self.window_start(timestamp))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Состояние агрегатора в виде JSON-совместимого словаря."""
+        return {
+            'window': self.window,
+            'retention': self.retention,
+            'late': self.late,
+            'series': [
+                {'user_id': user, 'training_type': kind,
+                 'totals': asdict(series.totals),
+                 'buckets': [[start, asdict(series.buckets[start])]
+                             for start in series.starts]}
+                for user, kinds in self._users.items()
+                for kind, series in kinds.items()
+            ],
+        }
+
+    @classmethod
+    def from_snapshot(cls, state: Dict[str, Any]) -> 'Aggregator':
+        """Восстановить агрегатор из snapshot() без повторного чтения."""
+        aggregator = cls(state['window'], state['retention'])
+        aggregator.late = state['late']
+        for item in state['series']:
+            if not item['buckets']:
+                continue
+            series = _Series(totals=Stats(**item['totals']))
+            for start, values in item['buckets']:
+                series.starts.append(start)
+                series.buckets[start] = Stats(**values)
+            kinds = aggregator._users.setdefault(item['user_id'], {})
+            kinds[item['training_type']] = series
+        return aggregator
+
+    def dump(self, path: str) -> None:
+        """Сохранить snapshot() в JSON-файл."""
+        with open(path, 'w', encoding='utf-8') as output:
+            json.dump(self.snapshot(), output)
+
+    @classmethod
+    def load(cls, path: str) -> 'Aggregator':
+        """Прочитать агрегатор из JSON-файла, записанного dump()."""
+        with open(path, encoding='utf-8') as source:
+            return cls.from_snapshot(json.load(source))
+
+
+def aggregate_lines(aggregator: Aggregator, lines: Iterable[str]) -> int:
+    """Учесть тренировки из строк JSON Lines.
+
+    Строка — объект {"user_id", "timestamp", "workout_type", "data"};
+    пакеты, на которых read_package бросает PackageError (в том числе
+    с неположительной длительностью), и пакеты, на которых расчёт
+    бросает ArithmeticError, пропускаются.
+
+    Возвращаемое значение
+    ---------------------
+    Количество пропущенных пакетов: int
+    """
+
+    skipped = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        event = json.loads(line)
+        try:
+            info = read_package(event['workout_type'],
+                                event['data']).show_training_info()
+        except (PackageError, ArithmeticError):
+            skipped += 1
+            continue
+        aggregator.add(event['user_id'], event['timestamp'], info)
+    return skipped
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Точка входа: `python cli.py aggregate --snapshot PATH [path]`.
+
+    Загружает снимок, если он есть, учитывает тренировки из входа
+    и записывает снимок обратно — так запуски из cron продолжают
+    итоги предыдущих. Окно и срок хранения берутся из снимка;
+    явно переданные --window и --retention, которые с ним
+    расходятся, — ошибка.
+    """
+    parser = argparse.ArgumentParser(
+        prog='cli.py aggregate',
+        description='Пополнить итоги пользователей из JSON Lines.')
+    parser.add_argument('path', nargs='?', default='-',
+                        help='входной файл, "-" — stdin')
+    parser.add_argument('--snapshot', required=True,
+                        help='JSON-файл состояния агрегатора')
+    parser.add_argument('--window', choices=WINDOWS, default=None,
+                        help='окно агрегации, по умолчанию day')
+    parser.add_argument('--retention', type=int, default=None,
+                        help='сколько окон хранить, по умолчанию 7')
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    if os.path.exists(args.snapshot):
+        aggregator = Aggregator.load(args.snapshot)
+        for name in ('window', 'retention'):
+            requested = getattr(args, name)
+            if requested not in (None, getattr(aggregator, name)):
+                parser.error(f'--{name} {requested} не совпадает '
+                             f'со снимком: {getattr(aggregator, name)}')
+    else:
+        aggregator = Aggregator(
+            'day' if args.window is None else args.window,
+            7 if args.retention is None else args.retention)
+    source: IO[str] = sys.stdin
+    if args.path != '-':
+        source = open(args.path, encoding='utf-8')
+    try:
+        skipped = aggregate_lines(aggregator, source)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    aggregator.dump(args.snapshot)
+    if skipped:
+        print(f'Пропущено некорректных пакетов: {skipped}', file=sys.stderr)
+    return 0
@@ -0,0 +1,302 @@
+from array import array
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from homework import (WORKOUT_CLASSES, InfoMessage, Running, SportsWalking,
+                      Swimming, UnknownWorkoutError, package_class)
+
+Column = Sequence[float]
+Kernel = Callable[..., Tuple[List[float], List[float], List[float]]]
+
+
+@dataclass
+class Columns:
+    """
+    Класс. Пакеты тренировок в колоночном виде.
+
+    Атрибуты
+    --------
+    codes: List[str]
+        коды тренировок ('SWM', 'RUN', 'WLK')
+    action: array
+        количество совершённых действий
+    duration: array
+        длительность тренировки в часах
+    weight: array
+        вес спортсмена
+    height: array
+        рост спортсмена (0 для строк, где он не нужен)
+    length_pool: array
+        длина бассейна в метрах (0 для строк, где она не нужна)
+    count_pool: array
+        сколько раз пользователь переплыл бассейн
+        (0 для строк, где это не нужно)
+    """
+
+    codes: List[str]
+    action: array
+    duration: array
+    weight: array
+    height: array
+    length_pool: array
+    count_pool: array
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+
+@dataclass
+class ColumnarResult:
+    """
+    Класс. Результаты пакетного расчёта в колоночном виде.
+
+    Атрибуты
+    --------
+    training_type: List[str]
+        имена классов тренировок
+    duration: array
+        длительность тренировки в часах
+    distance: array
+        дистанция в км
+    speed: array
+        средняя скорость в км/ч
+    calories: array
+        количество израсходованных килокалорий
+
+    Методы
+    ------
+    message(self, index: int) -> InfoMessage:
+        Собрать InfoMessage для одной строки.
+    to_messages(self) -> List[InfoMessage]:
+        Собрать InfoMessage для всех строк.
+    """
+
+    training_type: List[str]
+    duration: array
+    distance: array
+    speed: array
+    calories: array
+
+    def __len__(self) -> int:
+        return len(self.training_type)
+
+    def message(self, index: int) -> InfoMessage:
+        """Собрать InfoMessage для строки с номером index."""
+        return InfoMessage(self.training_type[index],
+                           self.duration[index],
+                           self.distance[index],
+                           self.speed[index],
+                           self.calories[index])
+
+    def to_messages(self) -> List[InfoMessage]:
+        """Собрать InfoMessage для всех строк результата."""
+        return [self.message(index) for index in range(len(self))]
+
+
+def _distance(cls: type, action: Column) -> List[float]:
+    """Дистанция в км по формуле Training.get_distance."""
+    len_step = cls.LEN_STEP
+    m_in_km = cls.M_IN_KM
+    return [a * len_step / m_in_km for a in action]
+
+
+def _mean_speed(distance: Column, duration: Column) -> List[float]:
+    """Средняя скорость по формуле Training.get_mean_speed."""
+    return [d / t for d, t in zip(distance, duration)]
+
+
+def _running(cls: type, action: Column, duration: Column, weight: Column,
+             **_: Column) -> Tuple[List[float], List[float], List[float]]:
+    """Ядро для бега: формулы Running.get_spent_calories."""
+    coeff_1 = cls.COEFF_CALORIE_1
+    coeff_2 = cls.COEFF_CALORIE_2
+    m_in_km = cls.M_IN_KM
+    hour_in_min = cls.HOUR_IN_MIN
+    distance = _distance(cls, action)
+    speed = _mean_speed(distance, duration)
+    calories = [(coeff_1 * v - coeff_2) * w / m_in_km * t * hour_in_min
+                for v, w, t in zip(speed, weight, duration)]
+    return distance, speed, calories
+
+
+def _walking(cls: type, action: Column, duration: Column, weight: Column,
+             height: Column,
+             **_: Column) -> Tuple[List[float], List[float], List[float]]:
+    """Ядро для спортивной ходьбы: формулы SportsWalking.
+
+    Целочисленное деление `//` сохранено, поэтому результат
+    совпадает с SportsWalking.get_spent_calories до бита.
+    """
+    coeff_1 = cls.COEFF_CALORIE_1
+    coeff_2 = cls.COEFF_CALORIE_2
+    hour_in_min = cls.HOUR_IN_MIN
+    distance = _distance(cls, action)
+    speed = _mean_speed(distance, duration)
+    calories = [(coeff_1 * w + (v ** 2 // h) * coeff_2 * w) * t * hour_in_min
+                for v, w, h, t in zip(speed, weight, height, duration)]
+    return distance, speed, calories
+
+
+def _swimming(cls: type, action: Column, duration: Column, weight: Column,
+              length_pool: Column, count_pool: Column,
+              **_: Column) -> Tuple[List[float], List[float], List[float]]:
+    """Ядро для плавания: формулы Swimming.get_mean_speed и калорий."""
+    coeff_1 = cls.COEFF_CALORIE_1
+    coeff_2 = cls.COEFF_CALORIE_2
+    m_in_km = cls.M_IN_KM
+    distance = _distance(cls, action)
+    speed = [lp * cp / m_in_km / t
+             for lp, cp, t in zip(length_pool, count_pool, duration)]
+    calories = [(v + coeff_1) * coeff_2 * w for v, w in zip(speed, weight)]
+    return distance, speed, calories
+
+
+CODE_CLASS: Dict[str, type] = WORKOUT_CLASSES
+
+KERNELS: Dict[type, Kernel] = {Running: _running,
+                               SportsWalking: _walking,
+                               Swimming: _swimming}
+
+EXTRA_COLUMNS: Dict[type, Tuple[str, ...]] = {
+    Running: (),
+    SportsWalking: ('height',),
+    Swimming: ('length_pool', 'count_pool'),
+}
+
+# Номер колонки Columns после codes для каждого дополнительного поля.
+_EXTRA_FIELD = {'height': 3, 'length_pool': 4, 'count_pool': 5}
+
+
+def columns_from_packages(
+        packages: Iterable[Tuple[str, Sequence[float]]]) -> Columns:
+    """Разложить пакеты (workout_type, data) по колонкам.
+
+    Параметры
+    ---------
+    packages: Iterable[Tuple[str, Sequence[float]]]
+        пакеты в том же виде, что принимает read_package
+
+    Возвращаемое значение
+    ---------------------
+    Объект Columns; отсутствующие у вида тренировки поля
+    заполняются нулями. Дополнительные параметры пакета
+    раскладываются по колонкам EXTRA_COLUMNS его класса.
+
+    Исключения
+    ----------
+    UnknownWorkoutError
+        код тренировки не зарегистрирован
+    PackageArityError
+        число параметров не совпадает с конструктором класса
+    ValueError
+        для класса тренировки нет колоночного ядра
+    """
+
+    codes: List[str] = []
+    fields = [array('d') for _ in range(6)]
+    for workout_type, data in packages:
+        cls = package_class(workout_type, data)
+        extra = EXTRA_COLUMNS.get(cls)
+        if extra is None:
+            raise ValueError(f'Для {cls.__name__} нет колоночного ядра')
+        values = [0.0] * 6
+        values[:3] = data[:3]
+        for name, value in zip(extra, data[3:]):
+            values[_EXTRA_FIELD[name]] = value
+        codes.append(workout_type)
+        for column, value in zip(fields, values):
+            column.append(value)
+    return Columns(codes, *fields)
+
+
+def score_columns(codes: Sequence[str],
+                  action: Column,
+                  duration: Column,
+                  weight: Column,
+                  height: Optional[Column] = None,
+                  length_pool: Optional[Column] = None,
+                  count_pool: Optional[Column] = None
+                  ) -> ColumnarResult:
+    """Рассчитать дистанцию, скорость и калории для всех строк сразу.
+
+    Строки группируются по коду тренировки, и каждая группа
+    обрабатывается своим ядром по тем же формулам, что и методы
+    классов тренировок, поэтому результаты совпадают с
+    `read_package(...).show_training_info()` до бита.
+
+    Параметры
+    ---------
+    codes: Sequence[str]
+        коды тренировок
+    action, duration, weight: Sequence[float]
+        общие для всех тренировок параметры
+    height: Sequence[float]
+        рост спортсмена, нужен для строк 'WLK'
+    length_pool, count_pool: Sequence[float]
+        параметры бассейна, нужны для строк 'SWM'
+
+    Возвращаемое значение
+    ---------------------
+    Объект ColumnarResult в порядке входных строк.
+
+    Исключения
+    ----------
+    UnknownWorkoutError
+        код тренировки не зарегистрирован
+    """
+
+    size = len(codes)
+    optional = {'height': height,
+                'length_pool': length_pool,
+                'count_pool': count_pool}
+    groups: Dict[str, List[int]] = {}
+    for index, code in enumerate(codes):
+        groups.setdefault(code, []).append(index)
+
+    training_type: List[str] = [''] * size
+    out_duration = array('d', bytes(8 * size))
+    out_distance = array('d', bytes(8 * size))
+    out_speed = array('d', bytes(8 * size))
+    out_calories = array('d', bytes(8 * size))
+
+    for code, rows in groups.items():
+        cls = CODE_CLASS.get(code)
+        if cls is None:
+            raise UnknownWorkoutError(code)
+        kernel = KERNELS.get(cls)
+        if kernel is None:
+            raise ValueError(f'Для {cls.__name__} нет колоночного ядра')
+        group_duration = [duration[i] for i in rows]
+        extra = {}
+        for name, column in optional.items():
+            if column is not None:
+                extra[name] = [column[i] for i in rows]
+        missing = [name for name in EXTRA_COLUMNS[cls] if name not in extra]
+        if missing:
+            raise ValueError(
+                f'Для кода {code!r} не переданы колонки: {", ".join(missing)}'
+            )
+        distance, speed, calories = kernel(cls,
+                                           [action[i] for i in rows],
+                                           group_duration,
+                                           [weight[i] for i in rows],
+                                           **extra)
+        name = cls.__name__
+        for position, index in enumerate(rows):
+            training_type[index] = name
+            out_duration[index] = group_duration[position]
+            out_distance[index] = distance[position]
+            out_speed[index] = speed[position]
+            out_calories[index] = calories[position]
+
+    return ColumnarResult(training_type, out_duration, out_distance,
+                          out_speed, out_calories)
+
+
+def score_packages(
+        packages: Iterable[Tuple[str, Sequence[float]]]) -> ColumnarResult:
+    """Рассчитать пакеты (workout_type, data) колоночным движком."""
+    columns = columns_from_packages(packages)
+    return score_columns(columns.codes, columns.action, columns.duration,
+                         columns.weight, columns.height,
+                         columns.length_pool, columns.count_pool)
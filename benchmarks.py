@@ -0,0 +1,599 @@
+import argparse
+import atexit
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import batch
+import cache
+import compact
+import compiled
+import compressed
+import dedup
+import formatting
+import homework
+import instrumentation
+import leaderboard
+import rescore
+import sketches
+import stream
+import worker
+
+Package = Tuple[str, List[float]]
+
+DEFAULT_MIN_TIME = 0.2
+DEFAULT_THRESHOLD = 0.2
+DEFAULT_ROUNDS = 5
+BATCH_SIZES = (1, 100, 10000)
+
+
+def make_packages(count: int, seed: int = 0) -> List[Package]:
+    """Сгенерировать count случайных пакетов всех видов тренировок."""
+    rnd = random.Random(seed)
+    packages: List[Package] = []
+    for _ in range(count):
+        code = rnd.choice(('SWM', 'RUN', 'WLK'))
+        data = [rnd.randint(1, 30000), rnd.uniform(0.1, 5),
+                rnd.uniform(40, 120)]
+        if code == 'WLK':
+            data.append(rnd.randint(140, 210))
+        elif code == 'SWM':
+            data += [rnd.choice((25, 50)), rnd.randint(1, 80)]
+        packages.append((code, data))
+    return packages
+
+
+def bytes_per_item(build: Callable[[], object], count: int) -> float:
+    """Сколько байт на элемент занимает результат build() в памяти.
+
+    Измеряется через tracemalloc: учитывается всё, что выделено
+    при построении и остаётся живым, пока жив результат.
+    """
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = build()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del result
+    return (after - before) / count
+
+
+def bench_memory(count: int = 100000) -> Dict[str, float]:
+    """Память на тренировку до и после перехода на компактные классы.
+
+    Возвращаемое значение
+    ---------------------
+    Словарь: имя замера -> байт на одну тренировку
+    """
+
+    packages = make_packages(count)
+    return {
+        'training_dict': bytes_per_item(
+            lambda: [homework.read_package(*package)
+                     for package in packages], count),
+        'training_slots': bytes_per_item(
+            lambda: [compact.read_package(*package)
+                     for package in packages], count),
+        'info_dict': bytes_per_item(
+            lambda: [homework.read_package(*package).show_training_info()
+                     for package in packages], count),
+        'info_slots': bytes_per_item(
+            lambda: [compact.read_package(*package).show_training_info()
+                     for package in packages], count),
+        'info_columns': bytes_per_item(
+            lambda: compact.InfoMessageColumns(
+                compact.read_package(*package).show_training_info()
+                for package in packages), count),
+    }
+
+
+@dataclass
+class Benchmark:
+    """
+    Класс. Один замер производительности.
+
+    Атрибуты
+    --------
+    name: str
+        имя замера, ключ в файле базовых значений
+    func: Callable[[], object]
+        функция, выполняющая ops операций за вызов
+    ops: int
+        сколько операций выполняет один вызов func
+    """
+
+    name: str
+    func: Callable[[], object]
+    ops: int = 1
+
+
+@dataclass
+class BenchResult:
+    """
+    Класс. Результат замера.
+
+    Атрибуты
+    --------
+    ops_per_sec: float
+        операций в секунду
+    alloc_bytes: float
+        пиковый объём выделенной памяти на одну операцию
+    """
+
+    ops_per_sec: float
+    alloc_bytes: float
+
+
+def run_benchmark(bench: Benchmark,
+                  min_time: float = DEFAULT_MIN_TIME,
+                  rounds: int = DEFAULT_ROUNDS) -> BenchResult:
+    """Выполнить замер и вернуть лучший из rounds раундов.
+
+    Каждый раунд длится не меньше min_time / rounds секунд; лучший
+    раунд меньше всего зависит от фоновой нагрузки на машину.
+    Память меряется отдельным вызовом под tracemalloc.
+    """
+
+    best = 0.0
+    round_time = min_time / rounds
+    for _ in range(rounds):
+        calls = 0
+        started = time.perf_counter()
+        elapsed = 0.0
+        while elapsed < round_time or not calls:
+            bench.func()
+            calls += 1
+            elapsed = time.perf_counter() - started
+        best = max(best, calls * bench.ops / elapsed)
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        bench.func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return BenchResult(best, (peak - before) / bench.ops)
+
+
+def _scoring(package: Package) -> Callable[[], object]:
+    workout_type, data = package
+    return lambda: homework.read_package(workout_type, data) \
+        .show_training_info()
+
+
+def _end_to_end(packages: List[Package]) -> Callable[[], object]:
+    return lambda: sum(1 for _ in stream.iter_messages(packages))
+
+
+def hot_path_benchmarks(
+        batch_sizes: Sequence[int] = BATCH_SIZES) -> List[Benchmark]:
+    """Замеры горячего пути.
+
+    Расчёт по каждому виду тренировки, форматирование сообщения
+    и обработка пакетов целиком для нескольких размеров пачки.
+    """
+
+    info = homework.read_package('RUN', [15000, 1, 75]).show_training_info()
+    benchmarks = [
+        Benchmark('score_swimming', _scoring(('SWM', [720, 1, 80, 25, 40]))),
+        Benchmark('score_running', _scoring(('RUN', [15000, 1, 75]))),
+        Benchmark('score_walking', _scoring(('WLK', [9000, 1, 75, 180]))),
+        Benchmark('get_message', info.get_message),
+    ]
+    for size in batch_sizes:
+        benchmarks.append(Benchmark(f'end_to_end_{size}',
+                                    _end_to_end(make_packages(size)), size))
+    return benchmarks
+
+
+def formatting_benchmarks(count: int = 10000) -> List[Benchmark]:
+    """Форматирование отчёта: get_message по одному против пачечного."""
+    packages = make_packages(count)
+    infos = [homework.read_package(*package).show_training_info()
+             for package in packages]
+    result = batch.score_packages(packages)
+    return [
+        Benchmark('report_get_message',
+                  lambda: ''.join(info.get_message() + '\n'
+                                  for info in infos), count),
+        Benchmark('report_format_messages',
+                  lambda: formatting.format_messages(infos), count),
+        Benchmark('report_format_columns',
+                  lambda: formatting.format_columns(result), count),
+    ]
+
+
+def make_mixed_packages(count: int,
+                        invalid_share: float = 0.1,
+                        seed: int = 0) -> List[Package]:
+    """Пакеты, среди которых доля invalid_share некорректных."""
+    rnd = random.Random(seed)
+    packages = make_packages(count, seed)
+    broken = [('XXX', [1, 1, 1]), ('RUN', [15000, 1]),
+              ('SWM', [720, 0, 80, 25, 40]), ('WLK', [9000, 1, 'a', 180])]
+    for index in range(count):
+        if rnd.random() < invalid_share:
+            packages[index] = rnd.choice(broken)
+    return packages
+
+
+def _read_with_try(packages: List[Package]) -> int:
+    """Прежний способ: read_package в try на каждый пакет."""
+    count = 0
+    for workout_type, data in packages:
+        try:
+            homework.read_package(workout_type, data)
+        except (KeyError, TypeError, ValueError):
+            continue
+        count += 1
+    return count
+
+
+def dispatch_benchmarks(count: int = 10000) -> List[Benchmark]:
+    """Разбор смеси корректных и некорректных пакетов."""
+    valid = make_packages(count)
+    mixed = make_mixed_packages(count)
+    return [
+        Benchmark('dispatch_valid',
+                  lambda: sum(1 for _ in homework.read_packages(valid)),
+                  count),
+        Benchmark('dispatch_mixed_try_except',
+                  lambda: _read_with_try(mixed), count),
+        Benchmark('dispatch_mixed_rejects',
+                  lambda: sum(1 for _ in homework.read_packages(mixed, [])),
+                  count),
+    ]
+
+
+def instrumentation_benchmarks(count: int = 10000) -> List[Benchmark]:
+    """Цена инструментации: без неё, выключенная и включённая.
+
+    instrumented_off должен совпадать с plain в пределах шума —
+    это и есть проверка «почти нулевых» расходов в выключенном
+    режиме.
+    """
+    packages = make_packages(count)
+    disabled = instrumentation.Instrumentation(enabled=False)
+    enabled = instrumentation.Instrumentation()
+    return [
+        Benchmark('instrumented_plain',
+                  lambda: sum(1 for _ in stream.iter_messages(packages)),
+                  count),
+        Benchmark('instrumented_off',
+                  lambda: sum(1 for _ in disabled.iter_messages(packages)),
+                  count),
+        Benchmark('instrumented_on',
+                  lambda: sum(1 for _ in enabled.iter_messages(packages)),
+                  count),
+    ]
+
+
+def dedup_benchmarks(count: int = 10000,
+                     duplicate_share: float = 0.05) -> List[Benchmark]:
+    """Пропускная способность дедупликации с долей повторов."""
+    rnd = random.Random(0)
+    events = [(f'device{rnd.randrange(1000)}', 1700000000.0 + index,
+               code, data)
+              for index, (code, data) in enumerate(make_packages(count))]
+    for index in range(count):
+        if rnd.random() < duplicate_share:
+            events[index] = events[rnd.randrange(count)]
+
+    def run() -> int:
+        return sum(1 for _ in dedup.Deduplicator(capacity=count)
+                   .filter(events))
+
+    return [Benchmark('dedup_filter', run, count)]
+
+
+def compression_benchmarks(count: int = 50000,
+                           member_bytes: int = 64 * 1024,
+                           decode_threads: int = 4) -> List[Benchmark]:
+    """Расчёт из CSV без сжатия и из архивов gzip, bz2 и xz.
+
+    Архивы пишутся членами по member_bytes, как у шлюза; каждый
+    формат замеряется с распаковкой потоком и в пуле из
+    decode_threads потоков. Файлы лежат во временном каталоге,
+    который удаляется при выходе из процесса.
+    """
+    directory = tempfile.mkdtemp(prefix='bench-compression-')
+    atexit.register(shutil.rmtree, directory, True)
+    lines = [','.join(map(str, [code, *data])) + '\n'
+             for code, data in make_packages(count)]
+    plain = os.path.join(directory, 'packages.csv')
+    with open(plain, 'w', encoding='utf-8') as output:
+        output.writelines(lines)
+
+    def scoring(path: str, threads: int) -> Callable[[], object]:
+        def run() -> int:
+            source = compressed.iter_lines([path], threads, member_bytes)
+            return sum(1 for _ in stream.iter_messages(
+                stream.read_records(source)))
+        return run
+
+    suite = [Benchmark('compressed_none', scoring(plain, 0), count)]
+    for codec, suffix in compressed.SUFFIXES.items():
+        path = plain + suffix
+        compressed.write_members(path, lines, codec, member_bytes)
+        suite += [
+            Benchmark(f'compressed_{codec}', scoring(path, 0), count),
+            Benchmark(f'compressed_{codec}_threads',
+                      scoring(path, decode_threads), count),
+        ]
+    return suite
+
+
+def _sorted_leaders(infos: List[homework.InfoMessage], k: int) -> int:
+    """Таблицы лидеров по-старому: списки по виду и полная сортировка."""
+    groups: Dict[str, List[homework.InfoMessage]] = {}
+    for info in infos:
+        groups.setdefault(info.training_type, []).append(info)
+    tops = [sorted(group, key=lambda info: getattr(info, metric),
+                   reverse=True)[:k]
+            for group in groups.values() for metric in leaderboard.METRICS]
+    return len(tops)
+
+
+def leaderboard_benchmarks(count: int = 10000,
+                           k: int = 10) -> List[Benchmark]:
+    """Top-k по виду и показателю: сортировка против куч."""
+    infos = [homework.read_package(code, data).show_training_info()
+             for code, data in make_packages(count)]
+    result = batch.score_packages(make_packages(count))
+
+    def streaming() -> int:
+        board = leaderboard.Leaderboard(k)
+        for info in infos:
+            board.add(info)
+        return board.seen
+
+    def columnar() -> int:
+        board = leaderboard.Leaderboard(k)
+        board.add_columns(result)
+        return board.seen
+
+    return [
+        Benchmark('leaders_sorted', lambda: _sorted_leaders(infos, k),
+                  count),
+        Benchmark('leaders_heap', streaming, count),
+        Benchmark('leaders_heap_columns', columnar, count),
+    ]
+
+
+def quantile_benchmarks(count: int = 10000) -> List[Benchmark]:
+    """p50/p90/p99 скорости и калорий: сортировка против эскизов."""
+    infos = [homework.read_package(code, data).show_training_info()
+             for code, data in make_packages(count)]
+
+    def exact() -> int:
+        groups: Dict[Tuple[str, str], List[float]] = {}
+        for info in infos:
+            for metric in sketches.METRICS:
+                groups.setdefault((info.training_type, metric), []).append(
+                    getattr(info, metric))
+        summary = []
+        for values in groups.values():
+            values.sort()
+            summary.append([values[int(q * (len(values) - 1))]
+                            for q in sketches.QUANTILES])
+        return len(summary)
+
+    def sketched() -> int:
+        distribution = sketches.DistributionSketches()
+        for info in infos:
+            distribution.add(info)
+        return len(distribution.summary())
+
+    return [Benchmark('quantiles_sorted', exact, count),
+            Benchmark('quantiles_sketch', sketched, count)]
+
+
+def rescore_benchmarks(count: int = 100000) -> List[Benchmark]:
+    """Пересчёт истории после смены COEFF_CALORIE_1 у бега.
+
+    rescore_replay — прогон всех пакетов через классы тренировок,
+    rescore_full — пересчёт всех строк из файла параметров,
+    rescore_running — только строк бега, остальное копируется
+    из предыдущей версии.
+    """
+    directory = tempfile.mkdtemp(prefix='bench-rescore-')
+    atexit.register(shutil.rmtree, directory, True)
+    packages = make_packages(count)
+    history = rescore.ScoreHistory(directory)
+    history.ingest(packages)
+    base = rescore.CoefficientSet('v1')
+    changed = rescore.CoefficientSet(
+        'v2', {'Running': {'COEFF_CALORIE_1': 18.5}})
+    output = os.path.join(directory, 'bench.wkcl')
+    running = changed.training_class(homework.Running)
+    classes = {code: running if cls is homework.Running else cls
+               for code, cls in homework.WORKOUT_CLASSES.items()}
+
+    def replay() -> int:
+        return len([classes[code](*data).show_training_info()
+                    for code, data in packages])
+
+    def rescore_all() -> int:
+        return rescore.rescore_file(history.raw_path, output, changed).rows
+
+    def rescore_running() -> int:
+        return rescore.rescore_file(
+            history.raw_path, output, changed,
+            os.path.join(directory, 'scores-v1.wkcl'), base).rows
+
+    return [Benchmark('rescore_replay', replay, count),
+            Benchmark('rescore_full', rescore_all, count),
+            Benchmark('rescore_running', rescore_running, count)]
+
+
+def compiled_benchmarks(count: int = 10000) -> List[Benchmark]:
+    """Расчёт скомпилированными функциями против классов тренировок.
+
+    compiled_classes — read_packages и show_training_info,
+    compiled_flat — compiled.iter_scored с теми же проверками,
+    compiled_direct — функции compile_registry без проверок.
+    """
+    packages = make_packages(count)
+    scorers = compiled.compile_registry()
+    return [
+        Benchmark('compiled_classes',
+                  lambda: [training.show_training_info() for training
+                           in homework.read_packages(packages)], count),
+        Benchmark('compiled_flat',
+                  lambda: list(compiled.iter_scored(packages)), count),
+        Benchmark('compiled_direct',
+                  lambda: [scorers[code](*data) for code, data in packages],
+                  count),
+    ]
+
+
+def cache_benchmarks(count: int = 10000,
+                     distinct: int = 100) -> List[Benchmark]:
+    """Пачки постоянного процесса с повторными пакетами и без кэша.
+
+    Пакеты выбираются из distinct разных; кэш живёт между
+    замерами, как в процессе `cli.py worker --cache-size`.
+    """
+    rnd = random.Random(0)
+    request = {'id': 1,
+               'packages': rnd.choices(make_packages(distinct), k=count)}
+    results = cache.PackageCache()
+    return [
+        Benchmark('cache_off', lambda: worker.score_batch(request), count),
+        Benchmark('cache_on',
+                  lambda: worker.score_batch(request, results), count),
+    ]
+
+
+SUITES: Dict[str, Callable[[], List[Benchmark]]] = {
+    'hot-path': hot_path_benchmarks,
+    'formatting': formatting_benchmarks,
+    'dispatch': dispatch_benchmarks,
+    'instrumentation': instrumentation_benchmarks,
+    'dedup': dedup_benchmarks,
+    'compression': compression_benchmarks,
+    'leaderboard': leaderboard_benchmarks,
+    'quantiles': quantile_benchmarks,
+    'rescore': rescore_benchmarks,
+    'compiled': compiled_benchmarks,
+    'cache': cache_benchmarks,
+}
+
+
+def run_suite(benchmarks: Sequence[Benchmark],
+              min_time: float = DEFAULT_MIN_TIME) -> Dict[str, BenchResult]:
+    """Выполнить все замеры набора."""
+    return {bench.name: run_benchmark(bench, min_time)
+            for bench in benchmarks}
+
+
+def save_baseline(results: Dict[str, BenchResult], path: str) -> None:
+    """Сохранить результаты как базовые значения в JSON."""
+    with open(path, 'w', encoding='utf-8') as baseline:
+        json.dump({name: asdict(result) for name, result in results.items()},
+                  baseline, indent=2, sort_keys=True)
+
+
+def load_baseline(path: str) -> Dict[str, BenchResult]:
+    """Прочитать базовые значения из JSON."""
+    with open(path, encoding='utf-8') as baseline:
+        return {name: BenchResult(**values)
+                for name, values in json.load(baseline).items()}
+
+
+def find_regressions(results: Dict[str, BenchResult],
+                     baseline: Dict[str, BenchResult],
+                     threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    """Замеры, пропускная способность которых упала больше threshold.
+
+    Параметры
+    ---------
+    threshold: float
+        допустимая доля падения ops/sec, 0.2 — на 20%
+
+    Возвращаемое значение
+    ---------------------
+    Список описаний регрессий; замеры без базового значения
+    не учитываются.
+    """
+
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        limit = reference.ops_per_sec * (1 - threshold)
+        if result.ops_per_sec < limit:
+            drop = 1 - result.ops_per_sec / reference.ops_per_sec
+            regressions.append(
+                f'{name}: {format(result.ops_per_sec, ".0f")} оп/с, '
+                f'база {format(reference.ops_per_sec, ".0f")} оп/с '
+                f'(-{format(drop * 100, ".1f")}%)')
+    return regressions
+
+
+def _print_table(results: Dict[str, float], unit: str) -> None:
+    width = max(len(name) for name in results)
+    for name, value in results.items():
+        print(f'{name:<{width}}  {format(value, ".1f")} {unit}')
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Точка входа.
+
+    `python benchmarks.py memory [--count N]` — замер памяти;
+    `python benchmarks.py hot-path [--baseline F] [--save]
+    [--threshold T]` — замеры скорости со сравнением с базой.
+
+    Возвращаемое значение
+    ---------------------
+    Код выхода: 1, если найдены регрессии, иначе 0
+    """
+
+    parser = argparse.ArgumentParser(
+        description='Бенчмарки модуля фитнес-трекера.')
+    parser.add_argument('suite', choices=('memory', *SUITES))
+    parser.add_argument('--count', type=int, default=100000)
+    parser.add_argument('--min-time', type=float, default=DEFAULT_MIN_TIME)
+    parser.add_argument('--baseline', default=None,
+                        help='JSON-файл базовых значений')
+    parser.add_argument('--save', action='store_true',
+                        help='записать результаты в --baseline')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    if args.suite == 'memory':
+        memory = bench_memory(args.count)
+        _print_table(memory, 'байт/тренировку')
+        ratio = memory['info_dict'] / memory['info_columns']
+        print(f'InfoMessage -> InfoMessageColumns: '
+              f'в {format(ratio, ".1f")} раза меньше')
+        return 0
+
+    results = run_suite(SUITES[args.suite](), args.min_time)
+    _print_table({name: result.ops_per_sec
+                  for name, result in results.items()}, 'оп/с')
+    if args.baseline is None:
+        return 0
+    if args.save:
+        save_baseline(results, args.baseline)
+        return 0
+    regressions = find_regressions(results, load_baseline(args.baseline),
+                                   args.threshold)
+    for regression in regressions:
+        print(f'РЕГРЕССИЯ {regression}', file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
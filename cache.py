@@ -0,0 +1,180 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import (Callable, Hashable, Iterable, Iterator, List, Optional,
+                    Sequence, Tuple)
+
+from compiled import reject_arithmetic
+from homework import (InfoMessage, PackageError, PackageValueError, Reject,
+                      read_package)
+
+Key = Tuple[str, Tuple[Hashable, ...]]
+Package = Tuple[str, Sequence[float]]
+
+DEFAULT_MAXSIZE = 65536
+
+
+@dataclass
+class CacheStats:
+    """
+    Класс. Статистика кэша результатов.
+
+    Атрибуты
+    --------
+    hits: int
+        количество попаданий
+    misses: int
+        количество промахов
+    evictions: int
+        количество вытеснений по LRU
+    expirations: int
+        количество записей, выброшенных по истечении TTL
+    """
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Доля попаданий среди всех обращений."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class PackageCache:
+    """
+    Класс. Потокобезопасный LRU-кэш результатов по содержимому пакета.
+
+    Ключ — (workout_type, tuple(data)), значение — InfoMessage.
+    Возвращаемые объекты общие для всех попаданий, их нельзя менять.
+
+    Атрибуты
+    --------
+    maxsize: int
+        максимальное количество записей
+    ttl: Optional[float]
+        время жизни записи в секундах, None — без ограничения
+    stats: CacheStats
+        счётчики попаданий, промахов и вытеснений
+
+    Методы
+    ------
+    get_info(self, workout_type, data) -> InfoMessage:
+        Результат для пакета из кэша или посчитанный заново.
+    iter_scored(self, packages, rejects=None) -> Iterator[InfoMessage]:
+        Результаты потока пакетов с отбраковкой, как у compiled.
+    clear(self) -> None:
+        Очистить кэш.
+    dump_stats(self) -> str:
+        Статистика кэша в виде JSON.
+    """
+
+    def __init__(self,
+                 maxsize: int = DEFAULT_MAXSIZE,
+                 ttl: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        if maxsize <= 0:
+            raise ValueError('Размер кэша должен быть положительным')
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._clock = clock
+        self._data: 'OrderedDict[Key, Tuple[float, InfoMessage]]' = (
+            OrderedDict())
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _lookup(self, key: Key) -> Optional[InfoMessage]:
+        """Найти запись под блокировкой; просроченную удалить."""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        stored_at, info = entry
+        if self.ttl is not None and self._clock() - stored_at > self.ttl:
+            del self._data[key]
+            self.stats.expirations += 1
+            return None
+        self._data.move_to_end(key)
+        return info
+
+    def get_info(self,
+                 workout_type: str,
+                 data: Sequence[float]
+                 ) -> InfoMessage:
+        """Результат show_training_info для пакета, по возможности из кэша.
+
+        Расчёт идёт вне блокировки, поэтому одинаковый пакет,
+        пришедший одновременно из нескольких потоков, может быть
+        посчитан больше одного раза — результат от этого не меняется.
+
+        Исключения
+        ----------
+        UnknownWorkoutError, PackageArityError, PackageValueError
+            как у read_package; нехешируемый параметр —
+            PackageValueError
+        """
+
+        key: Key = (workout_type, tuple(data))
+        with self._lock:
+            try:
+                info = self._lookup(key)
+            except TypeError:
+                raise PackageValueError(
+                    f'Параметры {data!r} не числа') from None
+            if info is not None:
+                self.stats.hits += 1
+                return info
+            self.stats.misses += 1
+        info = read_package(workout_type, list(data)).show_training_info()
+        with self._lock:
+            self._data[key] = (self._clock(), info)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.stats.evictions += 1
+        return info
+
+    def iter_scored(self,
+                    packages: Iterable[Package],
+                    rejects: Optional[List[Reject]] = None
+                    ) -> Iterator[InfoMessage]:
+        """Результаты пакетов через кэш, как compiled.iter_scored.
+
+        Некорректные пакеты и пакеты, на которых расчёт бросил
+        ArithmeticError, складываются в rejects; если он
+        не передан, бросается PackageError.
+        """
+
+        for index, (workout_type, data) in enumerate(packages):
+            try:
+                info = self.get_info(workout_type, data)
+            except PackageError as exc:
+                if rejects is None:
+                    raise
+                rejects.append(Reject(index, workout_type, data, exc.reason,
+                                      str(exc)))
+                continue
+            except ArithmeticError as exc:
+                reject_arithmetic(exc, index, (workout_type, data), rejects)
+                continue
+            yield info
+
+    def clear(self) -> None:
+        """Очистить кэш; статистика сохраняется."""
+        with self._lock:
+            self._data.clear()
+
+    def dump_stats(self) -> str:
+        """Статистика кэша в виде JSON-строки."""
+        with self._lock:
+            stats = asdict(self.stats)
+            stats.update(size=len(self._data), maxsize=self.maxsize,
+                         ttl=self.ttl,
+                         hit_rate=round(self.stats.hit_rate, 6))
+        return json.dumps(stats, sort_keys=True)
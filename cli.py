@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import sys
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Dict, Optional, Sequence, Tuple
+
+# Бюджет времени импорта (микросекунды, сумма self-времени
+# из `python -X importtime`), проверяется в tests/test_cli.py.
+# IMPORT_BUDGET_US — `import cli`, SCORE_BUDGET_US — команда score.
+IMPORT_BUDGET_US = 20_000
+SCORE_BUDGET_US = 150_000
+
+COMMANDS: Dict[str, Tuple[str, str, str]] = {
+    'score': ('stream', 'main',
+              'рассчитать пакеты CSV/JSON Lines (в т.ч. в колоночный файл)'),
+    'dedup': ('dedup', 'main',
+              'отбросить повторно переданные пакеты JSON Lines'),
+    'worker': ('worker', 'main',
+               'постоянный процесс: пачки JSON через stdin/stdout'),
+    'serve': ('server', 'main', 'сервер расчёта по TCP или Unix-сокету'),
+    'cluster': ('cluster', 'main',
+                'распределённый расчёт: координатор и воркеры'),
+    'quantiles': ('sketches', 'main',
+                  'слить эскизы квантилей и напечатать p50/p90/p99'),
+    'rescore': ('rescore', 'main',
+                'пересчитать историю с новыми константами (версии)'),
+    'aggregate': ('aggregation', 'main',
+                  'пополнить итоги пользователей из JSON Lines'),
+    'bench': ('benchmarks', 'main', 'замеры производительности'),
+}
+
+
+def usage() -> str:
+    """Текст справки со списком команд."""
+    width = max(map(len, COMMANDS))
+    lines = ['usage: cli.py КОМАНДА [аргументы команды]', '', 'команды:']
+    lines += [f'  {name:<{width}}  {description}'
+              for name, (_, _, description) in COMMANDS.items()]
+    lines += ['', 'Справка по команде: cli.py КОМАНДА --help']
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Разобрать имя команды и передать остальные аргументы её main.
+
+    При импорте cli не загружается ничего, кроме sys: модуль
+    команды (сервер, колоночный ввод-вывод, агрегация, бенчмарки)
+    импортируется лишь при её вызове. Для потока мелких пачек
+    держите один процесс `cli.py worker` вместо тысяч запусков.
+
+    Возвращаемое значение
+    ---------------------
+    Код завершения процесса: int
+    """
+
+    args = list(sys.argv[1:] if argv is None else argv)
+    if not args or args[0] in ('-h', '--help'):
+        print(usage())
+        return 0
+    command = COMMANDS.get(args[0])
+    if command is None:
+        print(f'Неизвестная команда {args[0]!r}\n\n{usage()}',
+              file=sys.stderr)
+        return 2
+    module_name, function, _ = command
+    module = __import__(module_name)
+    return getattr(module, function)(args[1:]) or 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
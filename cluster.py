@@ -0,0 +1,562 @@
+import argparse
+import heapq
+import os
+import statistics
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from multiprocessing import Process
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from compiled import iter_scored
+from homework import Reject
+from stream import detect_format, read_records
+
+Address = Tuple[str, int]
+
+DEFAULT_SHARD_BYTES = 4 * 1024 * 1024
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_STRAGGLER_FACTOR = 2.0
+DEFAULT_MAX_AHEAD = 32
+DEFAULT_WORKER_TIMEOUT = 60.0
+AUTHKEY_ENV = 'WORKOUT_CLUSTER_KEY'
+
+
+class ShardError(RuntimeError):
+    """Кусок не удалось рассчитать за отведённое число попыток."""
+
+
+@dataclass
+class Shard:
+    """
+    Класс. Кусок входного файла — диапазон байт, выровненный по строкам.
+
+    Воркер читает диапазон сам, поэтому координатор пересылает
+    только описание куска, а не пакеты.
+
+    Атрибуты
+    --------
+    shard_id: int
+        порядковый номер куска; в этом порядке склеиваются результаты
+    path: str
+        путь к файлу пакетов, доступный воркеру
+    fmt: str
+        формат файла: 'csv' или 'jsonl'
+    offset, length: int
+        диапазон байт куска
+    """
+
+    shard_id: int
+    path: str
+    fmt: str
+    offset: int
+    length: int
+
+
+@dataclass
+class ShardReport:
+    """
+    Класс. Итог обработки одного куска.
+
+    Атрибуты
+    --------
+    shard_id: int
+        номер куска
+    worker: str
+        имя воркера, рассчитавшего кусок
+    attempts: int
+        сколько раз кусок отправлялся воркерам
+    packages: int
+        количество рассчитанных пакетов куска
+    seconds: float
+        время расчёта куска в воркере
+    rejects: List[Reject]
+        отбракованные пакеты; index — номер строки в куске
+    """
+
+    shard_id: int
+    worker: str
+    attempts: int
+    packages: int
+    seconds: float
+    rejects: List[Reject] = field(default_factory=list)
+
+
+@dataclass
+class ClusterReport:
+    """
+    Класс. Отчёт координатора о прогоне.
+
+    Атрибуты
+    --------
+    packages: int
+        количество рассчитанных пакетов
+    seconds: float
+        время от запуска координатора до последнего куска
+    shards: List[ShardReport]
+        отчёты по рассчитанным кускам
+    failed: Dict[int, str]
+        куски, не рассчитанные за max_attempts попыток, и ошибка
+    stragglers: List[ShardReport]
+        куски, считавшиеся дольше straggler_factor медиан
+    """
+
+    packages: int
+    seconds: float
+    shards: List[ShardReport] = field(default_factory=list)
+    failed: Dict[int, str] = field(default_factory=dict)
+    stragglers: List[ShardReport] = field(default_factory=list)
+
+    @property
+    def throughput(self) -> float:
+        """Пакетов в секунду по времени прогона."""
+        return self.packages / self.seconds if self.seconds else 0.0
+
+    def workers(self) -> Dict[str, Tuple[int, float]]:
+        """Для каждого воркера: пакетов и секунд расчёта."""
+        totals: Dict[str, Tuple[int, float]] = {}
+        for shard in self.shards:
+            packages, seconds = totals.get(shard.worker, (0, 0.0))
+            totals[shard.worker] = (packages + shard.packages,
+                                    seconds + shard.seconds)
+        return totals
+
+    @property
+    def rejected(self) -> int:
+        """Количество отбракованных пакетов во всех кусках."""
+        return sum(len(shard.rejects) for shard in self.shards)
+
+    def format(self) -> str:
+        """Текст отчёта: итог, строка на воркер, медленные куски."""
+        lines = [f'{self.packages} пакетов за '
+                 f'{format(self.seconds, ".2f")} с, '
+                 f'{format(self.throughput, ".0f")} пакетов/с']
+        if self.rejected:
+            lines.append(f'отбраковано {self.rejected} пакетов')
+        for worker, (packages, seconds) in sorted(self.workers().items()):
+            rate = packages / seconds if seconds else 0.0
+            lines.append(f'{worker}: {packages} пакетов, '
+                         f'{format(rate, ".0f")} пакетов/с')
+        for shard in self.stragglers:
+            lines.append(f'медленный кусок {shard.shard_id} на '
+                         f'{shard.worker}: {format(shard.seconds, ".3f")} с')
+        for shard_id, error in sorted(self.failed.items()):
+            lines.append(f'кусок {shard_id} не рассчитан: {error}')
+        return '\n'.join(lines)
+
+
+def make_shards(paths: Sequence[str],
+                shard_bytes: int = DEFAULT_SHARD_BYTES,
+                fmt: Optional[str] = None) -> List[Shard]:
+    """Разрезать файлы пакетов на куски примерно по shard_bytes байт.
+
+    Граница куска сдвигается на конец строки, поэтому каждая строка
+    попадает ровно в один кусок.
+    """
+    if shard_bytes <= 0:
+        raise ValueError('shard_bytes должен быть положительным')
+    shards: List[Shard] = []
+    for path in paths:
+        size = os.path.getsize(path)
+        file_fmt = fmt or detect_format(path)
+        with open(path, 'rb') as source:
+            start = 0
+            while start < size:
+                end = start + shard_bytes
+                if end < size:
+                    source.seek(end)
+                    source.readline()
+                    end = source.tell()
+                end = min(end, size)
+                shards.append(Shard(len(shards), path, file_fmt, start,
+                                    end - start))
+                start = end
+    return shards
+
+
+def read_shard(shard: Shard) -> List[str]:
+    """Строки куска из файла."""
+    with open(shard.path, 'rb') as source:
+        source.seek(shard.offset)
+        data = source.read(shard.length)
+    return data.decode('utf-8').splitlines()
+
+
+def run_worker(address: Address,
+               authkey: bytes,
+               name: Optional[str] = None) -> int:
+    """Цикл воркера: получать куски от координатора и возвращать строки.
+
+    Пакеты куска проверяются и считаются с отбраковкой, как
+    в iter_scored: плохие пакеты возвращаются вместе с результатом
+    куска и не мешают остальным. Прочие ошибки отправляются
+    координатору с признаком, имеет ли смысл повтор: ошибка разбора
+    (ValueError) повторится на любом воркере.
+
+    Возвращаемое значение
+    ---------------------
+    Количество рассчитанных кусков: int
+    """
+
+    name = name or f'{os.uname().nodename}:{os.getpid()}'
+    done = 0
+    with Client(address, authkey=authkey) as connection:
+        try:
+            connection.send(('hello', name))
+            while True:
+                message = connection.recv()
+                if message[0] == 'stop':
+                    return done
+                connection.send(_score_shard(message[1]))
+                done += 1
+        except (EOFError, OSError):
+            return done
+
+
+def _score_shard(shard: Shard) -> tuple:
+    """Ответ воркера на кусок: результат или описание ошибки."""
+    started = time.perf_counter()
+    rejects: List[Reject] = []
+    try:
+        packages = read_records(read_shard(shard), shard.fmt)
+        lines = [info.get_message()
+                 for info in iter_scored(packages, rejects)]
+    except Exception as exc:
+        return ('error', shard.shard_id, f'{type(exc).__name__}: {exc}',
+                not isinstance(exc, ValueError))
+    return ('result', shard.shard_id, len(lines),
+            time.perf_counter() - started, lines, rejects)
+
+
+class Coordinator:
+    """
+    Класс. Координатор распределённого расчёта кусков.
+
+    Слушает адрес address (multiprocessing.connection, проверка
+    authkey), раздаёт куски подключившимся воркерам по одному
+    и собирает строки результатов и отбракованные пакеты. Кусок,
+    воркер которого упал, отключился, вернул ошибку или не ответил
+    за shard_timeout, возвращается в очередь — до max_attempts
+    отправок. Ошибка, которая повторится на любом воркере (разбор
+    файла), делает кусок нерассчитанным сразу.
+    Результаты отдаются в порядке кусков по мере готовности.
+    Воркерам раздаются только куски не дальше max_ahead от того,
+    который results() ждёт следующим, поэтому готовые результаты
+    не копятся без предела, пока он считается. Если живых
+    воркеров нет дольше worker_timeout секунд, results() бросает
+    ShardError вместо бесконечного ожидания.
+
+    Атрибуты
+    --------
+    address: Tuple[str, int]
+        фактический адрес (полезно при порте 0)
+
+    Методы
+    ------
+    start(self) -> None:
+        Начать принимать воркеров.
+    results(self) -> Iterator[str]:
+        Строки сообщений в порядке входа.
+    report(self) -> ClusterReport:
+        Пропускная способность, воркеры и медленные куски.
+    close(self) -> None:
+        Перестать принимать воркеров.
+    """
+
+    def __init__(self,
+                 shards: Sequence[Shard],
+                 authkey: bytes,
+                 address: Address = ('127.0.0.1', 0),
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                 shard_timeout: Optional[float] = None,
+                 straggler_factor: float = DEFAULT_STRAGGLER_FACTOR,
+                 max_ahead: int = DEFAULT_MAX_AHEAD,
+                 worker_timeout: Optional[float] = DEFAULT_WORKER_TIMEOUT
+                 ) -> None:
+        if max_ahead <= 0:
+            raise ValueError('max_ahead должен быть положительным')
+        self.shards = list(shards)
+        self.max_attempts = max_attempts
+        self.shard_timeout = shard_timeout
+        self.straggler_factor = straggler_factor
+        self.max_ahead = max_ahead
+        self.worker_timeout = worker_timeout
+        self._listener = Listener(address, authkey=authkey)
+        self.address: Address = self._listener.address
+        # Куски к отправке: куча (позиция во входе, кусок).
+        self._pending: List[Tuple[int, Shard]] = list(
+            enumerate(self.shards))
+        self._positions = {shard.shard_id: position
+                           for position, shard in self._pending}
+        self._position = 0
+        self._workers = 0
+        self._idle_since = time.monotonic()
+        self._closed = False
+        self._attempts: Dict[int, int] = {}
+        self._lines: Dict[int, List[str]] = {}
+        self._reports: Dict[int, ShardReport] = {}
+        self._failed: Dict[int, str] = {}
+        self._condition = threading.Condition()
+        self._started = 0.0
+        self._finished: Optional[float] = None
+
+    def start(self) -> None:
+        self._started = time.perf_counter()
+        self._idle_since = time.monotonic()
+        if not self.shards:
+            self._finished = self._started
+        threading.Thread(target=self._accept, daemon=True,
+                         name='coordinator-accept').start()
+
+    def _accept(self) -> None:
+        while True:
+            try:
+                connection = self._listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(connection,),
+                             daemon=True).start()
+
+    def _complete(self) -> bool:
+        return len(self._reports) + len(self._failed) == len(self.shards)
+
+    def _next_shard(self) -> Optional[Shard]:
+        """Следующий кусок в окне max_ahead или None, если их не будет.
+
+        Вызывается под self._condition.
+        """
+        while not (self._closed or self._complete()):
+            if self._pending and (self._pending[0][0]
+                                  < self._position + self.max_ahead):
+                _, shard = heapq.heappop(self._pending)
+                self._attempts[shard.shard_id] = (
+                    self._attempts.get(shard.shard_id, 0) + 1)
+                return shard
+            self._condition.wait()
+        return None
+
+    def _serve(self, connection: Connection) -> None:
+        """Обслуживать одного воркера, пока есть куски."""
+        with connection:
+            try:
+                _, worker = connection.recv()
+            except (EOFError, OSError, ValueError):
+                return
+            with self._condition:
+                self._workers += 1
+            try:
+                self._serve_worker(connection, worker)
+            finally:
+                with self._condition:
+                    self._workers -= 1
+                    if not self._workers:
+                        self._idle_since = time.monotonic()
+                    self._condition.notify_all()
+
+    def _serve_worker(self, connection: Connection, worker: str) -> None:
+        while True:
+            with self._condition:
+                shard = self._next_shard()
+            if shard is None:
+                self._send_stop(connection)
+                return
+            try:
+                reply = self._dispatch(connection, shard)
+            except (EOFError, OSError, TimeoutError) as exc:
+                self._retry(shard, f'{worker}: {type(exc).__name__}')
+                return
+            if reply[0] == 'error':
+                _, _, error, retryable = reply
+                self._retry(shard, f'{worker}: {error}', retryable)
+                continue
+            _, shard_id, count, seconds, lines, rejects = reply
+            self._store(ShardReport(shard_id, worker,
+                                    self._attempts[shard_id],
+                                    count, seconds, rejects), lines)
+
+    def _dispatch(self, connection: Connection, shard: Shard) -> tuple:
+        connection.send(('shard', shard))
+        if self.shard_timeout is not None \
+                and not connection.poll(self.shard_timeout):
+            raise TimeoutError
+        return connection.recv()
+
+    @staticmethod
+    def _send_stop(connection: Connection) -> None:
+        try:
+            connection.send(('stop',))
+        except OSError:
+            pass
+
+    def _retry(self, shard: Shard, error: str,
+               retryable: bool = True) -> None:
+        """Вернуть кусок в очередь или признать его нерассчитанным."""
+        with self._condition:
+            if retryable and (self._attempts[shard.shard_id]
+                              < self.max_attempts):
+                heapq.heappush(self._pending,
+                               (self._positions[shard.shard_id], shard))
+                self._condition.notify_all()
+                return
+            self._failed[shard.shard_id] = error
+            self._mark_finished()
+
+    def _store(self, report: ShardReport, lines: List[str]) -> None:
+        with self._condition:
+            self._reports[report.shard_id] = report
+            self._lines[report.shard_id] = lines
+            self._mark_finished()
+
+    def _mark_finished(self) -> None:
+        """Разбудить ожидающих; вызывается под self._condition."""
+        if self._complete():
+            self._finished = time.perf_counter()
+        self._condition.notify_all()
+
+    def results(self) -> Iterator[str]:
+        """Строки сообщений всех кусков в порядке входа.
+
+        Исключения
+        ----------
+        ShardError
+            очередной по порядку кусок не рассчитан
+            за max_attempts попыток, его файл не разбирается
+            или живых воркеров нет
+            дольше worker_timeout секунд
+        """
+        for position, shard in enumerate(self.shards):
+            with self._condition:
+                self._wait_for(shard)
+                lines = self._lines.pop(shard.shard_id)
+                self._position = position + 1
+                self._condition.notify_all()
+            yield from lines
+
+    def _wait_for(self, shard: Shard) -> None:
+        """Дождаться строк куска; вызывается под self._condition."""
+        while shard.shard_id not in self._lines:
+            if shard.shard_id in self._failed:
+                raise ShardError(f'Кусок {shard.shard_id} не рассчитан: '
+                                 f'{self._failed[shard.shard_id]}')
+            timeout = None
+            if not self._workers and self.worker_timeout is not None:
+                timeout = (self._idle_since + self.worker_timeout
+                           - time.monotonic())
+                if timeout <= 0:
+                    raise ShardError(
+                        f'Кусок {shard.shard_id} не рассчитан: нет живых '
+                        f'воркеров дольше {self.worker_timeout} с')
+            self._condition.wait(timeout)
+
+    def report(self) -> ClusterReport:
+        """Отчёт о рассчитанных кусках на текущий момент."""
+        with self._condition:
+            shards = sorted(self._reports.values(),
+                            key=lambda item: item.shard_id)
+            failed = dict(self._failed)
+            finished = self._finished
+        end = finished if finished is not None else time.perf_counter()
+        report = ClusterReport(sum(shard.packages for shard in shards),
+                               end - self._started, shards, failed)
+        if len(shards) > 1:
+            median = statistics.median(shard.seconds for shard in shards)
+            report.stragglers = [
+                shard for shard in shards
+                if shard.seconds > self.straggler_factor * median]
+        return report
+
+    def close(self) -> None:
+        """Перестать принимать воркеров и отпустить подключённых."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._listener.close()
+
+    def __enter__(self) -> 'Coordinator':
+        self.start()
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+
+def start_local_workers(address: Address,
+                        authkey: bytes,
+                        count: int) -> List[Process]:
+    """Запустить count воркеров-процессов на этой машине."""
+    workers = [Process(target=run_worker, args=(address, authkey),
+                       daemon=True) for _ in range(count)]
+    for worker in workers:
+        worker.start()
+    return workers
+
+
+def _address(text: str) -> Address:
+    host, _, port = text.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+def _parse_args(argv: Sequence[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog='cli.py cluster',
+        description='Распределённый расчёт файлов пакетов.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    coordinate = commands.add_parser('coordinate',
+                                     help='раздать куски и собрать итог')
+    coordinate.add_argument('paths', nargs='+')
+    coordinate.add_argument('--listen', type=_address,
+                            default=('127.0.0.1', 0))
+    coordinate.add_argument('--local-workers', type=int, default=0,
+                            help='сколько воркеров запустить здесь же')
+    coordinate.add_argument('--shard-bytes', type=int,
+                            default=DEFAULT_SHARD_BYTES)
+    coordinate.add_argument('--max-attempts', type=int,
+                            default=DEFAULT_MAX_ATTEMPTS)
+    coordinate.add_argument('--shard-timeout', type=float, default=None)
+    coordinate.add_argument('--max-ahead', type=int,
+                            default=DEFAULT_MAX_AHEAD,
+                            help='на сколько кусков раздача может '
+                                 'опережать вывод')
+    coordinate.add_argument('--worker-timeout', type=float,
+                            default=DEFAULT_WORKER_TIMEOUT,
+                            help='сколько секунд ждать, если живых '
+                                 'воркеров нет')
+    work = commands.add_parser('work', help='подключиться к координатору')
+    work.add_argument('--connect', type=_address, required=True)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Точка входа: `cli.py cluster coordinate|work ...`.
+
+    Ключ проверки подключений берётся из переменной окружения
+    WORKOUT_CLUSTER_KEY; координатор и воркеры должны видеть
+    одинаковые пути к файлам пакетов.
+    """
+    args = _parse_args(sys.argv[1:] if argv is None else argv)
+    authkey = os.environ.get(AUTHKEY_ENV, '').encode('utf-8')
+    if not authkey:
+        raise SystemExit(f'Задайте ключ в переменной {AUTHKEY_ENV}')
+    if args.command == 'work':
+        run_worker(args.connect, authkey)
+        return 0
+    coordinator = Coordinator(
+        make_shards(args.paths, args.shard_bytes), authkey, args.listen,
+        args.max_attempts, args.shard_timeout,
+        max_ahead=args.max_ahead, worker_timeout=args.worker_timeout)
+    print(f'Координатор слушает {coordinator.address[0]}:'
+          f'{coordinator.address[1]}', file=sys.stderr)
+    with coordinator:
+        start_local_workers(coordinator.address, authkey, args.local_workers)
+        try:
+            for line in coordinator.results():
+                sys.stdout.write(line + '\n')
+        finally:
+            print(coordinator.report().format(), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,454 @@
+import itertools
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+from array import array
+from typing import IO, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from batch import (CODE_CLASS, EXTRA_COLUMNS, Columns, ColumnarResult,
+                   score_packages)
+from compact import InfoMessageColumns
+from homework import InfoMessage
+
+MAGIC = b'WKCL'
+VERSION = 1
+HEADER = struct.Struct('<4sHHQI')
+ALIGNMENT = 8
+FLOAT_COLUMNS = ('duration', 'distance', 'speed', 'calories')
+RAW_MAGIC = b'WKRW'
+RAW_COLUMNS = ('action', 'duration', 'weight', 'height', 'length_pool',
+               'count_pool')
+COLUMN_NAMES = {MAGIC: FLOAT_COLUMNS, RAW_MAGIC: RAW_COLUMNS}
+MAX_TYPES = 256
+DEFAULT_CHUNK_ROWS = 65536
+
+Results = Union[ColumnarResult, InfoMessageColumns, Iterable[InfoMessage]]
+
+
+class FormatError(ValueError):
+    """Файл не является колоночным файлом результатов."""
+
+
+def _padding(size: int) -> bytes:
+    return b'\0' * (-size % ALIGNMENT)
+
+
+def _little_endian(column: array) -> bytes:
+    """Байты колонки в порядке little-endian."""
+    if sys.byteorder == 'little':
+        return column.tobytes()
+    swapped = array(column.typecode, column)
+    swapped.byteswap()
+    return swapped.tobytes()
+
+
+def _type_codes(names: Iterable[str]) -> Tuple[List[str], array]:
+    """Таблица имён и индексы имён по одному байту на строку.
+
+    Исключения
+    ----------
+    FormatError
+        имён больше MAX_TYPES: индекс не помещается в байт
+    """
+    table: Dict[str, int] = {}
+    indexes = [table.setdefault(name, len(table)) for name in names]
+    _check_types(table)
+    return list(table), array('B', indexes)
+
+
+def _check_types(types: Sequence[str]) -> None:
+    if len(types) > MAX_TYPES:
+        raise FormatError(f'Больше {MAX_TYPES} видов тренировок')
+
+
+def _as_columns(results: Results) -> Tuple[List[str], array, List[array]]:
+    """Привести результаты к таблице имён, индексам типов и колонкам.
+
+    Исключения
+    ----------
+    FormatError
+        видов тренировок больше MAX_TYPES
+    """
+    if isinstance(results, ColumnarResult):
+        types, codes = _type_codes(results.training_type)
+        return (types, codes,
+                [array('d', getattr(results, name))
+                 for name in FLOAT_COLUMNS])
+    if not isinstance(results, InfoMessageColumns):
+        results = InfoMessageColumns(results)
+    _check_types(results.types)
+    return (results.types, results.type_index,
+            [getattr(results, name) for name in FLOAT_COLUMNS])
+
+
+def data_offset(names_size: int, rows: int) -> int:
+    """Смещение первой колонки float64 от начала файла."""
+    offset = HEADER.size + names_size
+    offset += len(_padding(offset))
+    return offset + rows + len(_padding(rows))
+
+
+def _prefix(magic: bytes, types: Sequence[str], codes: bytes) -> List[bytes]:
+    """Заголовок, таблица имён и колонка индексов типов с выравниванием."""
+    names = '\n'.join(types).encode('utf-8')
+    return [HEADER.pack(magic, VERSION, 0, len(codes), len(names)),
+            names, _padding(HEADER.size + len(names)),
+            codes, _padding(len(codes))]
+
+
+def write_prefix(output: IO[bytes],
+                 types: Sequence[str],
+                 codes: bytes,
+                 magic: bytes = MAGIC) -> int:
+    """Записать всё, что идёт перед колонками float64.
+
+    Колонки потом можно дописывать по частям с позиции, которую
+    возвращает функция (см. rescore): колонка с номером n
+    начинается на 8 * n * len(codes) байт дальше.
+
+    Возвращаемое значение
+    ---------------------
+    Смещение первой колонки: int
+    """
+
+    output.writelines(_prefix(magic, types, codes))
+    return data_offset(len('\n'.join(types).encode('utf-8')), len(codes))
+
+
+def _write_sections(target: Union[str, IO[bytes]],
+                    magic: bytes,
+                    types: Sequence[str],
+                    codes: array,
+                    floats: Iterable[array]) -> int:
+    parts = _prefix(magic, types, codes.tobytes())
+    parts.extend(_little_endian(column) for column in floats)
+    if isinstance(target, str):
+        with open(target, 'wb') as output:
+            output.writelines(parts)
+    else:
+        target.writelines(parts)
+    return len(codes)
+
+
+def write_columnar(target: Union[str, IO[bytes]], results: Results) -> int:
+    """Записать результаты в колоночный двоичный файл.
+
+    Формат (все числа little-endian):
+        заголовок `<4sHHQI`: b'WKCL', версия, 0, число строк,
+            длина таблицы имён;
+        таблица имён тренировок в UTF-8 через '\\n';
+        колонка индексов типа тренировки, uint8 на строку;
+        колонки duration, distance, speed, calories, float64.
+    Каждая секция выровнена на 8 байт, поэтому колонки можно
+    отображать в память и читать как массивы без разбора.
+
+    Параметры
+    ---------
+    target: Union[str, IO[bytes]]
+        путь или двоичный файл
+    results: ColumnarResult, InfoMessageColumns или Iterable[InfoMessage]
+        результаты расчёта
+
+    Возвращаемое значение
+    ---------------------
+    Количество записанных строк: int
+
+    Исключения
+    ----------
+    FormatError
+        видов тренировок больше MAX_TYPES
+    """
+
+    types, codes, floats = _as_columns(results)
+    return _write_sections(target, MAGIC, types, codes, floats)
+
+
+def write_raw(target: Union[str, IO[bytes]], columns: Columns) -> int:
+    """Записать исходные параметры пакетов в колоночный файл.
+
+    Формат тот же, что у write_columnar, но с сигнатурой b'WKRW':
+    таблица имён — коды тренировок, колонки — RAW_COLUMNS. По такому
+    файлу историю можно пересчитать без разбора пакетов
+    (см. rescore).
+
+    Возвращаемое значение
+    ---------------------
+    Количество записанных строк: int
+    """
+
+    return _write_sections(target, RAW_MAGIC, *_raw_columns(columns))
+
+
+def _raw_columns(columns: Columns) -> Tuple[List[str], array, List[array]]:
+    """Таблица кодов, индексы кодов и колонки RAW_COLUMNS пакетов."""
+    types, codes = _type_codes(columns.codes)
+    return types, codes, [getattr(columns, name) for name in RAW_COLUMNS]
+
+
+class ColumnarFile:
+    """
+    Класс. Колоночный файл результатов, отображённый в память.
+
+    Колонки — memoryview поверх mmap, данные не копируются и
+    не разбираются. Объект нужно закрыть (или использовать with).
+
+    Атрибуты
+    --------
+    types: List[str]
+        таблица имён тренировок
+    type_index: memoryview
+        индекс имени тренировки для каждой строки
+    duration, distance, speed, calories: memoryview
+        колонки float64
+
+    Методы
+    ------
+    training_type(self, index) -> str:
+        Имя тренировки в строке index.
+    to_result(self) -> ColumnarResult:
+        Скопировать данные в ColumnarResult.
+    close(self) -> None:
+        Освободить отображение.
+    """
+
+    MAGIC = MAGIC
+    COLUMNS = FLOAT_COLUMNS
+
+    def __init__(self, path: str) -> None:
+        with open(path, 'rb') as source:
+            if not os.fstat(source.fileno()).st_size:
+                raise FormatError('Файл пуст')
+            self._map = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views: List[memoryview] = []
+        try:
+            self._open()
+        except Exception:
+            self.close()
+            raise
+
+    def _open(self) -> None:
+        if len(self._map) < HEADER.size:
+            raise FormatError('Файл короче заголовка')
+        magic, version, _, rows, names_size = HEADER.unpack_from(self._map)
+        if magic != self.MAGIC:
+            raise FormatError('Неверная сигнатура файла')
+        if version != VERSION:
+            raise FormatError(f'Неподдерживаемая версия {version}')
+        if sys.byteorder != 'little':
+            raise FormatError('Чтение без копирования требует '
+                              'little-endian платформы')
+        view = memoryview(self._map)
+        self._views.append(view)
+        offset = HEADER.size
+        names = bytes(view[offset:offset + names_size]).decode('utf-8')
+        self.types: List[str] = names.split('\n') if names else []
+        offset += names_size + len(_padding(offset + names_size))
+        start = data_offset(names_size, rows)
+        if len(self._map) < start + 8 * rows * len(self.COLUMNS):
+            raise FormatError('Файл обрезан')
+        self.type_index = view[offset:offset + rows]
+        self._views.append(self.type_index)
+        for name in self.COLUMNS:
+            column = view[start:start + 8 * rows].cast('d')
+            self._views.append(column)
+            setattr(self, name, column)
+            start += 8 * rows
+
+    def __len__(self) -> int:
+        return len(self.type_index)
+
+    def training_type(self, index: int) -> str:
+        """Имя тренировки в строке index."""
+        return self.types[self.type_index[index]]
+
+    def __getitem__(self, index: int) -> InfoMessage:
+        return InfoMessage(self.training_type(index),
+                           self.duration[index],
+                           self.distance[index],
+                           self.speed[index],
+                           self.calories[index])
+
+    def to_result(self) -> ColumnarResult:
+        """Скопировать данные файла в ColumnarResult."""
+        return ColumnarResult([self.types[code] for code in self.type_index],
+                              array('d', self.duration),
+                              array('d', self.distance),
+                              array('d', self.speed),
+                              array('d', self.calories))
+
+    def close(self) -> None:
+        """Освободить представления и отображение файла."""
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._map.close()
+
+    def __enter__(self) -> 'ColumnarFile':
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+
+class ColumnarWriter:
+    """
+    Класс. Запись колоночного файла по частям.
+
+    Число строк и таблица имён идут в начале файла, а известны
+    только в конце, поэтому колонки копятся во временных файлах:
+    память не зависит от числа строк. Файл target собирается
+    в close(); если блок with завершился исключением, target
+    не создаётся.
+
+    Атрибуты
+    --------
+    magic: bytes
+        MAGIC — файл результатов, RAW_MAGIC — файл параметров
+        пакетов (как write_raw)
+    rows: int
+        сколько строк записано
+
+    Методы
+    ------
+    extend(self, results) -> None:
+        Дописать часть результатов или пакетов.
+    close(self) -> None:
+        Собрать файл target.
+    """
+
+    def __init__(self,
+                 target: Union[str, IO[bytes]],
+                 magic: bytes = MAGIC) -> None:
+        self.target = target
+        self.magic = magic
+        self.rows = 0
+        self._table: Dict[str, int] = {}
+        self._spools: List[IO[bytes]] = [
+            tempfile.TemporaryFile()
+            for _ in range(1 + len(COLUMN_NAMES[magic]))]
+
+    def extend(self, results: Union[Results, Columns]) -> None:
+        """Дописать часть строк.
+
+        Для файла результатов — то же, что принимает write_columnar,
+        для файла параметров — Columns, как у write_raw.
+
+        Исключения
+        ----------
+        FormatError
+            в файле оказалось больше MAX_TYPES имён тренировок
+        """
+        if self.magic == RAW_MAGIC:
+            types, codes, floats = _raw_columns(results)
+        else:
+            types, codes, floats = _as_columns(results)
+        remap = [self._table.setdefault(name, len(self._table))
+                 for name in types]
+        if len(self._table) > MAX_TYPES:
+            raise FormatError(f'Больше {MAX_TYPES} видов тренировок')
+        translation = bytes(remap) + bytes(MAX_TYPES - len(remap))
+        self._spools[0].write(codes.tobytes().translate(translation))
+        for spool, column in zip(self._spools[1:], floats):
+            spool.write(_little_endian(column))
+        self.rows += len(codes)
+
+    def _assemble(self, output: IO[bytes]) -> None:
+        names = '\n'.join(self._table).encode('utf-8')
+        output.writelines([
+            HEADER.pack(self.magic, VERSION, 0, self.rows, len(names)),
+            names, _padding(HEADER.size + len(names))])
+        for number, spool in enumerate(self._spools):
+            spool.seek(0)
+            shutil.copyfileobj(spool, output)
+            if not number:
+                output.write(_padding(self.rows))
+
+    def close(self) -> None:
+        """Собрать файл target и удалить временные колонки."""
+        if not self._spools:
+            return
+        try:
+            if isinstance(self.target, str):
+                with open(self.target, 'wb') as output:
+                    self._assemble(output)
+            else:
+                self._assemble(self.target)
+        finally:
+            self._discard()
+
+    def _discard(self) -> None:
+        for spool in self._spools:
+            spool.close()
+        self._spools = []
+
+    def __enter__(self) -> 'ColumnarWriter':
+        return self
+
+    def __exit__(self, exc_type: Optional[type], *args: object) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self._discard()
+
+
+def write_packages(target: Union[str, IO[bytes]],
+                   packages: Iterable[Tuple[str, Sequence[float]]],
+                   chunk_rows: int = DEFAULT_CHUNK_ROWS) -> int:
+    """Рассчитать пакеты и записать результаты в колоночный файл.
+
+    Пакеты считаются кусками по chunk_rows, так что память
+    не зависит от длины входа.
+
+    Возвращаемое значение
+    ---------------------
+    Количество записанных строк: int
+    """
+
+    packages = iter(packages)
+    with ColumnarWriter(target) as writer:
+        for chunk in iter(lambda: list(itertools.islice(packages,
+                                                        chunk_rows)), []):
+            writer.extend(score_packages(chunk))
+    return writer.rows
+
+
+class RawFile(ColumnarFile):
+    """
+    Класс. Файл исходных параметров пакетов (write_raw) в памяти.
+
+    types — таблица кодов тренировок, колонки — RAW_COLUMNS
+    (action, duration, weight, height, length_pool, count_pool).
+    Строка файла — пакет в том виде, что принимает read_package.
+
+    Методы
+    ------
+    code(self, index) -> str:
+        Код тренировки в строке index.
+    to_columns(self) -> Columns:
+        Скопировать данные в batch.Columns.
+    """
+
+    MAGIC = RAW_MAGIC
+    COLUMNS = RAW_COLUMNS
+
+    def code(self, index: int) -> str:
+        """Код тренировки в строке index."""
+        return self.types[self.type_index[index]]
+
+    def __getitem__(self, index: int) -> Tuple[str, List[float]]:
+        code = self.code(index)
+        extra = EXTRA_COLUMNS.get(CODE_CLASS.get(code))
+        if extra is None:
+            raise FormatError(f'Для кода {code!r} нет колоночного ядра')
+        data = [self.action[index], self.duration[index], self.weight[index]]
+        data += [getattr(self, name)[index] for name in extra]
+        return code, data
+
+    def to_columns(self) -> Columns:
+        """Скопировать данные файла в batch.Columns."""
+        return Columns([self.types[code] for code in self.type_index],
+                       *(array('d', getattr(self, name))
+                         for name in RAW_COLUMNS))
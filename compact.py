@@ -0,0 +1,200 @@
+import inspect
+from array import array
+from dataclasses import dataclass
+from typing import (Any, Dict, Iterable, Iterator, List, Sequence, Type,
+                    Union)
+
+import homework
+
+
+@dataclass
+class InfoMessage:
+    """
+    Класс. Информационное сообщение о тренировке без __dict__.
+
+    Атрибуты и метод get_message совпадают с homework.InfoMessage.
+    """
+
+    __slots__ = ('training_type', 'duration', 'distance', 'speed',
+                 'calories')
+
+    training_type: str
+    duration: float
+    distance: float
+    speed: float
+    calories: float
+
+    get_message = homework.InfoMessage.get_message
+
+
+class Training:
+    """
+    Класс. Базовый класс компактных тренировок без __dict__.
+
+    Компактный класс строит compact_class по зарегистрированному
+    классу homework: поля — параметры конструктора, константы
+    и методы копируются из исходного класса. show_training_info
+    возвращает компактный InfoMessage.
+    """
+
+    __slots__ = ()
+
+    def show_training_info(self) -> InfoMessage:
+        """Возвращает информационное сообщение о выполненной тренировке."""
+        return InfoMessage(type(self).__name__,
+                           self.duration,
+                           self.get_distance(),
+                           self.get_mean_speed(),
+                           self.get_spent_calories())
+
+
+INIT_SOURCE = '''\
+def __init__(self, {parameters}):
+{assignments}
+'''
+
+_COMPACT: Dict[type, Type[Training]] = {}
+
+
+def _build(training_class: Type[homework.Training]) -> Type[Training]:
+    """Компактный класс со слотами по параметрам конструктора."""
+    fields = list(inspect.signature(
+        training_class.__init__).parameters)[1:]
+    assignments = '\n'.join(f'    self.{name} = {name}' for name in fields)
+    namespace: Dict[str, Any] = {}
+    exec(INIT_SOURCE.format(parameters=', '.join(fields),
+                            assignments=assignments), namespace)
+    namespace.update(__slots__=tuple(fields), __module__=__name__,
+                     __qualname__=training_class.__qualname__)
+    own = set(fields)
+    if (training_class.show_training_info
+            is homework.Training.show_training_info):
+        own.add('show_training_info')
+    for name in dir(training_class):
+        if not name.startswith('__') and name not in own:
+            namespace[name] = inspect.getattr_static(training_class, name)
+    return type(training_class.__name__, (Training,), namespace)
+
+
+def compact_class(training_class: Type[homework.Training]
+                  ) -> Type[Training]:
+    """Компактный класс для класса тренировки homework.
+
+    Класс строится один раз: константы и методы (в том числе
+    staticmethod, classmethod и property) копируются в его
+    пространство имён как есть, так что обращение к ним стоит
+    столько же, сколько в обычном классе, а поздние изменения
+    класса-источника компактный класс не видит. Компактный класс
+    наследует compact.Training, а не training_class: у подкласса
+    обычного класса был бы __dict__. Поля объекта — параметры
+    конструктора: как и в homework, конструктор должен сохранять
+    параметры под их именами.
+    Объекты меньше обычных примерно в 1,6 раза; трёхкратная
+    экономия достигается только колоночным InfoMessageColumns.
+    """
+    compact = _COMPACT.get(training_class)
+    if compact is None:
+        compact = _COMPACT[training_class] = _build(training_class)
+    return compact
+
+
+Running = compact_class(homework.Running)
+SportsWalking = compact_class(homework.SportsWalking)
+Swimming = compact_class(homework.Swimming)
+
+
+def read_package(workout_type: str,
+                 data: Sequence[float]
+                 ) -> Training:
+    """Аналог homework.read_package, создающий компактные объекты.
+
+    Исключения
+    ----------
+    UnknownWorkoutError, PackageArityError, PackageValueError
+        как у homework.read_package
+    """
+    training_class = homework.package_class(workout_type, data)
+    homework.check_values(workout_type, data)
+    return compact_class(training_class)(*data)
+
+
+MAX_TYPES = 256
+
+Message = Union[InfoMessage, homework.InfoMessage]
+
+
+class InfoMessageColumns:
+    """
+    Класс. Набор результатов InfoMessage в виде колонок (struct-of-arrays).
+
+    Числовые поля хранятся в array('d') по 8 байт на значение,
+    тип тренировки — номером в таблице имён: 1 байт на строку,
+    а после MAX_TYPES имён колонка расширяется до 2 байт.
+
+    Методы
+    ------
+    append(self, info) -> None:
+        Добавить одно сообщение.
+    extend(self, infos) -> None:
+        Добавить несколько сообщений.
+    nbytes(self) -> int:
+        Объём данных колонок в байтах.
+    """
+
+    __slots__ = ('types', 'type_index', 'duration', 'distance', 'speed',
+                 'calories', '_type_codes')
+
+    def __init__(self, infos: Iterable[Message] = ()) -> None:
+        self.types: List[str] = []
+        self._type_codes: Dict[str, int] = {}
+        self.type_index = array('B')
+        self.duration = array('d')
+        self.distance = array('d')
+        self.speed = array('d')
+        self.calories = array('d')
+        self.extend(infos)
+
+    def _code(self, training_type: str) -> int:
+        """Номер типа тренировки в таблице имён."""
+        code = self._type_codes.get(training_type)
+        if code is None:
+            code = len(self.types)
+            if code == MAX_TYPES:
+                self.type_index = array('H', self.type_index)
+            self.types.append(training_type)
+            self._type_codes[training_type] = code
+        return code
+
+    def append(self, info: Message) -> None:
+        """Добавить одно сообщение."""
+        code = self._code(info.training_type)
+        self.type_index.append(code)
+        self.duration.append(info.duration)
+        self.distance.append(info.distance)
+        self.speed.append(info.speed)
+        self.calories.append(info.calories)
+
+    def extend(self, infos: Iterable[Message]) -> None:
+        """Добавить несколько сообщений."""
+        for info in infos:
+            self.append(info)
+
+    def __len__(self) -> int:
+        return len(self.type_index)
+
+    def __getitem__(self, index: int) -> InfoMessage:
+        return InfoMessage(self.types[self.type_index[index]],
+                           self.duration[index],
+                           self.distance[index],
+                           self.speed[index],
+                           self.calories[index])
+
+    def __iter__(self) -> Iterator[InfoMessage]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def nbytes(self) -> int:
+        """Объём данных колонок в байтах (без таблицы имён)."""
+        return sum(column.itemsize * len(column)
+                   for column in (self.type_index, self.duration,
+                                  self.distance, self.speed, self.calories))
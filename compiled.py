@@ -0,0 +1,279 @@
+import math
+from typing import (Callable, Dict, Iterable, Iterator, List, Optional,
+                    Sequence, Tuple)
+
+from homework import (WORKOUT_CLASSES, InfoMessage, PackageError,
+                      PackageValueError, Reject, Running, SportsWalking,
+                      Swimming, Training, check_values, package_class)
+
+Scorer = Callable[..., InfoMessage]
+Package = Tuple[str, Sequence[float]]
+
+# Константы классов, которые подставляются в код литералами.
+CONSTANTS = ('LEN_STEP', 'M_IN_KM', 'HOUR_IN_MIN',
+             'COEFF_CALORIE_1', 'COEFF_CALORIE_2')
+
+# Фрагменты кода по методам базовых классов. Выражения повторяют
+# формулы методов в том же порядке операций, так что результат
+# совпадает с show_training_info до бита.
+PARAMETERS: Dict[Callable, Tuple[str, ...]] = {
+    Training.__init__: ('action', 'duration', 'weight'),
+    SportsWalking.__init__: ('action', 'duration', 'weight', 'height'),
+    Swimming.__init__: ('action', 'duration', 'weight',
+                        'length_pool', 'count_pool'),
+}
+DISTANCE: Dict[Callable, str] = {
+    Training.get_distance: 'action * {LEN_STEP} / {M_IN_KM}',
+}
+SPEED: Dict[Callable, str] = {
+    Training.get_mean_speed: 'distance / duration',
+    Swimming.get_mean_speed:
+        'length_pool * count_pool / {M_IN_KM} / duration',
+}
+CALORIES: Dict[Callable, str] = {
+    Running.get_spent_calories:
+        '({COEFF_CALORIE_1} * speed - {COEFF_CALORIE_2}) * weight'
+        ' / {M_IN_KM} * duration * {HOUR_IN_MIN}',
+    SportsWalking.get_spent_calories:
+        '({COEFF_CALORIE_1} * weight + (speed ** 2 // height)'
+        ' * {COEFF_CALORIE_2} * weight) * duration * {HOUR_IN_MIN}',
+    Swimming.get_spent_calories:
+        '(speed + {COEFF_CALORIE_1}) * {COEFF_CALORIE_2} * weight',
+}
+
+SOURCE = '''\
+def score({parameters}):
+    distance = {distance}
+    speed = {speed}
+    calories = {calories}
+    return InfoMessage({name!r}, duration, distance, speed, calories)
+'''
+
+
+def _literal(value: object) -> Optional[str]:
+    """Запись константы литералом Python или None, если так нельзя."""
+    if type(value) not in (int, float) or not math.isfinite(value):
+        return None
+    text = repr(value)
+    return text if value >= 0 else f'({text})'
+
+
+def formulas(cls: type) -> Optional[Tuple[Tuple[str, ...], str, str, str]]:
+    """Параметры конструктора и формулы дистанции, скорости и калорий.
+
+    Формулы — выражения Python над параметрами и переменными
+    distance и speed, константы класса в них стоят литералами.
+
+    Возвращаемое значение
+    ---------------------
+    (параметры, дистанция, скорость, калории) или None, если
+    в классе переопределён метод с неизвестной формулой либо
+    нужная константа — не конечное int или float.
+    """
+
+    if cls.show_training_info is not Training.show_training_info:
+        return None
+    parameters = PARAMETERS.get(cls.__init__)
+    fragments = (DISTANCE.get(cls.get_distance),
+                 SPEED.get(cls.get_mean_speed),
+                 CALORIES.get(cls.get_spent_calories))
+    if parameters is None or None in fragments:
+        return None
+    constants = {}
+    for name in CONSTANTS:
+        literal = _literal(getattr(cls, name, None))
+        if literal is not None:
+            constants[name] = literal
+    try:
+        distance, speed, calories = (fragment.format_map(constants)
+                                     for fragment in fragments)
+    except KeyError:
+        return None
+    return parameters, distance, speed, calories
+
+
+def generate_source(cls: type) -> Optional[str]:
+    """Исходный код плоской функции расчёта для класса тренировки.
+
+    Функция принимает параметры конструктора и возвращает то же,
+    что cls(...).show_training_info(), но без объекта, вызовов
+    методов и поиска констант по MRO: константы класса стоят
+    в коде литералами.
+
+    Возвращаемое значение
+    ---------------------
+    Исходный код функции score или None, если formulas
+    не может построить формулы класса.
+    """
+
+    parts = formulas(cls)
+    if parts is None:
+        return None
+    parameters, distance, speed, calories = parts
+    return SOURCE.format(parameters=', '.join(parameters),
+                         distance=distance, speed=speed,
+                         calories=calories, name=cls.__name__)
+
+
+def compile_scorer(cls: type) -> Scorer:
+    """Плоская функция расчёта для класса тренировки.
+
+    Если generate_source не может построить код, возвращается
+    функция, считающая через сам класс: cls(*data).show_training_info().
+    """
+    source = generate_source(cls)
+    if source is None:
+        def score(*data: float) -> InfoMessage:
+            return cls(*data).show_training_info()
+    else:
+        namespace = {'InfoMessage': InfoMessage}
+        exec(compile(source, f'<compiled {cls.__name__}>', 'exec'),
+             namespace)
+        score = namespace['score']
+    score.__name__ = score.__qualname__ = f'score_{cls.__name__}'
+    return score
+
+
+def _signature(cls: type) -> tuple:
+    """То, от чего зависит код функции расчёта класса."""
+    return (tuple(getattr(cls, name, None) for name in CONSTANTS)
+            + (cls.__init__, cls.get_distance, cls.get_mean_speed,
+               cls.get_spent_calories, cls.show_training_info))
+
+
+_COMPILED: Dict[type, Tuple[tuple, Scorer]] = {}
+
+
+def scorer_for(cls: type) -> Scorer:
+    """Функция расчёта класса, скомпилированная один раз.
+
+    Если константы или методы класса с тех пор поменялись,
+    функция компилируется заново.
+    """
+    signature = _signature(cls)
+    cached = _COMPILED.get(cls)
+    if cached is None or cached[0] != signature:
+        cached = _COMPILED[cls] = (signature, compile_scorer(cls))
+    return cached[1]
+
+
+def compile_registry() -> Dict[str, Scorer]:
+    """Скомпилировать функции расчёта всех зарегистрированных классов.
+
+    Возвращаемое значение
+    ---------------------
+    Словарь код тренировки -> функция расчёта.
+    """
+    return {code: scorer_for(cls) for code, cls in WORKOUT_CLASSES.items()}
+
+
+def score_packages(packages: Iterable[Package]) -> List[InfoMessage]:
+    """Рассчитать пакеты, как read_package(...).show_training_info().
+
+    Исключения
+    ----------
+    UnknownWorkoutError, PackageArityError, PackageValueError
+        как у read_package
+    """
+    scorers: Dict[type, Scorer] = {}
+    infos = []
+    for workout_type, data in packages:
+        cls = package_class(workout_type, data)
+        check_values(workout_type, data)
+        scorer = scorers.get(cls)
+        if scorer is None:
+            scorer = scorers[cls] = scorer_for(cls)
+        infos.append(scorer(*data))
+    return infos
+
+
+def reject_arithmetic(exc: ArithmeticError,
+                      index: int,
+                      package: Package,
+                      rejects: Optional[List[Reject]]) -> None:
+    """Отбраковать пакет, на котором расчёт бросил ArithmeticError.
+
+    Параметры
+    ---------
+    exc: ArithmeticError
+        ошибка расчёта, например переполнение квадрата скорости
+    index: int
+        номер пакета во входном потоке
+    package: Tuple[str, Sequence[float]]
+        пакет (workout_type, data)
+    rejects: List[Reject]
+        куда сложить пакет с причиной bad_value
+
+    Исключения
+    ----------
+    PackageValueError
+        rejects не передан
+    """
+
+    error = PackageValueError(f'Расчёт не удался: {type(exc).__name__}: {exc}')
+    if rejects is None:
+        raise error from exc
+    rejects.append(Reject(index, *package, error.reason, str(error)))
+
+
+def _checked(packages: Iterable[Package],
+             rejects: Optional[List[Reject]]
+             ) -> Iterator[Tuple[int, str, type, Sequence[float]]]:
+    """Корректные пакеты с номерами во входном потоке."""
+    for index, (workout_type, data) in enumerate(packages):
+        try:
+            cls = package_class(workout_type, data)
+            check_values(workout_type, data)
+        except PackageError as exc:
+            if rejects is None:
+                raise
+            rejects.append(Reject(index, workout_type, data, exc.reason,
+                                  str(exc)))
+            continue
+        yield index, workout_type, cls, data
+
+
+def iter_checked(packages: Iterable[Package],
+                 rejects: Optional[List[Reject]] = None
+                 ) -> Iterator[Tuple[str, type, Sequence[float]]]:
+    """Корректные пакеты как (workout_type, класс тренировки, data).
+
+    Пакеты проверяются теми же функциями, что и в read_package,
+    и отбраковываются так же, как в homework.read_packages.
+
+    Параметры
+    ---------
+    packages: Iterable[Tuple[str, Sequence[float]]]
+        пакеты (workout_type, data)
+    rejects: List[Reject]
+        куда складывать отбракованные пакеты; если не передан,
+        первая ошибка пробрасывается как PackageError
+    """
+
+    for _, workout_type, cls, data in _checked(packages, rejects):
+        yield workout_type, cls, data
+
+
+def iter_scored(packages: Iterable[Package],
+                rejects: Optional[List[Reject]] = None
+                ) -> Iterator[InfoMessage]:
+    """Рассчитать поток пакетов с отбраковкой, как read_packages.
+
+    Пакеты проверяет iter_checked, а считают скомпилированные
+    функции: результат тот же, что у show_training_info()
+    объектов из read_packages. Пакет, на котором расчёт бросил
+    ArithmeticError (например, переполнение квадрата скорости),
+    отбраковывается как PackageValueError с причиной bad_value.
+    """
+
+    scorers: Dict[type, Scorer] = {}
+    for index, workout_type, cls, data in _checked(packages, rejects):
+        scorer = scorers.get(cls)
+        if scorer is None:
+            scorer = scorers[cls] = scorer_for(cls)
+        try:
+            info = scorer(*data)
+        except ArithmeticError as exc:
+            reject_arithmetic(exc, index, (workout_type, data), rejects)
+            continue
+        yield info
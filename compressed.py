@@ -0,0 +1,249 @@
+import bz2
+import gzip
+import io
+import lzma
+import zlib
+from collections import deque
+from typing import (IO, TYPE_CHECKING, Callable, Deque, Dict, Iterable,
+                    Iterator, List, Optional, Sequence, Tuple)
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future, ThreadPoolExecutor
+
+Decompressor = Callable[[], object]
+
+# Сигнатура начала члена (потока) архива и фабрика декомпрессора.
+CODECS: Dict[str, Tuple[bytes, Decompressor]] = {
+    'gzip': (b'\x1f\x8b\x08', lambda: zlib.decompressobj(31)),
+    'bz2': (b'BZh', bz2.BZ2Decompressor),
+    'xz': (b'\xfd7zXZ\x00', lzma.LZMADecompressor),
+}
+OPENERS = {'gzip': gzip.open, 'bz2': bz2.open, 'xz': lzma.open}
+COMPRESSORS: Dict[str, Callable[[bytes], bytes]] = {
+    'gzip': gzip.compress, 'bz2': bz2.compress, 'xz': lzma.compress}
+SUFFIXES = {'gzip': '.gz', 'bz2': '.bz2', 'xz': '.xz'}
+DECODE_ERRORS = (zlib.error, OSError, lzma.LZMAError, EOFError, ValueError)
+
+DEFAULT_SEGMENT_BYTES = 1024 * 1024
+DEFAULT_MEMBER_BYTES = 256 * 1024
+READ_CHUNK_BYTES = 1024 * 1024
+
+
+def detect_compression(path: str) -> Optional[str]:
+    """Формат сжатия файла по первым байтам или None."""
+    with open(path, 'rb') as source:
+        head = source.read(8)
+    for codec, (magic, _) in CODECS.items():
+        if head.startswith(magic):
+            return codec
+    return None
+
+
+def strip_suffix(path: str) -> str:
+    """Путь без суффикса сжатия: 'a.csv.gz' -> 'a.csv'."""
+    for suffix in SUFFIXES.values():
+        if path.endswith(suffix):
+            return path[:-len(suffix)]
+    return path
+
+
+def open_text(path: str) -> IO[str]:
+    """Открыть файл, сжатый или нет, как поток текста UTF-8."""
+    codec = detect_compression(path)
+    if codec is None:
+        return open(path, encoding='utf-8', newline='')
+    return OPENERS[codec](path, 'rt', encoding='utf-8', newline='')
+
+
+def write_members(path: str,
+                  lines: Iterable[str],
+                  codec: str,
+                  member_bytes: int = DEFAULT_MEMBER_BYTES) -> int:
+    """Записать строки архивом из независимых членов по ~member_bytes.
+
+    Так нарезает архивы шлюз; члены такого архива iter_lines
+    распаковывает параллельно.
+
+    Возвращаемое значение
+    ---------------------
+    Количество членов: int
+    """
+
+    compress = COMPRESSORS[codec]
+    members = 0
+    buffer: List[bytes] = []
+    size = 0
+    with open(path, 'wb') as output:
+        for line in lines:
+            data = line.encode('utf-8')
+            buffer.append(data)
+            size += len(data)
+            if size >= member_bytes:
+                output.write(compress(b''.join(buffer)))
+                members += 1
+                buffer, size = [], 0
+        if buffer or not members:
+            output.write(compress(b''.join(buffer)))
+            members += 1
+    return members
+
+
+def member_segments(data: bytes,
+                    codec: str,
+                    segment_bytes: int = DEFAULT_SEGMENT_BYTES
+                    ) -> List[Tuple[int, int]]:
+    """Отрезки архива примерно по segment_bytes, начинающиеся с сигнатуры.
+
+    Сигнатура члена может встретиться и внутри сжатых данных, так
+    что начала отрезков — лишь кандидаты в границы членов.
+    """
+    magic = CODECS[codec][0]
+    size = len(data)
+    starts = [0]
+    target = segment_bytes
+    while target < size:
+        found = data.find(magic, target)
+        if found < 0:
+            break
+        starts.append(found)
+        target = found + segment_bytes
+    return list(zip(starts, starts[1:] + [size]))
+
+
+def decode_members(data: memoryview,
+                   start: int,
+                   end: int,
+                   codec: str) -> Optional[bytes]:
+    """Распаковать члены архива, занимающие data[start:end] целиком.
+
+    Возвращаемое значение
+    ---------------------
+    Распакованные байты или None, если отрезок не начинается
+    с члена или его последний член не кончается ровно на end,
+    то есть start или end — не граница членов.
+    """
+
+    factory = CODECS[codec][1]
+    output = []
+    with data[start:end] as segment:
+        rest: bytes = segment
+        while rest:
+            decompressor = factory()
+            try:
+                output.append(decompressor.decompress(rest))
+            except DECODE_ERRORS:
+                return None
+            if not decompressor.eof:
+                return None
+            rest = decompressor.unused_data
+    return b''.join(output)
+
+
+def _decoded_segments(pool: 'ThreadPoolExecutor',
+                      data: memoryview,
+                      codec: str,
+                      segments: Iterable[Tuple[int, int]],
+                      window: int) -> Iterator[Tuple[int, Optional[bytes]]]:
+    """Результаты decode_members по порядку; в работе до window задач."""
+    pending: Deque[Tuple[int, 'Future']] = deque()
+    for start, end in segments:
+        pending.append(
+            (start, pool.submit(decode_members, data, start, end, codec)))
+        if len(pending) >= window:
+            start, future = pending.popleft()
+            yield start, future.result()
+    while pending:
+        start, future = pending.popleft()
+        yield start, future.result()
+
+
+def _stream_chunks(path: str, codec: str, offset: int) -> Iterator[bytes]:
+    """Распаковывать файл с offset последовательно, кусками."""
+    with open(path, 'rb') as raw:
+        raw.seek(offset)
+        with OPENERS[codec](raw, 'rb') as source:
+            yield from iter(lambda: source.read(READ_CHUNK_BYTES), b'')
+
+
+def iter_chunks(path: str,
+                codec: str,
+                workers: int,
+                segment_bytes: int = DEFAULT_SEGMENT_BYTES
+                ) -> Iterator[bytes]:
+    """Распаковать архив из нескольких членов в пуле потоков.
+
+    Архив отображается в память и режется по кандидатам в границы
+    членов (member_segments); отрезки распаковываются в пуле
+    из workers потоков — zlib, bz2 и lzma отпускают GIL, так что
+    распаковка идёт параллельно с расчётом в вызывающем потоке.
+    Результаты отдаются по порядку, в работе не больше 2 * workers
+    отрезков. Отрезок принимается, только если он распаковался
+    целиком до своего конца: значит, начало следующего — настоящая
+    граница. С первого неудачного отрезка (ложная сигнатура внутри
+    данных, один большой член) файл распаковывается потоком.
+    """
+    import mmap
+    from concurrent.futures import ThreadPoolExecutor
+
+    with open(path, 'rb') as source:
+        mapped = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+    offset = None
+    try:
+        segments = member_segments(mapped, codec, segment_bytes)
+        with memoryview(mapped) as data, \
+                ThreadPoolExecutor(workers) as pool:
+            for offset, decoded in _decoded_segments(
+                    pool, data, codec, segments, 2 * workers):
+                if decoded is None:
+                    pool.shutdown(cancel_futures=True)
+                    break
+                yield decoded
+            else:
+                offset = None
+    finally:
+        mapped.close()
+    if offset is not None:
+        yield from _stream_chunks(path, codec, offset)
+
+
+def iter_byte_lines(chunks: Iterable[bytes]) -> Iterator[str]:
+    """Строки текста UTF-8 из кусков байт с произвольными границами.
+
+    Строки делятся так же, как при чтении файла с newline=''.
+    """
+    tail = b''
+    for chunk in chunks:
+        data = tail + chunk
+        cut = data.rfind(b'\n') + 1
+        tail = data[cut:]
+        if cut:
+            yield from io.StringIO(data[:cut].decode('utf-8'), newline='')
+    if tail:
+        yield from io.StringIO(tail.decode('utf-8'), newline='')
+
+
+def iter_lines(paths: Sequence[str],
+               workers: int = 0,
+               segment_bytes: int = DEFAULT_SEGMENT_BYTES) -> Iterator[str]:
+    """Строки файлов пакетов по порядку, сжатых или нет.
+
+    Параметры
+    ---------
+    paths: Sequence[str]
+        файлы; формат сжатия определяется по сигнатуре
+    workers: int
+        0 — распаковывать потоком в вызывающем потоке;
+        больше нуля — распаковывать члены архивов в пуле
+        из стольких потоков (см. iter_chunks)
+    segment_bytes: int
+        сжатых байт на одну задачу пула
+    """
+
+    for path in paths:
+        codec = detect_compression(path)
+        if codec is None or workers <= 0:
+            with open_text(path) as source:
+                yield from source
+        else:
+            yield from iter_byte_lines(
+                iter_chunks(path, codec, workers, segment_bytes))
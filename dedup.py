@@ -0,0 +1,324 @@
+import argparse
+import collections
+import functools
+import hashlib
+import json
+import math
+import operator
+import sys
+from dataclasses import asdict, dataclass
+from typing import (IO, Deque, Iterable, Iterator, Optional, Sequence, Set,
+                    Tuple)
+
+Event = Tuple[str, float, str, Sequence[float]]
+
+DEFAULT_CAPACITY = 1_000_000
+DEFAULT_ERROR_RATE = 0.001
+DEFAULT_MEMORY_LIMIT = 256 * 1024 * 1024
+# Оценка памяти на ключ точной проверки: объект bytes из 24 байт,
+# ячейка set и ячейка deque.
+EXACT_ENTRY_BYTES = 104
+# 8 байт на выбор блока и до 16 байт на биты внутри блока.
+DIGEST_SIZE = 24
+BLOCK_BYTES = 32
+BLOCK_SLACK = 1.3
+MIN_ERROR_RATE = 1e-4
+_BITS = tuple(1 << bit for bit in range(8 * BLOCK_BYTES))
+
+
+def _number(value: object) -> str:
+    """Значение в ключе: 5, 5.0 и -0.0 / 0 дают одну запись.
+
+    Целые записываются точно, поэтому большие целые, которые
+    совпадают после округления до float, дают разные ключи.
+    Не числа записываются через repr и в ключе не смешиваются
+    с числами.
+    """
+    if isinstance(value, float):
+        if value.is_integer():
+            return int.__repr__(int(value))
+        return float.__repr__(value)
+    if isinstance(value, int):
+        return int.__repr__(value)
+    return repr(value)
+
+
+def event_digest(device_id: str,
+                 timestamp: float,
+                 workout_type: str,
+                 data: Sequence[float]) -> bytes:
+    """Ключ пакета: BLAKE2b от устройства, времени и содержимого.
+
+    Целое и дробное представление одного числа дают один ключ
+    (см. _number).
+    """
+    key = '\x1f'.join((str(device_id), _number(timestamp), workout_type,
+                       ','.join(map(_number, data))))
+    return hashlib.blake2b(key.encode('utf-8'),
+                           digest_size=DIGEST_SIZE).digest()
+
+
+class BloomFilter:
+    """
+    Класс. Блочный фильтр Блума на bytearray.
+
+    Размер и число хэш-функций выбираются по ожидаемому числу
+    ключей capacity и доле ложных срабатываний error_rate.
+    Все биты ключа лежат в одном блоке из 256 бит: первые 8 байт
+    ключа event_digest выбирают блок, следующие hashes байт —
+    биты в нём. Проверка и вставка — одна операция над целым
+    числом блока вместо цикла по битам. Блоки дают чуть больше
+    ложных срабатываний, чем классический фильтр того же размера,
+    поэтому битов берётся на BLOCK_SLACK больше.
+
+    Методы
+    ------
+    add(self, digest) -> bool:
+        Добавить ключ; True, если он, возможно, уже был.
+    """
+
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        self.blocks, self.hashes = self.parameters(capacity, error_rate)
+        self.capacity = capacity
+        self.count = 0
+        self._bits = bytearray(self.blocks * BLOCK_BYTES)
+
+    @staticmethod
+    def parameters(capacity: int, error_rate: float) -> Tuple[int, int]:
+        """Число блоков и хэш-функций для capacity и error_rate."""
+        if capacity <= 0:
+            raise ValueError('capacity должен быть положительным')
+        if not MIN_ERROR_RATE <= error_rate < 1:
+            raise ValueError(f'error_rate должен быть в интервале '
+                             f'[{MIN_ERROR_RATE}, 1)')
+        bits = -capacity * math.log(error_rate) / math.log(2) ** 2
+        hashes = max(1, round(bits / capacity * math.log(2)))
+        return math.ceil(bits * BLOCK_SLACK / (8 * BLOCK_BYTES)), hashes
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._bits)
+
+    def _locate(self, digest: bytes) -> Tuple[int, int]:
+        """Смещение блока ключа и маска его битов."""
+        block = int.from_bytes(digest[:8], 'little') % self.blocks
+        mask = functools.reduce(
+            operator.or_, map(_BITS.__getitem__, digest[8:8 + self.hashes]))
+        return block * BLOCK_BYTES, mask
+
+    def __contains__(self, digest: bytes) -> bool:
+        offset, mask = self._locate(digest)
+        word = int.from_bytes(self._bits[offset:offset + BLOCK_BYTES],
+                              'little')
+        return word & mask == mask
+
+    def add(self, digest: bytes) -> bool:
+        offset, mask = self._locate(digest)
+        end = offset + BLOCK_BYTES
+        word = int.from_bytes(self._bits[offset:end], 'little')
+        if word & mask == mask:
+            return True
+        self._bits[offset:end] = (word | mask).to_bytes(BLOCK_BYTES,
+                                                        'little')
+        self.count += 1
+        return False
+
+
+@dataclass
+class DedupStats:
+    """
+    Класс. Статистика дедупликации.
+
+    Атрибуты
+    --------
+    seen: int
+        всего пакетов
+    duplicates: int
+        отброшено повторов
+    probable: int
+        из них отброшено только по фильтру: ключ старше окна
+        точной проверки; с вероятностью error_rate это новый пакет
+    unconfirmed: int
+        ложных срабатываний фильтра, опровергнутых точной проверкой,
+        пока она ещё помнит все ключи
+    rotations: int
+        сколько раз фильтр сменил поколение
+    malformed: int
+        пропущено строк, из которых не собрать событие
+    bloom_bytes: int
+        память двух поколений фильтра
+    exact_entries: int
+        ключей в точной проверке
+    memory_bytes: int
+        оценка всей памяти дедупликатора
+    """
+
+    seen: int = 0
+    duplicates: int = 0
+    probable: int = 0
+    unconfirmed: int = 0
+    rotations: int = 0
+    malformed: int = 0
+    bloom_bytes: int = 0
+    exact_entries: int = 0
+    memory_bytes: int = 0
+
+
+class Deduplicator:
+    """
+    Класс. Отбрасывание повторно переданных пакетов до read_package.
+
+    Ключ пакета — event_digest(устройство, время, пакет). Ключ,
+    найденный в точном множестве последних ключей, — повтор
+    наверняка. Точное множество ограничено тем, что остаётся
+    от memory_limit после фильтров, и вытесняет самые старые ключи;
+    за его окном повторы ловит фильтр Блума. Пока из точного
+    множества ничего не вытеснено, срабатывание фильтра без ключа
+    в множестве — заведомо ложное, и пакет проходит. После первого
+    вытеснения срабатывание фильтра считается повтором: новый пакет
+    отбрасывается так с вероятностью error_rate.
+    Фильтр хранится двумя поколениями по capacity ключей: когда
+    текущее заполнено, старое выбрасывается.
+
+    Методы
+    ------
+    is_duplicate(self, device_id, timestamp, workout_type, data) -> bool:
+        Проверить пакет и запомнить его.
+    filter(self, events) -> Iterator[Tuple[str, Sequence[float]]]:
+        Пакеты без повторов, готовые для read_packages.
+    skip(self) -> None:
+        Учесть пропущенную испорченную строку.
+    stats(self) -> DedupStats:
+        Счётчики и оценка памяти.
+    """
+
+    def __init__(self,
+                 capacity: int = DEFAULT_CAPACITY,
+                 error_rate: float = DEFAULT_ERROR_RATE,
+                 memory_limit: int = DEFAULT_MEMORY_LIMIT) -> None:
+        blocks, _ = BloomFilter.parameters(capacity, error_rate)
+        bloom_bytes = 2 * blocks * BLOCK_BYTES
+        self.max_exact = (memory_limit - bloom_bytes) // EXACT_ENTRY_BYTES
+        if self.max_exact <= 0:
+            raise ValueError(
+                f'memory_limit меньше памяти фильтра ({bloom_bytes} байт)')
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.memory_limit = memory_limit
+        self._current = BloomFilter(capacity, error_rate)
+        self._previous: Optional[BloomFilter] = None
+        self._exact: Set[bytes] = set()
+        self._order: Deque[bytes] = collections.deque()
+        self._evicted = False
+        self._stats = DedupStats()
+
+    def is_duplicate(self,
+                     device_id: str,
+                     timestamp: float,
+                     workout_type: str,
+                     data: Sequence[float]) -> bool:
+        """True, если такой пакет уже был; иначе запомнить его."""
+        digest = event_digest(device_id, timestamp, workout_type, data)
+        stats = self._stats
+        stats.seen += 1
+        if digest in self._exact:
+            stats.duplicates += 1
+            return True
+        maybe = self._current.add(digest)
+        if not maybe and self._previous is not None:
+            maybe = digest in self._previous
+        if self._current.count >= self.capacity:
+            self._previous = self._current
+            self._current = BloomFilter(self.capacity, self.error_rate)
+            stats.rotations += 1
+        if maybe and self._evicted:
+            stats.duplicates += 1
+            stats.probable += 1
+            return True
+        if maybe:
+            stats.unconfirmed += 1
+        self._remember(digest)
+        return False
+
+    def _remember(self, digest: bytes) -> None:
+        self._exact.add(digest)
+        self._order.append(digest)
+        if len(self._order) > self.max_exact:
+            self._exact.discard(self._order.popleft())
+            self._evicted = True
+
+    def filter(self, events: Iterable[Event]
+               ) -> Iterator[Tuple[str, Sequence[float]]]:
+        """Пакеты (workout_type, data) из событий, без повторов."""
+        for device_id, timestamp, workout_type, data in events:
+            if not self.is_duplicate(device_id, timestamp, workout_type,
+                                     data):
+                yield workout_type, data
+
+    def skip(self) -> None:
+        """Учесть строку, из которой не удалось собрать событие."""
+        self._stats.malformed += 1
+
+    def stats(self) -> DedupStats:
+        """Счётчики и текущая оценка памяти."""
+        stats = DedupStats(**asdict(self._stats))
+        stats.bloom_bytes = self._current.nbytes + (
+            self._previous.nbytes if self._previous is not None else 0)
+        stats.exact_entries = len(self._order)
+        stats.memory_bytes = (stats.bloom_bytes
+                              + stats.exact_entries * EXACT_ENTRY_BYTES)
+        return stats
+
+
+def filter_lines(dedup: Deduplicator,
+                 lines: Iterable[str]) -> Iterator[str]:
+    """Строки JSON Lines без повторов.
+
+    Строка — объект {"device_id", "timestamp", "workout_type",
+    "data"}; строки без повторов отдаются как есть, так что выход
+    можно сразу передать в `cli.py score --format jsonl`.
+    Испорченные строки — не JSON, не объект, без нужных полей —
+    пропускаются и учитываются в DedupStats.malformed.
+    """
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            event = json.loads(line)
+            duplicate = dedup.is_duplicate(
+                event['device_id'], event['timestamp'],
+                event['workout_type'], event['data'])
+        except (ValueError, TypeError, KeyError):
+            dedup.skip()
+            continue
+        if not duplicate:
+            yield line if line.endswith('\n') else line + '\n'
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Точка входа: `python cli.py dedup [path]`; статистика — в stderr."""
+    parser = argparse.ArgumentParser(
+        prog='cli.py dedup',
+        description='Отбросить повторно переданные пакеты.')
+    parser.add_argument('path', nargs='?', default='-',
+                        help='входной файл JSON Lines, "-" — stdin')
+    parser.add_argument('--capacity', type=int, default=DEFAULT_CAPACITY,
+                        help='ключей в одном поколении фильтра')
+    parser.add_argument('--error-rate', type=float,
+                        default=DEFAULT_ERROR_RATE)
+    parser.add_argument('--memory-limit', type=int,
+                        default=DEFAULT_MEMORY_LIMIT // (1024 * 1024),
+                        help='ограничение памяти, МиБ')
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    dedup = Deduplicator(args.capacity, args.error_rate,
+                         args.memory_limit * 1024 * 1024)
+    source: IO[str] = sys.stdin
+    if args.path != '-':
+        source = open(args.path, encoding='utf-8')
+    try:
+        sys.stdout.writelines(filter_lines(dedup, source))
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    print(json.dumps(asdict(dedup.stats())), file=sys.stderr)
+    return 0
@@ -0,0 +1,113 @@
+import os
+from typing import IO, Iterable, Iterator, List, Union
+
+from batch import ColumnarResult
+from homework import InfoMessage
+
+MESSAGE_TEMPLATE = ('Тип тренировки: %s; '
+                    'Длительность: %.3f ч.; '
+                    'Дистанция: %.3f км; '
+                    'Ср. скорость: %.3f км/ч; '
+                    'Потрачено ккал: %.3f.')
+
+DEFAULT_CHUNK_SIZE = 4096
+
+Target = Union[int, IO[str]]
+
+
+def format_info(info: InfoMessage) -> str:
+    """Строка сообщения, идентичная InfoMessage.get_message()."""
+    return MESSAGE_TEMPLATE % (info.training_type, info.duration,
+                               info.distance, info.speed, info.calories)
+
+
+def iter_chunks(infos: Iterable[InfoMessage],
+                chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+    """Отдавать текст пачками по chunk_size сообщений.
+
+    Каждая пачка — готовый кусок вывода: строки сообщений,
+    каждая с завершающим переводом строки.
+    """
+    template = MESSAGE_TEMPLATE + '\n'
+    lines: List[str] = []
+    for info in infos:
+        lines.append(template % (info.training_type, info.duration,
+                                 info.distance, info.speed, info.calories))
+        if len(lines) >= chunk_size:
+            yield ''.join(lines)
+            lines = []
+    if lines:
+        yield ''.join(lines)
+
+
+def iter_column_chunks(result: ColumnarResult,
+                       chunk_size: int = DEFAULT_CHUNK_SIZE
+                       ) -> Iterator[str]:
+    """То же, что iter_chunks, но для колоночного результата batch."""
+    template = MESSAGE_TEMPLATE + '\n'
+    rows = zip(result.training_type, result.duration, result.distance,
+               result.speed, result.calories)
+    while True:
+        chunk = ''.join([template % row
+                         for _, row in zip(range(chunk_size), rows)])
+        if not chunk:
+            return
+        yield chunk
+
+
+def format_messages(infos: Iterable[InfoMessage]) -> str:
+    """Весь набор сообщений одной строкой, по сообщению на строку."""
+    return ''.join(iter_chunks(infos))
+
+
+def format_columns(result: ColumnarResult) -> str:
+    """Весь колоночный результат одной строкой, по сообщению на строку."""
+    return ''.join(iter_column_chunks(result))
+
+
+def _write_fd(fd: int, data: bytes) -> None:
+    """Записать data в файловый дескриптор целиком."""
+    view = memoryview(data)
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
+
+
+def write_chunks(chunks: Iterable[str], target: Target) -> int:
+    """Записать пачки текста в файл или файловый дескриптор.
+
+    Параметры
+    ---------
+    chunks: Iterable[str]
+        пачки из iter_chunks или iter_column_chunks
+    target: Union[int, IO[str]]
+        номер файлового дескриптора (пишется UTF-8 через os.write)
+        или текстовый файл
+
+    Возвращаемое значение
+    ---------------------
+    Количество записанных символов: int
+    """
+
+    written = 0
+    for chunk in chunks:
+        if isinstance(target, int):
+            _write_fd(target, chunk.encode('utf-8'))
+        else:
+            target.write(chunk)
+        written += len(chunk)
+    return written
+
+
+def write_messages(infos: Iterable[InfoMessage],
+                   target: Target,
+                   chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """Записать сообщения в target пачками, не собирая весь текст."""
+    return write_chunks(iter_chunks(infos, chunk_size), target)
+
+
+def write_columns(result: ColumnarResult,
+                  target: Target,
+                  chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """Записать колоночный результат в target пачками."""
+    return write_chunks(iter_column_chunks(result, chunk_size), target)
@@ -1,5 +1,8 @@
+import inspect
+import math
 from dataclasses import dataclass
-from typing import Optional, Dict, List, Type
+from typing import (Optional, Dict, Iterable, Iterator, List, Sequence, Tuple,
+                    Type)
 
 
 @dataclass
@@ -385,9 +388,138 @@ class Swimming(Training):
                 * self.COEFF_CALORIE_2 * self.weight)
 
 
+class PackageError(Exception):
+    """
+    Класс. Базовое исключение для некорректного пакета датчиков.
+
+    Атрибуты
+    --------
+    reason: str
+        машиночитаемый код причины
+    """
+
+    reason: str = 'bad_package'
+
+
+class UnknownWorkoutError(PackageError, KeyError):
+    """Неизвестный код тренировки. Наследует KeyError для совместимости."""
+
+    reason = 'unknown_code'
+
+
+class PackageArityError(PackageError, TypeError):
+    """Число параметров не совпадает с конструктором класса тренировки.
+
+    Наследует TypeError для совместимости.
+    """
+
+    reason = 'bad_arity'
+
+
+class PackageValueError(PackageError, ValueError):
+    """Параметр пакета не число или вне допустимых значений."""
+
+    reason = 'bad_value'
+
+
+@dataclass
+class Reject:
+    """
+    Класс. Отбракованный пакет в пакетном режиме read_packages.
+
+    Атрибуты
+    --------
+    index: int
+        номер пакета во входном потоке
+    workout_type: str
+        код тренировки из пакета
+    data: Sequence[float]
+        параметры из пакета
+    reason: str
+        код причины: unknown_code, bad_arity или bad_value
+    detail: str
+        описание ошибки
+    """
+
+    index: int
+    workout_type: str
+    data: Sequence[float]
+    reason: str
+    detail: str
+
+
+WORKOUT_CLASSES: Dict[str, Type[Training]] = {}
+WORKOUT_ARITY: Dict[str, int] = {}
+# Позиции параметров пакета, которые должны быть положительными.
+WORKOUT_POSITIVE: Dict[str, Tuple[int, ...]] = {}
+# Параметры конструктора, которые должны быть положительными:
+# на длительность и рост делят формулы, длина бассейна — размер.
+POSITIVE_PARAMETERS = frozenset(('duration', 'height', 'length_pool'))
+
+
+def register_workout(code: str, training_class: Type[Training]) -> None:
+    """Зарегистрировать класс тренировки под кодом пакета.
+
+    Число параметров пакета и позиции параметров из
+    POSITIVE_PARAMETERS вычисляются один раз по сигнатуре
+    конструктора, чтобы read_package проверял их до создания
+    объекта.
+
+    Параметры
+    ---------
+    code: str
+        код тренировки в пакете
+    training_class: Type[Training]
+        подкласс Training с конструктором без *args и **kwargs
+    """
+
+    if not issubclass(training_class, Training):
+        raise TypeError(f'{training_class!r} не наследует Training')
+    parameters = list(
+        inspect.signature(training_class.__init__).parameters.values())[1:]
+    if any(parameter.kind not in (parameter.POSITIONAL_ONLY,
+                                  parameter.POSITIONAL_OR_KEYWORD)
+           for parameter in parameters):
+        raise TypeError('Конструктор класса тренировки должен принимать '
+                        'только позиционные параметры')
+    WORKOUT_CLASSES[code] = training_class
+    WORKOUT_ARITY[code] = len(parameters)
+    WORKOUT_POSITIVE[code] = tuple(
+        position for position, parameter in enumerate(parameters)
+        if parameter.name in POSITIVE_PARAMETERS)
+
+
+register_workout('SWM', Swimming)
+register_workout('RUN', Running)
+register_workout('WLK', SportsWalking)
+
+
+def package_class(workout_type: str,
+                  data: Sequence[float]
+                  ) -> Type[Training]:
+    """Класс тренировки для пакета после проверок кода и числа параметров.
+
+    Исключения
+    ----------
+    UnknownWorkoutError
+        код тренировки не зарегистрирован
+    PackageArityError
+        число параметров не совпадает с конструктором
+    """
+
+    training_class = WORKOUT_CLASSES.get(workout_type)
+    if training_class is None:
+        raise UnknownWorkoutError(workout_type)
+    if len(data) != WORKOUT_ARITY[workout_type]:
+        raise PackageArityError(
+            f'Для {workout_type!r} нужно параметров: '
+            f'{WORKOUT_ARITY[workout_type]}, получено: {len(data)}')
+    return training_class
+
+
 def read_package(workout_type: str,
-                 data: List[float]
-                 ) -> Optional[Training]:
+                 data: Sequence[float]
+                 ) -> Training:
     """Прочитать данные полученные от датчиков.
 
     Параметры
@@ -399,19 +531,96 @@ def read_package(workout_type: str,
 
     Переменные
     ----------
-    dict1: dict
-        словарь, в котором сопостовляются коды тренировок и классы
+    WORKOUT_CLASSES: dict
+        реестр, в котором сопоставляются коды тренировок и классы;
+        заполняется через register_workout один раз при импорте
 
     Возвращаемое значение
     ---------------------
-    None или объект класса Training в который передали
+    Объект класса Training в который передали
     необходимые параметры из списка data
+
+    Исключения
+    ----------
+    UnknownWorkoutError
+        код тренировки не зарегистрирован
+    PackageArityError
+        число параметров не совпадает с конструктором
+    PackageValueError
+        параметр не конечное число или не положителен там,
+        где это нужно классу (длительность, рост, длина бассейна)
+    """
+
+    training_class = package_class(workout_type, data)
+    check_values(workout_type, data)
+    return training_class(*data)
+
+
+_NUMBER_TYPES = (int, float)
+
+
+def check_values(workout_type: str, data: Sequence[float]) -> None:
+    """Проверить значения параметров пакета зарегистрированного кода.
+
+    Числом считается int или float и их подклассы (в том числе bool
+    и numpy.float64): другие numbers.Real, например Fraction,
+    не форматируются в get_message. NaN и бесконечности
+    отбраковываются, параметры из POSITIVE_PARAMETERS должны
+    быть положительными.
+
+    Исключения
+    ----------
+    PackageValueError
+        параметр не число, не конечен или не положителен
+    """
+
+    for value in data:
+        if (type(value) not in _NUMBER_TYPES
+                and not isinstance(value, _NUMBER_TYPES)):
+            raise PackageValueError(f'Параметр {value!r} не число')
+        if not math.isfinite(value):
+            raise PackageValueError(f'Параметр {value!r} не конечен')
+    for position in WORKOUT_POSITIVE[workout_type]:
+        if data[position] <= 0:
+            raise PackageValueError(
+                f'Параметр {position + 1} для {workout_type!r} '
+                f'должен быть положительным, получено: {data[position]!r}')
+
+
+def read_packages(packages: Iterable[Tuple[str, Sequence[float]]],
+                  rejects: Optional[List[Reject]] = None
+                  ) -> Iterator[Training]:
+    """Прочитать поток пакетов, не прерываясь на некорректных.
+
+    Параметры
+    ---------
+    packages: Iterable[Tuple[str, Sequence[float]]]
+        пакеты (workout_type, data)
+    rejects: List[Reject]
+        куда складывать отбракованные пакеты (подойдёт любой объект
+        с методом append); если не передан, первая ошибка
+        пробрасывается как PackageError
+
+    Возвращаемое значение
+    ---------------------
+    Итератор объектов Training для корректных пакетов.
+    Отбраковываются пакеты, на которых read_package бросает
+    PackageError: с неизвестным кодом, неверным числом параметров,
+    нечисловыми или бесконечными параметрами, неположительной
+    длительностью, ростом или длиной бассейна — на них упал бы
+    расчёт.
     """
 
-    code_class: Dict[str, Type[Training]] = {'SWM': Swimming,
-                                             'RUN': Running,
-                                             'WLK': SportsWalking}
-    return code_class[workout_type](*data)
+    for index, (workout_type, data) in enumerate(packages):
+        try:
+            training = read_package(workout_type, data)
+        except PackageError as exc:
+            if rejects is None:
+                raise
+            rejects.append(Reject(index, workout_type, data, exc.reason,
+                                  str(exc)))
+            continue
+        yield training
 
 
 def main(training: Training) -> None:
@@ -0,0 +1,350 @@
+import bisect
+import collections
+import http.server
+import os
+import sys
+import threading
+import time
+from typing import (Callable, Counter, Dict, Iterable, Iterator, List,
+                    Optional, Sequence, Tuple)
+
+from compiled import reject_arithmetic
+from homework import InfoMessage, Reject, read_packages
+from stream import iter_messages
+
+Package = Tuple[str, Sequence[float]]
+
+STAGES = ('read_package', 'distance_speed', 'calories', 'message')
+# Границы корзин гистограммы задержек, секунды.
+LATENCY_BUCKETS = (1e-7, 2.5e-7, 5e-7, 1e-6, 2.5e-6, 5e-6,
+                   1e-5, 2.5e-5, 1e-4, 1e-3, 1e-2)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Histogram:
+    """
+    Класс. Гистограмма с фиксированными границами корзин.
+
+    Атрибуты
+    --------
+    bounds: Tuple[float, ...]
+        верхние границы корзин по возрастанию
+    counts: List[int]
+        наблюдения по корзинам; последняя — выше всех границ
+    total: float
+        сумма наблюдений
+    """
+
+    __slots__ = ('bounds', 'counts', 'total')
+
+    def __init__(self, bounds: Sequence[float] = LATENCY_BUCKETS) -> None:
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def cumulative(self) -> List[int]:
+        """Накопленные счётчики по корзинам, как в формате Prometheus."""
+        result, running = [], 0
+        for count in self.counts:
+            running += count
+            result.append(running)
+        return result
+
+
+def _label(value: str) -> str:
+    return (value.replace('\\', '\\\\').replace('"', '\\"')
+            .replace('\n', '\\n'))
+
+
+class SamplingProfiler:
+    """
+    Класс. Выборочный профилировщик потока.
+
+    Фоновый поток каждые interval секунд снимает стек
+    профилируемого потока через sys._current_frames() и считает
+    одинаковые стеки. Профилируемый поток не замедляется ничем,
+    кроме переключений GIL.
+
+    Методы
+    ------
+    start(self) -> None:
+        Начать выборку стеков потока, вызвавшего start().
+    stop(self) -> None:
+        Остановить выборку.
+    collapsed(self) -> str:
+        Стеки в формате «кадр;кадр;кадр количество» для flamegraph.
+    top(self, limit) -> List[Tuple[str, int]]:
+        Функции, чаще всего бывшие на вершине стека.
+    """
+
+    def __init__(self, interval: float = 0.001) -> None:
+        self.interval = interval
+        self.samples: Counter[Tuple[str, ...]] = collections.Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._target = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._target = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, daemon=True,
+                                        name='sampling-profiler')
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{os.path.basename(code.co_filename)}:'
+                             f'{code.co_name}')
+                frame = frame.f_back
+            if stack:
+                self.samples[tuple(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        return ''.join(f'{";".join(stack)} {count}\n'
+                       for stack, count in self.samples.most_common())
+
+    def top(self, limit: int = 10) -> List[Tuple[str, int]]:
+        leaves: Counter[str] = collections.Counter()
+        for stack, count in self.samples.items():
+            leaves[stack[-1]] += count
+        return leaves.most_common(limit)
+
+
+class _RejectCounter:
+    """Приёмник отбраковки: считает причины и передаёт дальше."""
+
+    def __init__(self, target: object, counts: Counter[str]) -> None:
+        self.target = target
+        self.counts = counts
+
+    def append(self, reject: Reject) -> None:
+        self.counts[reject.reason] += 1
+        self.target.append(reject)
+
+
+class Instrumentation:
+    """
+    Класс. Таймеры, счётчики и гистограммы конвейера расчёта.
+
+    Выключенный объект отдаёт сам генератор stream.iter_messages:
+    проверка флага делается один раз на поток пакетов, а не
+    на пакет, поэтому накладные расходы выключенной
+    инструментации — один вызов функции (см. набор
+    instrumentation в benchmarks.py).
+
+    Во включённом режиме пакеты считаются эталонным путём
+    read_package и методами объекта тренировки, для каждого
+    пакета замеряются этапы STAGES и пишутся в гистограммы
+    по коду тренировки:
+    read_package — проверка пакета и создание объекта тренировки,
+    distance_speed — get_distance и get_mean_speed,
+    calories — get_spent_calories,
+    message — InfoMessage и get_message.
+    Результаты те же, что у stream.iter_messages, но считаются
+    медленнее скомпилированных функций: замеры включают только
+    для разбора, на каком этапе теряется время.
+
+    Атрибуты
+    --------
+    enabled: bool
+        включены ли замеры
+    packages: Counter[str]
+        рассчитанные пакеты по коду тренировки
+    rejects: Counter[str]
+        отбракованные пакеты по причине
+    profiler: Optional[SamplingProfiler]
+        выборочный профилировщик, если включён
+
+    Методы
+    ------
+    iter_messages(self, packages, rejects=None) -> Iterator[str]:
+        Строки сообщений, с замерами во включённом режиме.
+    to_prometheus(self) -> str:
+        Метрики в текстовом формате Prometheus.
+    write(self, path) -> None:
+        Атомарно записать метрики в файл.
+    serve(self, port, host) -> http.server.ThreadingHTTPServer:
+        Отдавать метрики по HTTP в фоновом потоке.
+    """
+
+    def __init__(self,
+                 enabled: bool = True,
+                 clock: Callable[[], float] = time.perf_counter) -> None:
+        self.enabled = enabled
+        self.clock = clock
+        self.packages: Counter[str] = collections.Counter()
+        self.rejects: Counter[str] = collections.Counter()
+        self.profiler: Optional[SamplingProfiler] = None
+        self._histograms: Dict[Tuple[str, str], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, stage: str, workout_type: str) -> Histogram:
+        """Гистограмма задержек этапа stage для кода workout_type."""
+        key = (stage, workout_type)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram())
+        return histogram
+
+    def reset(self) -> None:
+        """Обнулить все счётчики и гистограммы."""
+        with self._lock:
+            self._histograms = {}
+            self.packages = collections.Counter()
+            self.rejects = collections.Counter()
+
+    def start_profiler(self, interval: float = 0.001) -> SamplingProfiler:
+        """Включить выборочный профилировщик текущего потока."""
+        if self.profiler is None:
+            self.profiler = SamplingProfiler(interval)
+        self.profiler.start()
+        return self.profiler
+
+    def stop_profiler(self) -> None:
+        """Выключить выборочный профилировщик, сохранив выборку."""
+        if self.profiler is not None:
+            self.profiler.stop()
+
+    def iter_messages(self,
+                      packages: Iterable[Package],
+                      rejects: Optional[List[Reject]] = None
+                      ) -> Iterator[str]:
+        """То же, что stream.iter_messages, плюс замеры этапов."""
+        if not self.enabled:
+            return iter_messages(packages, rejects)
+        return self._measured_messages(packages, rejects)
+
+    def _measured_messages(self,
+                           packages: Iterable[Package],
+                           rejects: Optional[List[Reject]]
+                           ) -> Iterator[str]:
+        clock = self.clock
+        started = 0.0
+        index = -1
+        package: Package = ('', ())
+
+        def marked() -> Iterator[Package]:
+            nonlocal started, index, package
+            for index, package in enumerate(packages):
+                started = clock()
+                yield package
+
+        if rejects is not None:
+            rejects = _RejectCounter(rejects, self.rejects)
+        for training in read_packages(marked(), rejects):
+            read = clock()
+            try:
+                distance = training.get_distance()
+                speed = training.get_mean_speed()
+                measured = clock()
+                calories = training.get_spent_calories()
+            except ArithmeticError as exc:
+                reject_arithmetic(exc, index, package, rejects)
+                continue
+            spent = clock()
+            message = InfoMessage(type(training).__name__, training.duration,
+                                  distance, speed, calories).get_message()
+            done = clock()
+            self._observe(package[0], started, read, measured, spent, done)
+            yield message
+
+    def _observe(self, workout_type: str, *marks: float) -> None:
+        """Записать длительности этапов STAGES между отметками marks."""
+        for stage, start, end in zip(STAGES, marks, marks[1:]):
+            self.histogram(stage, workout_type).observe(end - start)
+        self.packages[workout_type] += 1
+
+    def to_prometheus(self) -> str:
+        """Метрики в текстовом формате экспозиции Prometheus."""
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            packages = sorted(self.packages.items())
+            rejects = sorted(self.rejects.items())
+        lines = ['# HELP workout_packages_total Рассчитанные пакеты.',
+                 '# TYPE workout_packages_total counter']
+        lines += [f'workout_packages_total{{workout_type="{_label(code)}"}} '
+                  f'{count}' for code, count in packages]
+        lines += ['# HELP workout_rejects_total Отбракованные пакеты.',
+                  '# TYPE workout_rejects_total counter']
+        lines += [f'workout_rejects_total{{reason="{_label(reason)}"}} '
+                  f'{count}' for reason, count in rejects]
+        lines += ['# HELP workout_stage_seconds Задержка этапа расчёта.',
+                  '# TYPE workout_stage_seconds histogram']
+        for (stage, code), histogram in histograms:
+            labels = f'stage="{stage}",workout_type="{_label(code)}"'
+            bounds = [repr(bound) for bound in histogram.bounds] + ['+Inf']
+            for bound, count in zip(bounds, histogram.cumulative()):
+                lines.append(f'workout_stage_seconds_bucket'
+                             f'{{{labels},le="{bound}"}} {count}')
+            lines.append(f'workout_stage_seconds_sum{{{labels}}} '
+                         f'{histogram.total!r}')
+            lines.append(f'workout_stage_seconds_count{{{labels}}} '
+                         f'{histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path: str) -> None:
+        """Записать метрики в файл через временный файл и os.replace.
+
+        Подходит для textfile-коллектора node_exporter: читатель
+        никогда не видит недописанный файл.
+        """
+        temporary = f'{path}.{os.getpid()}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as output:
+            output.write(self.to_prometheus())
+        os.replace(temporary, path)
+
+    def serve(self,
+              port: int = 0,
+              host: str = '127.0.0.1') -> http.server.ThreadingHTTPServer:
+        """Отдавать метрики по адресу http://host:port/metrics.
+
+        Сервер работает в фоновом потоке-демоне; для остановки
+        вызовите shutdown() и server_close() у возвращённого объекта.
+        """
+        instrumentation = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = instrumentation.to_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args: object) -> None:
+                pass
+
+        httpd = http.server.ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=httpd.serve_forever, daemon=True,
+                         name='metrics-http').start()
+        return httpd
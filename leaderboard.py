@@ -0,0 +1,219 @@
+import heapq
+from dataclasses import dataclass
+from itertools import repeat
+from typing import (Any, Dict, Iterable, List, Optional, Sequence, Tuple,
+                    Union)
+
+from batch import ColumnarResult
+from compact import InfoMessageColumns
+from homework import InfoMessage
+from series import SegmentResult
+
+METRICS = ('distance', 'speed', 'calories')
+DEFAULT_K = 10
+
+Batch = Union[ColumnarResult, InfoMessageColumns, SegmentResult]
+# (значение, -номер, ключ, поля InfoMessage): наименьшая запись —
+# худшая в таблице; при равных значениях хуже более поздняя.
+Entry = Tuple[float, int, str, tuple]
+BoardKey = Tuple[str, str]
+
+
+@dataclass
+class Leader:
+    """
+    Класс. Строка таблицы лидеров.
+
+    Атрибуты
+    --------
+    value: float
+        значение показателя
+    key: str
+        кто показал результат: пользователь, тренировка
+    info: InfoMessage
+        результат тренировки целиком
+    """
+
+    value: float
+    key: str
+    info: InfoMessage
+
+
+def row_types(batch: Batch) -> Iterable[str]:
+    """Имя класса тренировки для каждой строки колоночного результата."""
+    type_index = getattr(batch, 'type_index', None)
+    if type_index is not None:
+        return map(batch.types.__getitem__, type_index)
+    if isinstance(batch.training_type, str):
+        return repeat(batch.training_type, len(batch))
+    return batch.training_type
+
+
+class Leaderboard:
+    """
+    Класс. Потоковые таблицы лидеров: top-K по виду и показателю.
+
+    Для каждой пары (класс тренировки, показатель) хранится
+    min-куча из k лучших результатов, так что память — O(k) на
+    таблицу при любой длине потока. Результат хуже k-го
+    отбрасывается одним сравнением с вершиной кучи, иначе
+    замещает её за O(log k). При равных значениях в таблице
+    остаётся результат, пришедший раньше. Значения NaN
+    не учитываются.
+
+    Таблицы сливаются: merge() с таблицами другого шарда даёт
+    то же, что расчёт по объединённому потоку (с точностью до
+    порядка равных значений из разных шардов). snapshot()
+    переносит состояние между процессами в JSON.
+
+    Атрибуты
+    --------
+    k: int
+        длина таблицы
+    metrics: Tuple[str, ...]
+        показатели InfoMessage, по которым ведутся таблицы
+    seen: int
+        сколько результатов учтено
+
+    Методы
+    ------
+    add(self, info, key='') -> None:
+        Учесть один результат.
+    add_columns(self, batch, keys=None) -> None:
+        Учесть колоночный результат расчёта.
+    top(self, training_type, metric) -> List[Leader]:
+        Таблица по убыванию значения.
+    merge(self, other) -> None:
+        Добавить таблицы другого экземпляра.
+    snapshot(self) -> Dict[str, Any]:
+        Состояние в виде JSON-совместимого словаря.
+    """
+
+    def __init__(self,
+                 k: int = DEFAULT_K,
+                 metrics: Sequence[str] = METRICS) -> None:
+        if k <= 0:
+            raise ValueError('k должен быть положительным')
+        unknown = set(metrics) - set(METRICS)
+        if unknown:
+            raise ValueError(f'Неизвестные показатели: '
+                             f'{", ".join(sorted(unknown))}')
+        self.k = k
+        self.metrics = tuple(metrics)
+        self.seen = 0
+        self._heaps: Dict[BoardKey, List[Entry]] = {}
+        self._by_type: Dict[str, List[Tuple[str, List[Entry]]]] = {}
+
+    def _boards(self, training_type: str) -> List[Tuple[str, List[Entry]]]:
+        """Пары (показатель, куча) класса; создаются при первом результате."""
+        boards = self._by_type.get(training_type)
+        if boards is None:
+            boards = self._by_type[training_type] = [
+                (metric, self._heaps.setdefault((training_type, metric), []))
+                for metric in self.metrics]
+        return boards
+
+    def _offer(self, heap: List[Entry], entry: Entry) -> None:
+        """Поставить запись в таблицу, если она лучше худшей."""
+        if len(heap) < self.k:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+
+    def add(self, info: InfoMessage, key: str = '') -> None:
+        """Учесть результат info; key — кому он принадлежит."""
+        order = -self.seen
+        self.seen += 1
+        fields = None
+        k = self.k
+        for metric, heap in self._boards(info.training_type):
+            value = getattr(info, metric)
+            if value != value or (len(heap) >= k and value <= heap[0][0]):
+                continue
+            if fields is None:
+                fields = (info.training_type, info.duration, info.distance,
+                          info.speed, info.calories)
+            self._offer(heap, (value, order, key, fields))
+
+    def add_columns(self,
+                    batch: Batch,
+                    keys: Optional[Sequence[str]] = None) -> None:
+        """Учесть колоночный результат без InfoMessage на каждую строку.
+
+        batch — ColumnarResult, SegmentResult или InfoMessageColumns;
+        keys — ключи строк по порядку. Строка, не попавшая в таблицу,
+        отбрасывается сравнением с вершиной кучи прямо в колонке.
+        """
+        first = self.seen
+        self.seen += len(batch)
+        k = self.k
+        for position, metric in enumerate(self.metrics):
+            heaps: Dict[str, List[Entry]] = {}
+            column = getattr(batch, metric)
+            for row, (kind, value) in enumerate(zip(row_types(batch),
+                                                    column)):
+                heap = heaps.get(kind)
+                if heap is None:
+                    heap = heaps[kind] = self._boards(kind)[position][1]
+                if value != value or (len(heap) >= k
+                                      and value <= heap[0][0]):
+                    continue
+                fields = (kind, batch.duration[row], batch.distance[row],
+                          batch.speed[row], batch.calories[row])
+                self._offer(heap, (value, -(first + row),
+                                   keys[row] if keys is not None else '',
+                                   fields))
+
+    def top(self, training_type: str, metric: str) -> List[Leader]:
+        """Таблица лидеров класса training_type по metric.
+
+        Возвращаемое значение
+        ---------------------
+        Не больше k строк по убыванию значения; пустой список,
+        если результатов такого класса не было.
+        """
+
+        heap = self._heaps.get((training_type, metric), [])
+        return [Leader(value, key, InfoMessage(*fields))
+                for value, _, key, fields in sorted(heap, reverse=True)]
+
+    def boards(self) -> List[BoardKey]:
+        """Пары (класс тренировки, показатель), по которым есть таблицы."""
+        return sorted(board for board, heap in self._heaps.items() if heap)
+
+    def merge(self, other: 'Leaderboard') -> None:
+        """Добавить таблицы other (например, другого шарда)."""
+        self.seen += other.seen
+        for kind, boards in other._by_type.items():
+            heaps = dict(self._boards(kind))
+            for metric, heap in boards:
+                if metric in heaps:
+                    for entry in heap:
+                        self._offer(heaps[metric], entry)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Состояние таблиц в виде JSON-совместимого словаря."""
+        return {
+            'k': self.k,
+            'metrics': list(self.metrics),
+            'seen': self.seen,
+            'boards': [
+                {'training_type': kind, 'metric': metric,
+                 'entries': [[value, order, key, list(fields)]
+                             for value, order, key, fields in heap]}
+                for (kind, metric), heap in self._heaps.items()
+            ],
+        }
+
+    @classmethod
+    def from_snapshot(cls, state: Dict[str, Any]) -> 'Leaderboard':
+        """Восстановить таблицы из snapshot()."""
+        leaderboard = cls(state['k'], state['metrics'])
+        leaderboard.seen = state['seen']
+        for board in state['boards']:
+            heaps = dict(leaderboard._boards(board['training_type']))
+            heap = heaps[board['metric']]
+            heap.extend((value, order, key, tuple(fields))
+                        for value, order, key, fields in board['entries'])
+            heapq.heapify(heap)
+        return leaderboard
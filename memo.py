@@ -0,0 +1,101 @@
+import inspect
+from functools import lru_cache
+from typing import Any, Callable, Dict, Sequence, Type
+
+from homework import Training, check_values, package_class
+
+
+class MemoizedMetrics:
+    """
+    Класс-примесь. Кэш дистанции, скорости и калорий на объекте тренировки.
+
+    Подмешивается перед классом тренировки (см. memoized). Каждая
+    метрика считается один раз на объект; изменение любого входного
+    атрибута сбрасывает кэш.
+
+    Переменные
+    ----------
+    WATCHED: frozenset
+        атрибуты, изменение которых сбрасывает кэш
+
+    Методы
+    ------
+    invalidate_metrics(self) -> None:
+        Сбросить кэш вручную.
+    cache_stats(self) -> Dict[str, int]:
+        Количество попаданий и промахов кэша.
+    """
+
+    WATCHED = frozenset(('action', 'duration', 'weight', 'height',
+                         'length_pool', 'count_pool'))
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        if name in self.WATCHED:
+            self.invalidate_metrics()
+
+    def invalidate_metrics(self) -> None:
+        """Сбросить кэш метрик."""
+        self.__dict__['_metrics'] = {}
+
+    def _cached(self, key: str, compute: Callable[[], float]) -> float:
+        """Вернуть метрику key из кэша или посчитать её через compute."""
+        state = self.__dict__
+        metrics = state.setdefault('_metrics', {})
+        if key in metrics:
+            state['cache_hits'] = state.get('cache_hits', 0) + 1
+            return metrics[key]
+        state['cache_misses'] = state.get('cache_misses', 0) + 1
+        value = metrics[key] = compute()
+        return value
+
+    def get_distance(self) -> float:
+        """Получить дистанцию в км (с кэшем)."""
+        return self._cached('distance', super().get_distance)
+
+    def get_mean_speed(self) -> float:
+        """Получить среднюю скорость движения (с кэшем)."""
+        return self._cached('speed', super().get_mean_speed)
+
+    def get_spent_calories(self) -> float:
+        """Получить количество затраченных калорий (с кэшем)."""
+        return self._cached('calories', super().get_spent_calories)
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Количество попаданий и промахов кэша этого объекта."""
+        return {'hits': self.__dict__.get('cache_hits', 0),
+                'misses': self.__dict__.get('cache_misses', 0)}
+
+
+@lru_cache(maxsize=None)
+def memoized(cls: Type[Training]) -> Type[Training]:
+    """Вернуть подкласс cls с кэшем метрик.
+
+    Имя подкласса совпадает с именем cls, поэтому
+    show_training_info выдаёт тот же training_type. Кэш
+    сбрасывается и при изменении любого параметра конструктора cls.
+    """
+    parameters = list(inspect.signature(cls.__init__).parameters)[1:]
+    return type(cls.__name__, (MemoizedMetrics, cls),
+                {'__doc__': f'Тренировка {cls.__name__} с кэшем метрик.',
+                 '__module__': __name__,
+                 '__qualname__': f'memoized({cls.__name__})',
+                 'WATCHED': MemoizedMetrics.WATCHED.union(parameters)})
+
+
+def read_package(workout_type: str,
+                 data: Sequence[float]
+                 ) -> Training:
+    """Аналог homework.read_package, создающий объекты с кэшем метрик.
+
+    Класс берётся из реестра WORKOUT_CLASSES, поэтому работают
+    и классы, добавленные через register_workout.
+
+    Исключения
+    ----------
+    UnknownWorkoutError, PackageArityError, PackageValueError
+        как у homework.read_package
+    """
+    training_class = package_class(workout_type, data)
+    check_values(workout_type, data)
+    return memoized(training_class)(*data)
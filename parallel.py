@@ -0,0 +1,245 @@
+import functools
+import itertools
+import os
+import time
+from collections import deque
+from concurrent.futures import (FIRST_COMPLETED, Future, ProcessPoolExecutor,
+                                as_completed, wait)
+from dataclasses import dataclass
+from typing import (Callable, Deque, Dict, Iterable, Iterator, List,
+                    Optional, Sequence, Set, Tuple)
+
+from compiled import score_packages
+from stream import read_records
+
+Package = Tuple[str, Sequence[float]]
+
+DEFAULT_CHUNK_SIZE = 2048
+MIN_PARALLEL_PACKAGES = 20000
+
+
+@dataclass
+class ChunkResult:
+    """
+    Класс. Результат обработки одного куска пакетов в процессе-воркере.
+
+    Атрибуты
+    --------
+    pid: int
+        идентификатор процесса, обработавшего кусок
+    count: int
+        количество пакетов в куске
+    seconds: float
+        время обработки куска
+    lines: List[str]
+        строки InfoMessage.get_message() в порядке пакетов
+    """
+
+    pid: int
+    count: int
+    seconds: float
+    lines: List[str]
+
+
+@dataclass
+class WorkerStats:
+    """
+    Класс. Накопленная статистика одного воркера.
+
+    Атрибуты
+    --------
+    pid: int
+        идентификатор процесса
+    chunks: int
+        количество обработанных кусков
+    packages: int
+        количество обработанных пакетов
+    seconds: float
+        суммарное время обработки
+    """
+
+    pid: int
+    chunks: int = 0
+    packages: int = 0
+    seconds: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Пакетов в секунду чистого времени обработки."""
+        if not self.seconds:
+            return 0.0
+        return self.packages / self.seconds
+
+
+def score_chunk(chunk: Sequence[Package]) -> ChunkResult:
+    """Рассчитать кусок пакетов; выполняется в процессе-воркере."""
+    started = time.perf_counter()
+    lines = [info.get_message() for info in score_packages(chunk)]
+    return ChunkResult(os.getpid(), len(lines),
+                       time.perf_counter() - started, lines)
+
+
+def score_text_chunk(fmt: str, chunk: Sequence[str]) -> ChunkResult:
+    """Разобрать и рассчитать кусок строк входного файла в воркере.
+
+    Разбор строк переносится в воркеры, чтобы главный процесс
+    не тратил время на разбор и сериализацию пакетов.
+    """
+    return score_chunk(list(read_records(chunk, fmt)))
+
+
+def chunked(iterable: Iterable, size: int) -> Iterator[List]:
+    """Разбить iterable на списки длиной не более size."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _record(stats: Optional[Dict[int, WorkerStats]],
+            result: ChunkResult) -> None:
+    """Учесть результат куска в статистике воркеров."""
+    if stats is None:
+        return
+    worker = stats.setdefault(result.pid, WorkerStats(result.pid))
+    worker.chunks += 1
+    worker.packages += result.count
+    worker.seconds += result.seconds
+
+
+def iter_parallel_messages(
+        packages: Iterable[Package],
+        workers: Optional[int] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        ordered: bool = True,
+        min_parallel: int = MIN_PARALLEL_PACKAGES,
+        stats: Optional[Dict[int, WorkerStats]] = None) -> Iterator[str]:
+    """Рассчитать пакеты в пуле процессов и вернуть строки сообщений.
+
+    Вход режется на куски по chunk_size пакетов. В работе одновременно
+    находится не больше двух кусков на воркер, поэтому вход читается
+    по мере обработки, а не целиком.
+
+    Параметры
+    ---------
+    packages: Iterable[Tuple[str, Sequence[float]]]
+        пакеты (workout_type, data)
+    workers, chunk_size, ordered, min_parallel, stats
+        см. iter_parallel_lines
+
+    Возвращаемое значение
+    ---------------------
+    Итератор строк InfoMessage.get_message()
+    """
+
+    return _run_pool(packages, score_chunk, workers, chunk_size, ordered,
+                     min_parallel, stats)
+
+
+def iter_parallel_lines(
+        lines: Iterable[str],
+        fmt: str = 'csv',
+        workers: Optional[int] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        ordered: bool = True,
+        min_parallel: int = MIN_PARALLEL_PACKAGES,
+        stats: Optional[Dict[int, WorkerStats]] = None) -> Iterator[str]:
+    """Разобрать и рассчитать строки входного файла в пуле процессов.
+
+    Параметры
+    ---------
+    lines: Iterable[str]
+        строки входа в формате fmt ('csv' или 'jsonl')
+    workers: int
+        количество процессов, по умолчанию os.cpu_count()
+    chunk_size: int
+        размер куска
+    ordered: bool
+        сохранять порядок входа; False отдаёт куски по готовности
+    min_parallel: int
+        если пакетов меньше, расчёт идёт в текущем процессе —
+        запуск пула стоил бы дороже самой работы
+    stats: Dict[int, WorkerStats]
+        если передан, пополняется статистикой по воркерам
+
+    Возвращаемое значение
+    ---------------------
+    Итератор строк InfoMessage.get_message()
+    """
+
+    return _run_pool(lines, functools.partial(score_text_chunk, fmt),
+                     workers, chunk_size, ordered, min_parallel, stats)
+
+
+def _ordered_results(pool: ProcessPoolExecutor,
+                     score: Callable[[Sequence], ChunkResult],
+                     chunks: Iterable[List],
+                     in_flight: int) -> Iterator[ChunkResult]:
+    """Результаты кусков в порядке входа."""
+    queue: Deque[Future] = deque()
+    for chunk in chunks:
+        queue.append(pool.submit(score, chunk))
+        if len(queue) >= in_flight:
+            yield queue.popleft().result()
+    while queue:
+        yield queue.popleft().result()
+
+
+def _unordered_results(pool: ProcessPoolExecutor,
+                       score: Callable[[Sequence], ChunkResult],
+                       chunks: Iterable[List],
+                       in_flight: int) -> Iterator[ChunkResult]:
+    """Результаты кусков по мере готовности."""
+    pending: Set[Future] = set()
+    for chunk in chunks:
+        pending.add(pool.submit(score, chunk))
+        if len(pending) >= in_flight:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    for future in as_completed(pending):
+        yield future.result()
+
+
+def _run_pool(items: Iterable,
+              score: Callable[[Sequence], ChunkResult],
+              workers: Optional[int],
+              chunk_size: int,
+              ordered: bool,
+              min_parallel: int,
+              stats: Optional[Dict[int, WorkerStats]]) -> Iterator[str]:
+    """Общий цикл пула: нарезка, отправка кусков и сбор результатов."""
+    workers = workers or os.cpu_count() or 1
+    chunks = chunked(items, chunk_size)
+    head: List[List] = []
+    buffered = 0
+    for chunk in chunks:
+        head.append(chunk)
+        buffered += len(chunk)
+        if buffered >= min_parallel:
+            break
+    else:
+        for chunk in head:
+            result = score(chunk)
+            _record(stats, result)
+            yield from result.lines
+        return
+
+    collect = _ordered_results if ordered else _unordered_results
+    with ProcessPoolExecutor(workers) as pool:
+        for result in collect(pool, score, itertools.chain(head, chunks),
+                              2 * workers):
+            _record(stats, result)
+            yield from result.lines
+
+
+def format_stats(stats: Dict[int, WorkerStats]) -> str:
+    """Отчёт о пропускной способности воркеров, по строке на процесс."""
+    lines = []
+    for worker in sorted(stats.values(), key=lambda item: item.pid):
+        lines.append(f'pid {worker.pid}: {worker.packages} пакетов, '
+                     f'{worker.chunks} кусков, '
+                     f'{format(worker.throughput, ".0f")} пакетов/с')
+    return '\n'.join(lines)
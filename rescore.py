@@ -0,0 +1,498 @@
+import argparse
+import contextlib
+import itertools
+import json
+import os
+import re
+import sys
+import time
+from array import array
+from dataclasses import dataclass, field
+from typing import (Any, Dict, Iterable, Iterator, List, Optional, Sequence,
+                    Tuple)
+
+from batch import (CODE_CLASS, EXTRA_COLUMNS, KERNELS, Kernel,
+                   columns_from_packages)
+from columnar import (FLOAT_COLUMNS, RAW_COLUMNS, RAW_MAGIC, ColumnarFile,
+                      ColumnarWriter, RawFile, write_prefix)
+from compiled import iter_checked
+from homework import Reject
+
+DEFAULT_CHUNK_ROWS = 1 << 20
+INGEST_CHUNK_ROWS = 65536
+# Имя версии становится частью имени файла результатов.
+VERSION_PATTERN = re.compile(r'[A-Za-z0-9][A-Za-z0-9._-]*')
+RAW_FILE = 'raw.wkrw'
+MANIFEST = 'versions.json'
+DEFAULT_VERSION = 'v1'
+
+Overrides = Dict[str, Dict[str, float]]
+# Класс с новыми константами, колоночное ядро и его доп. колонки.
+Target = Tuple[type, Kernel, Tuple[str, ...]]
+
+
+def _class_by_name(name: str) -> type:
+    for cls in CODE_CLASS.values():
+        if cls.__name__ == name:
+            return cls
+    raise ValueError(f'Неизвестный класс тренировки {name!r}')
+
+
+@dataclass
+class CoefficientSet:
+    """
+    Класс. Именованный набор констант классов тренировок.
+
+    overrides задаются относительно констант из homework, так что
+    набор описывает формулы целиком и не зависит от того, от какой
+    версии он пересчитывается.
+
+    Атрибуты
+    --------
+    version: str
+        имя версии результатов, посчитанных с этим набором:
+        латинские буквы, цифры, '.', '_' и '-', не с точки
+        и не с дефиса
+    overrides: Dict[str, Dict[str, float]]
+        {имя класса: {константа: значение}}, например
+        {'Running': {'COEFF_CALORIE_1': 18.5}}
+
+    Методы
+    ------
+    training_class(self, cls) -> type:
+        Класс с подставленными константами.
+    parse(cls, version, assignments) -> CoefficientSet:
+        Набор из строк вида 'Running.COEFF_CALORIE_1=18.5'.
+    """
+
+    version: str
+    overrides: Overrides = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        if not VERSION_PATTERN.fullmatch(self.version):
+            raise ValueError(f'Недопустимое имя версии {self.version!r}')
+        for name, constants in self.overrides.items():
+            cls = _class_by_name(name)
+            for constant, value in constants.items():
+                current = getattr(cls, constant, None)
+                if not constant.isupper() or isinstance(current, bool) \
+                        or not isinstance(current, (int, float)):
+                    raise ValueError(
+                        f'У {name} нет числовой константы {constant!r}')
+                if not isinstance(value, (int, float)):
+                    raise ValueError(f'{name}.{constant}: ожидается число')
+
+    def constants(self, cls: type) -> Dict[str, float]:
+        """Переопределённые константы класса cls."""
+        return self.overrides.get(cls.__name__, {})
+
+    def training_class(self, cls: type) -> type:
+        """cls или его подкласс с тем же именем и новыми константами.
+
+        Колоночные ядра batch читают константы из класса, так что
+        подкласс подставляется в них без изменения формул.
+        """
+        constants = self.constants(cls)
+        if not constants:
+            return cls
+        return type(cls.__name__, (cls,), dict(constants))
+
+    @classmethod
+    def parse(cls, version: str,
+              assignments: Iterable[str]) -> 'CoefficientSet':
+        """Набор из строк 'Класс.КОНСТАНТА=значение'."""
+        overrides: Overrides = {}
+        for assignment in assignments:
+            target, _, value = assignment.partition('=')
+            name, _, constant = target.partition('.')
+            if not value or not constant:
+                raise ValueError(f'Ожидается Класс.КОНСТАНТА=значение, '
+                                 f'получено {assignment!r}')
+            overrides.setdefault(name.strip(), {})[constant.strip()] = \
+                float(value)
+        return cls(version, overrides)
+
+
+@dataclass
+class RescoreReport:
+    """
+    Класс. Итог пересчёта.
+
+    Атрибуты
+    --------
+    version: str
+        версия результатов
+    rows: int
+        строк в файле результатов
+    rescored: int
+        строк, посчитанных заново; остальные скопированы из базы
+    codes: List[str]
+        коды тренировок, которые пересчитывались
+    seconds: float
+        время пересчёта
+    """
+
+    version: str
+    rows: int
+    rescored: int
+    codes: List[str]
+    seconds: float
+
+    @property
+    def throughput(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def _affected_codes(codes: Sequence[str],
+                    coefficients: CoefficientSet,
+                    base: Optional[CoefficientSet]) -> List[str]:
+    """Коды, результаты которых меняются при переходе от base."""
+    if base is None:
+        return list(codes)
+    return [code for code in codes
+            if coefficients.constants(CODE_CLASS[code])
+            != base.constants(CODE_CLASS[code])]
+
+
+def _rescore_chunk(raw: RawFile,
+                   start: int,
+                   stop: int,
+                   targets: Dict[int, Target],
+                   columns: List[array]) -> int:
+    """Пересчитать строки [start, stop) кодов targets в columns.
+
+    columns — duration, distance, speed, calories отрезка;
+    строки других кодов не трогаются.
+
+    Возвращаемое значение
+    ---------------------
+    Количество пересчитанных строк: int
+    """
+
+    with raw.type_index[start:stop] as type_index:
+        groups = {index: [row for row, code in enumerate(type_index)
+                          if code == index]
+                  for index in targets}
+    views = {name: getattr(raw, name)[start:stop] for name in RAW_COLUMNS}
+    try:
+        for index, (cls, kernel, extra) in targets.items():
+            rows = groups[index]
+            gathered = {name: [views[name][row] for row in rows]
+                        for name in ('action', 'duration', 'weight', *extra)}
+            results = kernel(cls, **gathered)
+            for column, values in zip(columns[1:], results):
+                for row, value in zip(rows, values):
+                    column[row] = value
+            for row, value in zip(rows, gathered['duration']):
+                columns[0][row] = value
+    finally:
+        for view in views.values():
+            view.release()
+    return sum(map(len, groups.values()))
+
+
+def _targets(raw: RawFile,
+             codes: Iterable[str],
+             coefficients: CoefficientSet) -> Dict[int, Target]:
+    """{номер кода в raw: (класс с новыми константами, ядро, колонки)}."""
+    targets = {}
+    for code in codes:
+        cls = CODE_CLASS[code]
+        kernel = KERNELS.get(cls)
+        if kernel is None:
+            raise ValueError(f'Для {cls.__name__} нет колоночного ядра')
+        targets[raw.types.index(code)] = (
+            coefficients.training_class(cls), kernel, EXTRA_COLUMNS[cls])
+    return targets
+
+
+def rescore_file(raw_path: str,
+                 output_path: str,
+                 coefficients: CoefficientSet,
+                 base_path: Optional[str] = None,
+                 base_coefficients: Optional[CoefficientSet] = None,
+                 chunk_rows: int = DEFAULT_CHUNK_ROWS) -> RescoreReport:
+    """Пересчитать историю из файла параметров с новыми константами.
+
+    Если передана база — результаты тех же пакетов, посчитанные
+    с base_coefficients, — заново считаются только строки тех видов
+    тренировок, константы которых отличаются; остальные строки
+    копируются из базы колонками. Без базы считается всё.
+    Расчёт идёт отрезками по chunk_rows строк колоночными ядрами
+    batch, так что память не зависит от длины истории, а результат
+    совпадает с read_package(...).show_training_info() до бита.
+
+    Параметры
+    ---------
+    raw_path: str
+        файл columnar.write_raw
+    output_path: str
+        куда записать колоночный файл результатов
+    coefficients: CoefficientSet
+        новый набор констант
+    base_path: str
+        файл результатов тех же строк (columnar.write_columnar)
+    base_coefficients: CoefficientSet
+        набор, с которым посчитана база
+
+    Возвращаемое значение
+    ---------------------
+    Объект RescoreReport.
+    """
+
+    started = time.perf_counter()
+    with RawFile(raw_path) as raw:
+        base = ColumnarFile(base_path) if base_path is not None else None
+        try:
+            if base is not None and len(base) != len(raw):
+                raise ValueError('В базе и в файле параметров разное '
+                                 'число строк')
+            codes = _affected_codes(
+                raw.types, coefficients,
+                base_coefficients if base is not None else None)
+            rescored = _write_results(raw, base,
+                                      _targets(raw, codes, coefficients),
+                                      output_path, chunk_rows)
+        finally:
+            if base is not None:
+                base.close()
+        rows = len(raw)
+    return RescoreReport(coefficients.version, rows, rescored, codes,
+                         time.perf_counter() - started)
+
+
+def _write_results(raw: RawFile,
+                   base: Optional[ColumnarFile],
+                   targets: Dict[int, Target],
+                   output_path: str,
+                   chunk_rows: int) -> int:
+    """Записать файл результатов отрезками; вернуть число пересчётов.
+
+    Индексы типов у результатов те же, что у raw: таблица имён —
+    имена классов кодов raw по порядку.
+    """
+    rows = len(raw)
+    rescored = 0
+    temporary = f'{output_path}.tmp'
+    with _removed_on_error(temporary), open(temporary, 'wb') as output:
+        start = write_prefix(output,
+                             [CODE_CLASS[code].__name__ for code in raw.types],
+                             raw.type_index)
+        output.truncate(start + 8 * rows * len(FLOAT_COLUMNS))
+        for lo in range(0, rows, chunk_rows):
+            hi = min(lo + chunk_rows, rows)
+            if base is not None:
+                columns = [array('d', getattr(base, name)[lo:hi])
+                           for name in FLOAT_COLUMNS]
+            else:
+                columns = [array('d', bytes(8 * (hi - lo)))
+                           for _ in FLOAT_COLUMNS]
+            rescored += _rescore_chunk(raw, lo, hi, targets, columns)
+            for position, column in enumerate(columns):
+                output.seek(start + 8 * (position * rows + lo))
+                output.write(column)
+    os.replace(temporary, output_path)
+    return rescored
+
+
+@contextlib.contextmanager
+def _removed_on_error(path: str) -> Iterator[None]:
+    """Удалить недописанный временный файл path, если блок упал."""
+    try:
+        yield
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+        raise
+
+
+def _checked_packages(packages: Iterable[Tuple[str, Sequence[float]]],
+                      rejects: Optional[List[Reject]]
+                      ) -> Iterator[Tuple[str, Sequence[float]]]:
+    """Корректные пакеты, которые можно пересчитывать ядрами batch."""
+    for code, cls, data in iter_checked(packages, rejects):
+        if cls not in KERNELS:
+            raise ValueError(f'Для {cls.__name__} нет колоночного ядра')
+        yield code, data
+
+
+class ScoreHistory:
+    """
+    Класс. История пакетов и версии её результатов в каталоге.
+
+    Параметры пакетов лежат один раз в raw.wkrw (columnar.write_raw),
+    результаты каждой версии констант — в своём колоночном файле
+    scores-ВЕРСИЯ.wkcl, описание версий — в versions.json. Новая
+    версия считается от существующей: пересчитываются только виды
+    тренировок, чьи константы отличаются, так что старые и новые
+    результаты лежат рядом и читаются без копирования
+    (ColumnarFile).
+
+    Методы
+    ------
+    ingest(self, packages, coefficients=None, rejects=None) -> RescoreReport:
+        Записать параметры пакетов и первую версию результатов.
+    rescore(self, coefficients, base=None) -> RescoreReport:
+        Посчитать новую версию.
+    versions(self) -> List[str]:
+        Версии по порядку создания.
+    coefficients(self, version) -> CoefficientSet:
+        Набор констант версии.
+    open(self, version) -> ColumnarFile:
+        Результаты версии, отображённые в память.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self.raw_path = os.path.join(directory, RAW_FILE)
+        self._manifest_path = os.path.join(directory, MANIFEST)
+        self._versions: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(self._manifest_path):
+            with open(self._manifest_path, encoding='utf-8') as source:
+                self._versions = json.load(source)['versions']
+
+    def _results_path(self, version: str) -> str:
+        return os.path.join(self.directory, f'scores-{version}.wkcl')
+
+    def _save(self) -> None:
+        temporary = self._manifest_path + '.tmp'
+        with open(temporary, 'w', encoding='utf-8') as output:
+            json.dump({'versions': self._versions}, output, indent=2)
+        os.replace(temporary, self._manifest_path)
+
+    def versions(self) -> List[str]:
+        return list(self._versions)
+
+    def coefficients(self, version: str) -> CoefficientSet:
+        """Набор констант, с которым посчитана версия."""
+        return CoefficientSet(version, self._versions[version]['overrides'])
+
+    def open(self, version: str) -> ColumnarFile:
+        """Результаты версии; файл нужно закрыть."""
+        if version not in self._versions:
+            raise KeyError(version)
+        return ColumnarFile(self._results_path(version))
+
+    def ingest(self,
+               packages: Iterable[Tuple[str, Sequence[float]]],
+               coefficients: Optional[CoefficientSet] = None,
+               rejects: Optional[List[Reject]] = None,
+               chunk_rows: int = INGEST_CHUNK_ROWS) -> RescoreReport:
+        """Записать параметры пакетов и посчитать первую версию.
+
+        Пакеты проверяются, как в read_packages, и пишутся в файл
+        параметров кусками по chunk_rows, так что память не зависит
+        от длины истории. Файлы пишутся во временные и ставятся
+        на место через os.replace: если ingest упал, история
+        не создана и ingest можно повторить.
+
+        Параметры
+        ---------
+        packages: Iterable[Tuple[str, Sequence[float]]]
+            пакеты (workout_type, data)
+        coefficients: CoefficientSet
+            набор констант первой версии, по умолчанию — из homework
+        rejects: List[Reject]
+            куда складывать отбракованные пакеты; если не передан,
+            первая ошибка пробрасывается как PackageError
+
+        Исключения
+        ----------
+        FileExistsError
+            история в каталоге уже есть
+        PackageError
+            некорректный пакет, если не передан rejects
+        ValueError
+            для класса тренировки нет колоночного ядра
+        """
+
+        if self._versions:
+            raise FileExistsError(self._manifest_path)
+        os.makedirs(self.directory, exist_ok=True)
+        temporary = f'{self.raw_path}.tmp'
+        checked = _checked_packages(packages, rejects)
+        with _removed_on_error(temporary), \
+                ColumnarWriter(temporary, RAW_MAGIC) as writer:
+            for chunk in iter(lambda: list(itertools.islice(checked,
+                                                            chunk_rows)), []):
+                writer.extend(columns_from_packages(chunk))
+        os.replace(temporary, self.raw_path)
+        return self._record(coefficients or CoefficientSet(DEFAULT_VERSION),
+                            None)
+
+    def rescore(self,
+                coefficients: CoefficientSet,
+                base: Optional[str] = None) -> RescoreReport:
+        """Посчитать версию coefficients.version от версии base.
+
+        По умолчанию база — последняя версия.
+        """
+        if coefficients.version in self._versions:
+            raise ValueError(f'Версия {coefficients.version!r} уже есть')
+        if not self._versions:
+            raise ValueError('История пуста: сначала ingest')
+        return self._record(coefficients, base or self.versions()[-1])
+
+    def _record(self,
+                coefficients: CoefficientSet,
+                base: Optional[str]) -> RescoreReport:
+        version = coefficients.version
+        report = rescore_file(
+            self.raw_path, self._results_path(version), coefficients,
+            self._results_path(base) if base is not None else None,
+            self.coefficients(base) if base is not None else None)
+        self._versions[version] = {
+            'overrides': coefficients.overrides,
+            'base': base,
+            'rows': report.rows,
+            'rescored': report.rescored,
+        }
+        self._save()
+        return report
+
+
+def _format_report(report: RescoreReport) -> str:
+    return (f'{report.version}: строк {report.rows}, пересчитано '
+            f'{report.rescored} ({", ".join(report.codes) or "-"}), '
+            f'{format(report.seconds, ".2f")} с, '
+            f'{format(report.throughput, ".0f")} строк/с')
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Точка входа: `python cli.py rescore ingest|apply|list КАТАЛОГ`."""
+    parser = argparse.ArgumentParser(
+        prog='cli.py rescore',
+        description='История пакетов и её пересчёт с новыми константами.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    ingest = commands.add_parser('ingest', help='записать историю')
+    ingest.add_argument('directory')
+    ingest.add_argument('path', help='файл пакетов CSV/JSON Lines')
+    ingest.add_argument('--format', default=None)
+    ingest.add_argument('--version', default=DEFAULT_VERSION)
+    apply = commands.add_parser('apply', help='посчитать новую версию')
+    apply.add_argument('directory')
+    apply.add_argument('--version', required=True)
+    apply.add_argument('--set', dest='assignments', action='append',
+                       default=[], metavar='Класс.КОНСТАНТА=ЗНАЧЕНИЕ')
+    apply.add_argument('--base', default=None,
+                       help='версия-основа, по умолчанию последняя')
+    listing = commands.add_parser('list', help='перечислить версии')
+    listing.add_argument('directory')
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    history = ScoreHistory(args.directory)
+    if args.command == 'list':
+        for version in history.versions():
+            print(version, json.dumps(history.coefficients(version).overrides,
+                                      ensure_ascii=False))
+        return 0
+    if args.command == 'ingest':
+        from compressed import iter_lines, strip_suffix
+        from stream import detect_format, read_records
+        fmt = args.format or detect_format(strip_suffix(args.path))
+        report = history.ingest(read_records(iter_lines([args.path]), fmt),
+                                CoefficientSet(args.version))
+    else:
+        report = history.rescore(
+            CoefficientSet.parse(args.version, args.assignments), args.base)
+    print(_format_report(report))
+    return 0
@@ -0,0 +1,216 @@
+import mmap
+import os
+import struct
+import sys
+from typing import (IO, Dict, Iterable, Iterator, List, Optional, Sequence,
+                    Tuple, Union)
+
+from batch import CODE_CLASS, ColumnarResult, score_columns
+from homework import Training, read_package
+
+RECORD = struct.Struct('<4sB3x5d')
+MAX_FIELDS = 5
+SLOTS = RECORD.size // 8
+CODE_WORDS = RECORD.size // 4
+
+Package = Tuple[str, Sequence[float]]
+
+
+class RecordError(ValueError):
+    """Файл или запись не соответствуют формату пакетов датчиков."""
+
+
+def _code_word(code: str) -> int:
+    """Код тренировки как little-endian uint32 из первых 4 байт записи."""
+    return struct.unpack('<I', code.encode('ascii').ljust(4, b'\0'))[0]
+
+
+def pack_record(workout_type: str, data: Sequence[float]) -> bytes:
+    """Упаковать один пакет в запись фиксированной длины.
+
+    Запись (48 байт, little-endian): код тренировки ASCII
+    в 4 байтах с нулями справа, число полей (uint8), 3 байта
+    выравнивания, 5 полей float64 (неиспользуемые — нули).
+
+    Исключения
+    ----------
+    RecordError
+        полей больше MAX_FIELDS или код длиннее 4 байт
+    """
+    if len(data) > MAX_FIELDS:
+        raise RecordError(f'В записи не больше {MAX_FIELDS} полей')
+    code = workout_type.encode('ascii')
+    if len(code) > 4:
+        raise RecordError(f'Код {workout_type!r} длиннее 4 байт')
+    values = list(data) + [0.0] * (MAX_FIELDS - len(data))
+    return RECORD.pack(code, len(data), *values)
+
+
+def write_records(target: Union[str, IO[bytes]],
+                  packages: Iterable[Package]) -> int:
+    """Записать пакеты в файл записей фиксированной длины.
+
+    Возвращаемое значение
+    ---------------------
+    Количество записей: int
+    """
+
+    count = 0
+    output = open(target, 'wb') if isinstance(target, str) else target
+    try:
+        for workout_type, data in packages:
+            output.write(pack_record(workout_type, data))
+            count += 1
+    finally:
+        if isinstance(target, str):
+            output.close()
+    return count
+
+
+class SensorFile:
+    """
+    Класс. Файл пакетов датчиков, отображённый в память.
+
+    Все представления — memoryview поверх mmap: записи
+    не копируются и не превращаются в списки. Поле j всех записей
+    доступно как шаговое представление values[1 + j::6].
+
+    Атрибуты
+    --------
+    values: memoryview
+        файл как массив float64, по 6 значений на запись
+    action, duration, weight, field_4, field_5: memoryview
+        поля записей по порядку аргументов конструктора тренировки;
+        field_4 — рост или длина бассейна, field_5 — count_pool
+
+    Методы
+    ------
+    code(self, index) -> str:
+        Код тренировки записи.
+    record(self, index) -> Tuple[str, memoryview]:
+        Код и поля записи без копирования.
+    training(self, index) -> Training:
+        Объект тренировки для записи.
+    score(self, start, stop) -> ColumnarResult:
+        Колоночный расчёт диапазона записей.
+    """
+
+    def __init__(self, path: str) -> None:
+        if sys.byteorder != 'little':
+            raise RecordError('Чтение без копирования требует '
+                              'little-endian платформы')
+        with open(path, 'rb') as source:
+            if not os.fstat(source.fileno()).st_size:
+                raise RecordError('Файл пакетов пуст')
+            mapped = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(mapped) % RECORD.size:
+            mapped.close()
+            raise RecordError(f'Размер файла не кратен {RECORD.size} байтам')
+        self._map: Optional[mmap.mmap] = mapped
+        self._view = memoryview(mapped)
+        self._words = self._view.cast('I')
+        self._bytes = self._view.cast('B')
+        self.values = self._view.cast('d')
+        self._codes = self._words[0::CODE_WORDS]
+        self._counts = self._bytes[4::RECORD.size]
+        (self.action, self.duration, self.weight,
+         self.field_4, self.field_5) = [self.values[1 + field::SLOTS]
+                                        for field in range(MAX_FIELDS)]
+        self._code_names: Dict[int, str] = {
+            _code_word(code): code for code in CODE_CLASS}
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def code(self, index: int) -> str:
+        """Код тренировки записи index."""
+        word = self._codes[index]
+        name = self._code_names.get(word)
+        if name is None:
+            name = struct.pack('<I', word).rstrip(b'\0').decode('ascii')
+            self._code_names[word] = name
+        return name
+
+    def record(self, index: int) -> Tuple[str, memoryview]:
+        """Код и поля записи index; поля — срез values без копирования.
+
+        Исключения
+        ----------
+        RecordError
+            число полей в записи больше MAX_FIELDS (запись испорчена)
+        """
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('Номер записи вне файла')
+        count = self._counts[index]
+        if count > MAX_FIELDS:
+            raise RecordError(f'В записи {index} число полей {count} '
+                              f'больше {MAX_FIELDS}')
+        start = index * SLOTS + 1
+        return self.code(index), self.values[start:start + count]
+
+    def training(self, index: int) -> Training:
+        """Объект тренировки для записи index."""
+        code, fields = self.record(index)
+        return read_package(code, fields)
+
+    def iter_records(self,
+                     start: int = 0,
+                     stop: Optional[int] = None
+                     ) -> Iterator[Tuple[str, memoryview]]:
+        """Записи диапазона [start, stop) по одной."""
+        for index in range(*slice(start, stop).indices(len(self))):
+            yield self.record(index)
+
+    def score(self,
+              start: int = 0,
+              stop: Optional[int] = None) -> ColumnarResult:
+        """Рассчитать записи [start, stop) колоночным движком.
+
+        Колонки передаются в batch.score_columns как шаговые срезы
+        memoryview, без промежуточных списков на запись.
+
+        Исключения
+        ----------
+        UnknownWorkoutError
+            в диапазоне есть запись с незарегистрированным кодом
+        """
+        window = slice(start, stop)
+        codes = [self.code(index)
+                 for index in range(*window.indices(len(self)))]
+        return score_columns(codes,
+                             self.action[window],
+                             self.duration[window],
+                             self.weight[window],
+                             height=self.field_4[window],
+                             length_pool=self.field_4[window],
+                             count_pool=self.field_5[window])
+
+    def close(self) -> None:
+        """Освободить представления и отображение файла.
+
+        Если у вызывающего кода ещё живы поля из record() или
+        iter_records(), отображение не закрывается сразу: файл
+        отпускает ссылку на него, и оно закроется, когда будут
+        освобождены последние такие поля.
+        """
+        views: List[memoryview] = [self.action, self.duration, self.weight,
+                                   self.field_4, self.field_5, self._codes,
+                                   self._counts, self.values, self._bytes,
+                                   self._words, self._view]
+        for view in views:
+            view.release()
+        if self._map is None:
+            return
+        try:
+            self._map.close()
+        except BufferError:
+            pass
+        self._map = None
+
+    def __enter__(self) -> 'SensorFile':
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
@@ -0,0 +1,225 @@
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from batch import CODE_CLASS, EXTRA_COLUMNS, KERNELS, Column, Kernel
+from homework import InfoMessage, UnknownWorkoutError
+
+SECONDS_IN_HOUR = 3600
+DEFAULT_CHUNK_SIZE = 65536
+
+
+@dataclass
+class SegmentResult:
+    """
+    Класс. Показатели тренировки по отрезкам временного ряда.
+
+    Колонки — array('d') по одному значению на отрезок.
+
+    Атрибуты
+    --------
+    training_type: str
+        имя класса тренировки
+    start: array
+        время начала отрезка, секунды
+    duration: array
+        длительность отрезка в часах
+    distance: array
+        дистанция отрезка в км
+    speed: array
+        средняя скорость на отрезке в км/ч
+    calories: array
+        калории по формуле класса для отрезка
+    total: InfoMessage
+        итог по всей сессии: то же, что read_package
+        для суммарных показателей
+    """
+
+    training_type: str
+    start: array
+    duration: array
+    distance: array
+    speed: array
+    calories: array
+    total: InfoMessage
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    def message(self, index: int) -> InfoMessage:
+        """InfoMessage для отрезка с номером index."""
+        return InfoMessage(self.training_type,
+                           self.duration[index],
+                           self.distance[index],
+                           self.speed[index],
+                           self.calories[index])
+
+
+def _check_series(timestamps: Column, *counts: Column) -> None:
+    """Проверить длины рядов и монотонность отсчётов."""
+    if len(timestamps) < 2:
+        raise ValueError('Нужно не меньше двух отсчётов')
+    for column in counts:
+        if len(column) != len(timestamps):
+            raise ValueError('Длины рядов не совпадают')
+        if any(b < a for a, b in zip(column, islice(column, 1, None))):
+            raise ValueError('Накопленный счётчик уменьшается')
+    if any(b <= a for a, b in zip(timestamps, islice(timestamps, 1, None))):
+        raise ValueError('Время отсчётов должно строго возрастать')
+
+
+def segment_bounds(timestamps: Column,
+                   segment_seconds: Optional[float] = None
+                   ) -> Sequence[int]:
+    """Номера отсчётов, на которых начинаются и кончаются отрезки.
+
+    Без segment_seconds каждый интервал между соседними отсчётами —
+    отдельный отрезок. Иначе отрезок — все отсчёты, попавшие
+    в одно окно длины segment_seconds от первого отсчёта;
+    границей служит первый отсчёт следующего окна. Границы ищутся
+    двоичным поиском по краям окон, по шагу на отрезок, а не
+    на отсчёт.
+    """
+    size = len(timestamps)
+    if segment_seconds is None:
+        return range(size)
+    if segment_seconds <= 0:
+        raise ValueError('segment_seconds должен быть положительным')
+    first = timestamps[0]
+    bounds = array('L', [0])
+    index = 0
+    while True:
+        window = (timestamps[index] - first) // segment_seconds
+        index = bisect_left(timestamps,
+                            first + (window + 1) * segment_seconds,
+                            index + 1)
+        if index >= size:
+            break
+        bounds.append(index)
+    if bounds[-1] != size - 1:
+        bounds.append(size - 1)
+    return bounds
+
+
+def _deltas(column: Column, bounds: Sequence[int], begin: int,
+            end: int, scale: float = 1) -> List[float]:
+    """Приращения column между границами bounds[begin:end + 1]."""
+    return [(column[bounds[i + 1]] - column[bounds[i]]) / scale
+            for i in range(begin, end)]
+
+
+def _chunks(count: int, chunk_size: int) -> Iterator[range]:
+    for begin in range(0, count, chunk_size):
+        yield range(begin, min(begin + chunk_size, count))
+
+
+def score_series(workout_type: str,
+                 timestamps: Column,
+                 counts: Column,
+                 weight: float,
+                 height: Optional[float] = None,
+                 length_pool: Optional[float] = None,
+                 laps: Optional[Column] = None,
+                 segment_seconds: Optional[float] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE) -> SegmentResult:
+    """Рассчитать тренировку по временному ряду накопленных счётчиков.
+
+    Для каждого отрезка число действий — приращение counts,
+    длительность — приращение timestamps в часах; дальше
+    применяется колоночное ядро batch с формулами класса
+    тренировки, так что отрезок считается так же, как пакет
+    read_package(workout_type, [действия, часы, вес, ...]).
+    Ряды читаются по индексам и могут быть array, memoryview
+    или списками; результаты копятся в array('d') пачками
+    по chunk_size отрезков, без объекта на отсчёт.
+
+    Параметры
+    ---------
+    workout_type: str
+        код тренировки ('RUN', 'WLK', 'SWM')
+    timestamps: Sequence[float]
+        время отсчётов в секундах, строго по возрастанию
+    counts: Sequence[float]
+        накопленное число шагов или гребков
+    weight: float
+        вес спортсмена
+    height: float
+        рост, нужен для 'WLK'
+    length_pool: float
+        длина бассейна, нужна для 'SWM'
+    laps: Sequence[float]
+        накопленное число бассейнов, нужно для 'SWM'
+    segment_seconds: float
+        длина окна отрезка; None — каждый интервал между отсчётами
+
+    Возвращаемое значение
+    ---------------------
+    Объект SegmentResult.
+    """
+
+    cls = CODE_CLASS.get(workout_type)
+    if cls is None:
+        raise UnknownWorkoutError(workout_type)
+    kernel = KERNELS.get(cls)
+    if kernel is None:
+        raise ValueError(f'Для {cls.__name__} нет колоночного ядра')
+    constants = {'height': height, 'length_pool': length_pool}
+    provided = dict(constants, count_pool=laps)
+    missing = [name for name in EXTRA_COLUMNS[cls] if provided[name] is None]
+    if missing:
+        raise ValueError(f'Для кода {workout_type!r} не переданы: '
+                         f'{", ".join(missing)}')
+    _check_series(timestamps, counts, *([laps] if laps is not None else []))
+    bounds = segment_bounds(timestamps, segment_seconds)
+    result = SegmentResult(cls.__name__, array('d'), array('d'),
+                           array('d'), array('d'), array('d'),
+                           _total(cls, kernel, timestamps, counts, weight,
+                                  constants, laps))
+    for chunk in _chunks(len(bounds) - 1, chunk_size):
+        begin, end = chunk.start, chunk.stop
+        duration = _deltas(timestamps, bounds, begin, end, SECONDS_IN_HOUR)
+        extra = _extra(cls, constants, laps, bounds, begin, end)
+        distance, speed, calories = kernel(
+            cls, _deltas(counts, bounds, begin, end), duration,
+            [weight] * len(chunk), **extra)
+        result.start.extend(timestamps[bounds[i]] for i in chunk)
+        result.duration.extend(duration)
+        result.distance.extend(distance)
+        result.speed.extend(speed)
+        result.calories.extend(calories)
+    return result
+
+
+def _extra(cls: type,
+           constants: Dict[str, Optional[float]],
+           laps: Optional[Column],
+           bounds: Sequence[int],
+           begin: int,
+           end: int) -> Dict[str, List[float]]:
+    """Дополнительные колонки ядра для отрезков [begin, end)."""
+    extra = {}
+    for name in EXTRA_COLUMNS[cls]:
+        if name == 'count_pool':
+            extra[name] = _deltas(laps, bounds, begin, end)
+        else:
+            extra[name] = [constants[name]] * (end - begin)
+    return extra
+
+
+def _total(cls: type,
+           kernel: Kernel,
+           timestamps: Column,
+           counts: Column,
+           weight: float,
+           constants: Dict[str, Optional[float]],
+           laps: Optional[Column]) -> InfoMessage:
+    """Итог сессии тем же ядром, что и отрезки, одной строкой."""
+    last = len(timestamps) - 1
+    duration = [(timestamps[last] - timestamps[0]) / SECONDS_IN_HOUR]
+    extra = _extra(cls, constants, laps, (0, last), 0, 1)
+    distance, speed, calories = kernel(cls, [counts[last] - counts[0]],
+                                       duration, [weight], **extra)
+    return InfoMessage(cls.__name__, duration[0], distance[0], speed[0],
+                       calories[0])
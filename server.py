@@ -0,0 +1,349 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import sys
+from concurrent.futures import Executor
+from dataclasses import asdict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from cache import PackageCache
+from homework import PackageError, read_package
+
+Package = Tuple[str, Sequence[float]]
+
+DEFAULT_MAX_IN_FLIGHT = 256
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+FRAME_LIMIT = 64 * 1024
+
+
+def score_frame(frame: bytes,
+                cache: Optional[PackageCache] = None) -> Dict[str, Any]:
+    """Рассчитать один кадр протокола.
+
+    Кадр — строка JSON вида
+    `{"id": 1, "workout_type": "RUN", "data": [15000, 1, 75]}`;
+    поле id необязательно и возвращается в ответе как есть.
+    Если передан cache, результат берётся из него или
+    считается и кладётся туда.
+
+    Возвращаемое значение
+    ---------------------
+    Ответ: поля InfoMessage и строка message,
+    либо поле error с описанием ошибки и, для некорректного
+    пакета, поле reason с кодом причины.
+    """
+
+    request_id = None
+    try:
+        request = json.loads(frame)
+        request_id = request.get('id')
+        if cache is None:
+            info = read_package(request['workout_type'],
+                                request['data']).show_training_info()
+        else:
+            info = cache.get_info(request['workout_type'], request['data'])
+    except PackageError as exc:
+        return {'id': request_id, 'error': str(exc), 'reason': exc.reason}
+    except Exception as exc:
+        return {'id': request_id, 'error': f'{type(exc).__name__}: {exc}'}
+    response = asdict(info)
+    response['id'] = request_id
+    response['message'] = info.get_message()
+    return response
+
+
+class ScoringServer:
+    """
+    Класс. Asyncio-сервер расчёта пакетов по TCP или Unix-сокету.
+
+    Кадры — строки JSON, разделённые переводом строки. Клиент может
+    отправлять запросы, не дожидаясь ответов (конвейер); ответы
+    приходят в порядке запросов.
+
+    Атрибуты
+    --------
+    max_in_flight: int
+        сколько запросов всех соединений может обрабатываться
+        или ждать отправки ответа; при превышении сервер
+        перестаёт читать сокеты
+    executor: Optional[Executor]
+        пул, в котором считать пакеты; None — прямо в цикле событий
+    cache: Optional[PackageCache]
+        общий для соединений кэш результатов по содержимому
+        пакета; None — считать каждый пакет
+
+    Методы
+    ------
+    start_tcp(self, host, port) -> asyncio.AbstractServer:
+        Начать слушать TCP-порт.
+    start_unix(self, path) -> asyncio.AbstractServer:
+        Начать слушать Unix-сокет.
+    handle(self, reader, writer) -> None:
+        Обслужить одно соединение.
+    """
+
+    def __init__(self,
+                 max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+                 executor: Optional[Executor] = None,
+                 cache: Optional[PackageCache] = None) -> None:
+        self.max_in_flight = max_in_flight
+        self.executor = executor
+        self.cache = cache
+        self._limit: Optional[asyncio.Semaphore] = None
+
+    async def start_tcp(self,
+                        host: str = DEFAULT_HOST,
+                        port: int = DEFAULT_PORT) -> asyncio.AbstractServer:
+        """Начать слушать TCP-порт; port=0 — выбрать свободный."""
+        self._limit = asyncio.Semaphore(self.max_in_flight)
+        return await asyncio.start_server(self.handle, host, port,
+                                          limit=FRAME_LIMIT)
+
+    async def start_unix(self, path: str) -> asyncio.AbstractServer:
+        """Начать слушать Unix-сокет path."""
+        self._limit = asyncio.Semaphore(self.max_in_flight)
+        return await asyncio.start_unix_server(self.handle, path,
+                                               limit=FRAME_LIMIT)
+
+    async def _score(self, frame: bytes) -> Dict[str, Any]:
+        if self.executor is None:
+            return score_frame(frame, self.cache)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, score_frame, frame,
+                                          self.cache)
+
+    def _discard(self, pending: asyncio.Queue) -> None:
+        """Отменить задачи, ответы которых уже не будут отправлены."""
+        while not pending.empty():
+            task = pending.get_nowait()
+            if task is not None:
+                task.cancel()
+                self._limit.release()
+
+    async def _write_responses(self,
+                               pending: asyncio.Queue,
+                               writer: asyncio.StreamWriter) -> None:
+        """Отправлять ответы в порядке запросов.
+
+        Разрешение на расчёт возвращается, когда ответ передан
+        в сокет, поэтому клиент, который не читает ответы, держит
+        не больше max_in_flight готовых ответов. Если отправка
+        оборвалась, разрешения задач из очереди тоже возвращаются.
+        """
+        try:
+            while True:
+                task = await pending.get()
+                if task is None:
+                    return
+                try:
+                    response = await task
+                    writer.write(json.dumps(response, ensure_ascii=False)
+                                 .encode('utf-8') + b'\n')
+                    await writer.drain()
+                finally:
+                    self._limit.release()
+        finally:
+            self._discard(pending)
+
+    async def _submit(self, frame: Optional[bytes]) -> 'asyncio.Future':
+        """Задача с ответом на кадр; None — кадр длиннее FRAME_LIMIT.
+
+        Каждая задача держит разрешение на расчёт, пока её ответ
+        не отправлен или задача не отменена.
+        """
+        await self._limit.acquire()
+        if frame is None:
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(
+                {'id': None, 'error': f'Кадр длиннее {FRAME_LIMIT} байт'})
+            return future
+        return asyncio.create_task(self._score(frame))
+
+    async def handle(self,
+                     reader: asyncio.StreamReader,
+                     writer: asyncio.StreamWriter) -> None:
+        """Обслужить одно соединение.
+
+        Пока ответы не уходят в сокет, разрешения не возвращаются
+        и новые кадры не читаются. Если клиент отключился,
+        не дочитав ответы, чтение кадров прекращается,
+        а незавершённые задачи отменяются.
+        """
+        pending: asyncio.Queue = asyncio.Queue()
+        responder = asyncio.create_task(
+            self._write_responses(pending, writer))
+        try:
+            while not responder.done():
+                frame = await read_frame(reader)
+                if frame == b'':
+                    break
+                if frame is None or frame.strip():
+                    await pending.put(await self._submit(frame))
+        except ConnectionError:
+            pass
+        finally:
+            await pending.put(None)
+            try:
+                await responder
+            except ConnectionError:
+                pass
+            finally:
+                self._discard(pending)
+                writer.close()
+                with contextlib.suppress(ConnectionError):
+                    await writer.wait_closed()
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Optional[bytes]:
+    """Прочитать кадр до перевода строки.
+
+    Возвращаемое значение
+    ---------------------
+    Кадр; b'' — соединение закрыто; None — кадр не поместился
+    в лимит StreamReader, он дочитан до перевода строки
+    и отброшен, так что следующий кадр читается как обычно.
+    """
+
+    overrun = False
+    while True:
+        try:
+            frame = await reader.readuntil(b'\n')
+        except asyncio.IncompleteReadError as exc:
+            return None if overrun else exc.partial
+        except asyncio.LimitOverrunError as exc:
+            await reader.read(exc.consumed)
+            overrun = True
+            continue
+        return None if overrun else frame
+
+
+class ScoringClient:
+    """
+    Класс. Клиент ScoringServer.
+
+    Методы
+    ------
+    connect_tcp(host, port) -> ScoringClient:
+        Подключиться по TCP.
+    connect_unix(path) -> ScoringClient:
+        Подключиться к Unix-сокету.
+    score(self, workout_type, data) -> Dict[str, Any]:
+        Рассчитать один пакет.
+    score_many(self, packages) -> List[Dict[str, Any]]:
+        Отправить все пакеты конвейером и собрать ответы.
+    close(self) -> None:
+        Закрыть соединение.
+    """
+
+    def __init__(self,
+                 reader: asyncio.StreamReader,
+                 writer: asyncio.StreamWriter) -> None:
+        self._reader = reader
+        self._writer = writer
+        self._next_id = 0
+
+    @classmethod
+    async def connect_tcp(cls,
+                          host: str = DEFAULT_HOST,
+                          port: int = DEFAULT_PORT) -> 'ScoringClient':
+        """Подключиться к серверу по TCP."""
+        return cls(*await asyncio.open_connection(host, port))
+
+    @classmethod
+    async def connect_unix(cls, path: str) -> 'ScoringClient':
+        """Подключиться к серверу через Unix-сокет."""
+        return cls(*await asyncio.open_unix_connection(path))
+
+    def _frame(self, workout_type: str, data: Sequence[float]) -> bytes:
+        self._next_id += 1
+        request = {'id': self._next_id, 'workout_type': workout_type,
+                   'data': list(data)}
+        return json.dumps(request).encode('utf-8') + b'\n'
+
+    async def _read_response(self) -> Dict[str, Any]:
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError('Сервер закрыл соединение')
+        return json.loads(line)
+
+    async def score(self,
+                    workout_type: str,
+                    data: Sequence[float]) -> Dict[str, Any]:
+        """Рассчитать один пакет."""
+        self._writer.write(self._frame(workout_type, data))
+        await self._writer.drain()
+        return await self._read_response()
+
+    async def score_many(self,
+                         packages: Iterable[Package]
+                         ) -> List[Dict[str, Any]]:
+        """Отправить пакеты конвейером, не дожидаясь ответов.
+
+        Отправка и чтение ответов идут параллельно, поэтому большой
+        пакет запросов не упирается в буферы сокета.
+        """
+
+        frames = [self._frame(workout_type, data)
+                  for workout_type, data in packages]
+
+        async def send() -> None:
+            for frame in frames:
+                self._writer.write(frame)
+                await self._writer.drain()
+
+        sender = asyncio.create_task(send())
+        try:
+            responses = [await self._read_response() for _ in frames]
+        finally:
+            await sender
+        return responses
+
+    async def close(self) -> None:
+        """Закрыть соединение."""
+        self._writer.close()
+        await self._writer.wait_closed()
+
+
+async def serve(host: str = DEFAULT_HOST,
+                port: int = DEFAULT_PORT,
+                unix_path: Optional[str] = None,
+                max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+                cache_size: int = 0) -> None:
+    """Запустить сервер и обслуживать соединения до остановки.
+
+    cache_size > 0 включает PackageCache на столько записей.
+    """
+    cache = PackageCache(cache_size) if cache_size > 0 else None
+    scoring = ScoringServer(max_in_flight, cache=cache)
+    if unix_path:
+        server = await scoring.start_unix(unix_path)
+    else:
+        server = await scoring.start_tcp(host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """Точка входа: `python server.py [--host H] [--port P] [--unix PATH]`."""
+    parser = argparse.ArgumentParser(
+        description='Сервер расчёта пакетов фитнес-трекера.')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--unix', default=None,
+                        help='путь к Unix-сокету вместо TCP')
+    parser.add_argument('--max-in-flight', type=int,
+                        default=DEFAULT_MAX_IN_FLIGHT)
+    parser.add_argument('--cache-size', type=int, default=0,
+                        help='записей в кэше результатов; 0 — без кэша')
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix,
+                          args.max_in_flight, args.cache_size))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
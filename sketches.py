@@ -0,0 +1,410 @@
+import argparse
+import json
+import math
+import sys
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from homework import InfoMessage
+from leaderboard import Batch, row_types
+
+METRICS = ('speed', 'calories')
+QUANTILES = (0.5, 0.9, 0.99)
+DEFAULT_RELATIVE_ACCURACY = 0.01
+DEFAULT_MAX_BINS = 1024
+# Значения меньше по модулю считаются нулём.
+DEFAULT_MIN_VALUE = 1e-9
+
+
+class _Store:
+    """
+    Класс. Счётчики подряд идущих корзин в array('Q').
+
+    Корзина с ключом key лежит в counts[key - offset]. Если
+    корзин больше max_bins, младшие сливаются в одну, и дальше
+    все меньшие ключи попадают в неё (collapsed).
+    """
+
+    __slots__ = ('max_bins', 'offset', 'counts', 'collapsed')
+
+    def __init__(self, max_bins: int) -> None:
+        self.max_bins = max_bins
+        self.offset = 0
+        self.counts = array('Q')
+        self.collapsed = False
+
+    def add(self, key: int, count: int = 1) -> None:
+        counts = self.counts
+        if not counts:
+            self.offset = key
+            counts.append(0)
+        elif key < self.offset:
+            if self.collapsed:
+                key = self.offset
+            else:
+                self.counts = counts = (array('Q', bytes(8 * (self.offset
+                                                              - key)))
+                                        + counts)
+                self.offset = key
+        elif key >= self.offset + len(counts):
+            counts.frombytes(bytes(8 * (key - self.offset - len(counts)
+                                        + 1)))
+        counts[key - self.offset] += count
+        if len(counts) > self.max_bins:
+            self._collapse(len(counts) - self.max_bins)
+
+    def _collapse(self, excess: int) -> None:
+        """Слить excess + 1 младших корзин в одну."""
+        counts = self.counts
+        counts[excess] = sum(counts[:excess + 1])
+        del counts[:excess]
+        self.offset += excess
+        self.collapsed = True
+
+    def items(self) -> Iterable[Tuple[int, int]]:
+        """Непустые корзины (ключ, счётчик) по возрастанию ключа."""
+        offset = self.offset
+        return ((offset + index, count)
+                for index, count in enumerate(self.counts) if count)
+
+    def merge(self, other: '_Store') -> None:
+        for key, count in other.items():
+            self.add(key, count)
+        self.collapsed = self.collapsed or other.collapsed
+
+    def state(self) -> List[Any]:
+        return [self.offset, list(self.counts), self.collapsed]
+
+    def restore(self, state: Sequence[Any]) -> None:
+        self.offset, counts, self.collapsed = state
+        self.counts = array('Q', counts)
+
+
+class QuantileSketch:
+    """
+    Класс. Сливаемый эскиз квантилей с относительной погрешностью.
+
+    Устроен как DDSketch: значение x > 0 попадает в корзину
+    ceil(log(x) / log(gamma)), gamma = (1 + a) / (1 - a), и любой
+    квантиль возвращается с относительной погрешностью не больше
+    a = relative_accuracy. Отрицательные значения (калории при
+    малой скорости) считаются так же по модулю в отдельных
+    корзинах, близкие к нулю — отдельным счётчиком. Корзины
+    хранятся плотно в array('Q'), так что на диапазон в пять
+    порядков при a = 0.01 уходит порядка 5 КБ. Если корзин
+    становится больше max_bins, сливаются самые младшие:
+    погрешность теряют только нижние квантили.
+
+    Эскизы с одинаковыми параметрами сливаются без потерь:
+    merge() даёт то же, что и добавление всех значений в один.
+
+    Атрибуты
+    --------
+    relative_accuracy: float
+        гарантированная относительная погрешность квантилей
+    max_bins: int
+        наибольшее число корзин на знак
+    count: int
+        сколько значений учтено
+    min, max: float
+        точные наименьшее и наибольшее значения
+
+    Методы
+    ------
+    add(self, value, count=1) -> None:
+        Учесть значение.
+    quantile(self, q) -> float:
+        Оценка q-квантиля.
+    merge(self, other) -> None:
+        Добавить значения другого эскиза.
+    snapshot(self) -> Dict[str, Any]:
+        Состояние в виде JSON-совместимого словаря.
+    """
+
+    def __init__(self,
+                 relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY,
+                 max_bins: int = DEFAULT_MAX_BINS,
+                 min_value: float = DEFAULT_MIN_VALUE) -> None:
+        if not 0 < relative_accuracy < 1:
+            raise ValueError('relative_accuracy должен быть в интервале '
+                             '(0, 1)')
+        if max_bins <= 0:
+            raise ValueError('max_bins должен быть положительным')
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.min_value = min_value
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.count = 0
+        self.zero_count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self._positive = _Store(max_bins)
+        # Ключ отрицательного значения — минус ключ модуля: тогда
+        # ключи растут вместе со значениями, и сливаются, как и
+        # у положительных, корзины самых малых значений.
+        self._negative = _Store(max_bins)
+
+    def _key(self, magnitude: float) -> int:
+        return math.ceil(math.log(magnitude) / self._log_gamma)
+
+    def _value(self, key: int) -> float:
+        """Середина корзины key с точки зрения относительной ошибки."""
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def add(self, value: float, count: int = 1) -> None:
+        """Учесть value count раз; NaN и бесконечности — ValueError."""
+        if not math.isfinite(value):
+            raise ValueError(f'Значение должно быть конечным: {value!r}')
+        if value > self.min_value:
+            self._positive.add(self._key(value), count)
+        elif value < -self.min_value:
+            self._negative.add(-self._key(-value), count)
+        else:
+            self.zero_count += count
+        self.count += count
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Оценка q-квантиля, 0 <= q <= 1.
+
+        Возвращаемое значение
+        ---------------------
+        Значение с номером floor(q * (count - 1)) среди
+        упорядоченных с относительной погрешностью
+        relative_accuracy; для q = 0 и q = 1 — точные min и max;
+        NaN для пустого эскиза.
+        """
+
+        if not 0 <= q <= 1:
+            raise ValueError('q должен быть в интервале [0, 1]')
+        if not self.count:
+            return math.nan
+        if q == 0:
+            return self.min
+        if q == 1:
+            return self.max
+        rank = q * (self.count - 1)
+        seen = 0
+        for key, count in self._negative.items():
+            seen += count
+            if seen > rank:
+                return self._clamp(-self._value(-key))
+        seen += self.zero_count
+        if seen > rank:
+            return self._clamp(0.0)
+        for key, count in self._positive.items():
+            seen += count
+            if seen > rank:
+                return self._clamp(self._value(key))
+        return self.max
+
+    def _clamp(self, value: float) -> float:
+        return min(max(value, self.min), self.max)
+
+    def quantiles(self, qs: Iterable[float] = QUANTILES) -> List[float]:
+        return [self.quantile(q) for q in qs]
+
+    def _check_compatible(self, other: 'QuantileSketch') -> None:
+        if (other.relative_accuracy, other.min_value) != (
+                self.relative_accuracy, self.min_value):
+            raise ValueError('Сливать можно только эскизы с одинаковыми '
+                             'relative_accuracy и min_value')
+
+    def merge(self, other: 'QuantileSketch') -> None:
+        """Добавить значения other; параметры эскизов должны совпадать."""
+        self._check_compatible(other)
+        self._positive.merge(other._positive)
+        self._negative.merge(other._negative)
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def nbytes(self) -> int:
+        """Память корзин в байтах."""
+        return sum(store.counts.itemsize * len(store.counts)
+                   for store in (self._positive, self._negative))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Состояние эскиза в виде JSON-совместимого словаря."""
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'max_bins': self.max_bins,
+            'min_value': self.min_value,
+            'count': self.count,
+            'zero_count': self.zero_count,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None,
+            'positive': self._positive.state(),
+            'negative': self._negative.state(),
+        }
+
+    @classmethod
+    def from_snapshot(cls, state: Dict[str, Any]) -> 'QuantileSketch':
+        """Восстановить эскиз из snapshot()."""
+        sketch = cls(state['relative_accuracy'], state['max_bins'],
+                     state['min_value'])
+        sketch.count = state['count']
+        sketch.zero_count = state['zero_count']
+        if sketch.count:
+            sketch.min, sketch.max = state['min'], state['max']
+        sketch._positive.restore(state['positive'])
+        sketch._negative.restore(state['negative'])
+        return sketch
+
+
+class DistributionSketches:
+    """
+    Класс. Эскизы квантилей показателей по классам тренировок.
+
+    Заполняется результатами расчёта по одному (add или как sink
+    в stream.run_pipeline) или колоночными пачками (add_columns);
+    эскизы шардов сливаются merge().
+
+    Атрибуты
+    --------
+    metrics: Tuple[str, ...]
+        показатели InfoMessage, для которых ведутся эскизы
+    relative_accuracy: float
+        погрешность квантилей каждого эскиза
+
+    Методы
+    ------
+    add(self, info) -> None:
+        Учесть результат тренировки.
+    add_columns(self, batch) -> None:
+        Учесть колоночный результат расчёта.
+    sketch(self, training_type, metric) -> QuantileSketch:
+        Эскиз показателя для класса тренировки.
+    summary(self, qs=QUANTILES) -> Dict[str, Dict[str, List[float]]]:
+        Квантили по всем классам и показателям.
+    merge(self, other) -> None:
+        Добавить эскизы другого экземпляра.
+    """
+
+    def __init__(self,
+                 metrics: Sequence[str] = METRICS,
+                 relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY,
+                 max_bins: int = DEFAULT_MAX_BINS) -> None:
+        self.metrics = tuple(metrics)
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self._sketches: Dict[str, List[QuantileSketch]] = {}
+
+    def _for_type(self, training_type: str) -> List[QuantileSketch]:
+        sketches = self._sketches.get(training_type)
+        if sketches is None:
+            sketches = self._sketches[training_type] = [
+                QuantileSketch(self.relative_accuracy, self.max_bins)
+                for _ in self.metrics]
+        return sketches
+
+    def add(self, info: InfoMessage) -> None:
+        """Учесть результат info."""
+        for metric, sketch in zip(self.metrics,
+                                  self._for_type(info.training_type)):
+            sketch.add(getattr(info, metric))
+
+    __call__ = add
+
+    def add_columns(self, batch: Batch) -> None:
+        """Учесть ColumnarResult, SegmentResult или InfoMessageColumns."""
+        for position, metric in enumerate(self.metrics):
+            for kind, value in zip(row_types(batch), getattr(batch, metric)):
+                self._for_type(kind)[position].add(value)
+
+    def sketch(self, training_type: str, metric: str) -> QuantileSketch:
+        """Эскиз metric для training_type (пустой, если данных не было)."""
+        return self._for_type(training_type)[self.metrics.index(metric)]
+
+    def training_types(self) -> List[str]:
+        return sorted(self._sketches)
+
+    def summary(self, qs: Sequence[float] = QUANTILES
+                ) -> Dict[str, Dict[str, List[float]]]:
+        """Квантили qs: {класс: {показатель: [значения]}}."""
+        return {kind: {metric: sketch.quantiles(qs)
+                       for metric, sketch in zip(self.metrics,
+                                                 self._sketches[kind])}
+                for kind in self.training_types()}
+
+    def merge(self, other: 'DistributionSketches') -> None:
+        """Добавить эскизы other; набор показателей должен совпадать."""
+        if other.metrics != self.metrics:
+            raise ValueError('Наборы показателей не совпадают')
+        for kind, sketches in other._sketches.items():
+            for mine, theirs in zip(self._for_type(kind), sketches):
+                mine.merge(theirs)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Состояние в виде JSON-совместимого словаря."""
+        return {
+            'metrics': list(self.metrics),
+            'relative_accuracy': self.relative_accuracy,
+            'max_bins': self.max_bins,
+            'sketches': {kind: [sketch.snapshot() for sketch in sketches]
+                         for kind, sketches in self._sketches.items()},
+        }
+
+    @classmethod
+    def from_snapshot(cls, state: Dict[str, Any]) -> 'DistributionSketches':
+        """Восстановить эскизы из snapshot()."""
+        sketches = cls(state['metrics'], state['relative_accuracy'],
+                       state['max_bins'])
+        for kind, items in state['sketches'].items():
+            sketches._sketches[kind] = [QuantileSketch.from_snapshot(item)
+                                        for item in items]
+        return sketches
+
+    def dump(self, path: str) -> None:
+        """Сохранить snapshot() в JSON-файл."""
+        with open(path, 'w', encoding='utf-8') as output:
+            json.dump(self.snapshot(), output)
+
+    @classmethod
+    def load(cls, path: str) -> 'DistributionSketches':
+        """Прочитать эскизы из JSON-файла, записанного dump()."""
+        with open(path, encoding='utf-8') as source:
+            return cls.from_snapshot(json.load(source))
+
+
+def format_summary(sketches: DistributionSketches,
+                   qs: Sequence[float] = QUANTILES) -> str:
+    """Таблица квантилей: строка на класс тренировки и показатель."""
+    lines = []
+    for kind, metrics in sketches.summary(qs).items():
+        for metric, values in metrics.items():
+            cells = ' '.join(f'p{format(q * 100, "g")}={format(value, ".3f")}'
+                             for q, value in zip(qs, values))
+            lines.append(f'{kind} {metric}: {cells}')
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Точка входа: `python cli.py quantiles SNAPSHOT...`.
+
+    Сливает снимки эскизов, записанные `cli.py score --quantiles`
+    на разных шардах, и печатает квантили.
+    """
+    parser = argparse.ArgumentParser(
+        prog='cli.py quantiles',
+        description='Слить эскизы квантилей и напечатать квантили.')
+    parser.add_argument('snapshots', nargs='+',
+                        help='JSON-файлы эскизов')
+    parser.add_argument('--q', type=float, nargs='+', default=QUANTILES,
+                        help='квантили, по умолчанию 0.5 0.9 0.99')
+    parser.add_argument('--output', default=None,
+                        help='записать слитые эскизы в файл')
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    merged = DistributionSketches.load(args.snapshots[0])
+    for path in args.snapshots[1:]:
+        merged.merge(DistributionSketches.load(path))
+    if args.output:
+        merged.dump(args.output)
+    print(format_summary(merged, args.q))
+    return 0
@@ -0,0 +1,344 @@
+import bisect
+import heapq
+import json
+import math
+import mmap
+import os
+import struct
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from homework import InfoMessage
+
+MAGIC = b'WKST'
+VERSION = 2
+HEADER = struct.Struct('<4sIQ')
+# Версия 1 хранила номер типа в одном байте; записи той же длины.
+RECORDS = {1: struct.Struct('<d4dB7x'), 2: struct.Struct('<d4dH6x')}
+RECORD = RECORDS[VERSION]
+MAX_TYPES = 1 << 16
+DEFAULT_MEMORY_LIMIT = 1_000_000
+DEFAULT_MAX_RUNS = 8
+
+Entry = Tuple[float, InfoMessage]
+
+
+class _UserIndex:
+    """Тренировки одного пользователя в памяти, отсортированные по времени."""
+
+    __slots__ = ('timestamps', 'infos')
+
+    def __init__(self) -> None:
+        self.timestamps: List[float] = []
+        self.infos: List[InfoMessage] = []
+
+    def add(self, timestamp: float, info: InfoMessage) -> None:
+        if not self.timestamps or timestamp >= self.timestamps[-1]:
+            self.timestamps.append(timestamp)
+            self.infos.append(info)
+            return
+        position = bisect.bisect_right(self.timestamps, timestamp)
+        self.timestamps.insert(position, timestamp)
+        self.infos.insert(position, info)
+
+    def range(self,
+              start: float,
+              end: float,
+              training_type: Optional[str] = None) -> Iterator[Entry]:
+        low = bisect.bisect_left(self.timestamps, start)
+        high = bisect.bisect_left(self.timestamps, end)
+        entries = zip(self.timestamps[low:high], self.infos[low:high])
+        if training_type is None:
+            return entries
+        return (entry for entry in entries
+                if entry[1].training_type == training_type)
+
+
+class RunFile:
+    """
+    Класс. Отсортированный файл тренировок, сброшенный на диск.
+
+    Формат: заголовок `<4sIQ` (b'WKST', версия, смещение индекса),
+    затем записи `<d4dH6x` (время, duration, distance, speed,
+    calories, номер типа тренировки), сгруппированные по
+    пользователям и отсортированные по времени, затем индекс
+    в JSON: таблица типов, для каждого пользователя номер первой
+    записи и их количество и имена файлов, которые этот файл
+    заменил при слиянии. Поиск по времени — двоичный прямо
+    по отображённому в память файлу. Файлы версии 1 (номер типа
+    в одном байте) читаются как прежде.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, 'rb') as source:
+            self._map = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, index_offset = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version not in RECORDS:
+            self._map.close()
+            raise ValueError(f'{path} не является файлом хранилища')
+        self._record = RECORDS[version]
+        index = json.loads(self._map[index_offset:])
+        self.types: List[str] = index['types']
+        self.users: Dict[str, Tuple[int, int]] = {
+            user: tuple(span) for user, span in index['users'].items()}
+        self.replaces: List[str] = index.get('replaces', [])
+
+    @staticmethod
+    def write(path: str,
+              users: Iterable[Tuple[str, Iterable[Entry]]],
+              replaces: Iterable[str] = ()) -> 'RunFile':
+        """Записать тренировки в новый файл и открыть его.
+
+        users — пары (пользователь, тренировки по времени)
+        в порядке имён пользователей. Файл пишется во временный
+        и подменяет path целиком, так что сбой на записи
+        не оставляет недописанного файла.
+
+        Исключения
+        ----------
+        ValueError
+            видов тренировок больше MAX_TYPES
+        """
+
+        types: Dict[str, int] = {}
+        spans: Dict[str, Tuple[int, int]] = {}
+        position = 0
+        temporary = path + '.tmp'
+        try:
+            with open(temporary, 'wb') as output:
+                output.write(HEADER.pack(MAGIC, VERSION, 0))
+                for user, entries in users:
+                    first = position
+                    for timestamp, info in entries:
+                        code = types.setdefault(info.training_type,
+                                                len(types))
+                        if code == MAX_TYPES:
+                            raise ValueError(
+                                f'Больше {MAX_TYPES} видов тренировок')
+                        output.write(RECORD.pack(timestamp, info.duration,
+                                                 info.distance, info.speed,
+                                                 info.calories, code))
+                        position += 1
+                    spans[user] = (first, position - first)
+                index_offset = output.tell()
+                output.write(json.dumps({
+                    'types': list(types), 'users': spans,
+                    'replaces': list(replaces)}).encode('utf-8'))
+                output.seek(0)
+                output.write(HEADER.pack(MAGIC, VERSION, index_offset))
+            os.replace(temporary, path)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+        return RunFile(path)
+
+    def _timestamp(self, record: int) -> float:
+        return struct.unpack_from(
+            '<d', self._map, HEADER.size + record * self._record.size)[0]
+
+    def _bisect(self, low: int, high: int, timestamp: float) -> int:
+        """Первая запись в [low, high) со временем не меньше timestamp."""
+        while low < high:
+            middle = (low + high) // 2
+            if self._timestamp(middle) < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def range(self,
+              user_id: str,
+              start: float,
+              end: float,
+              training_type: Optional[str] = None) -> Iterator[Entry]:
+        """Тренировки пользователя со временем в [start, end).
+
+        Если задан training_type, записи других видов отбрасываются
+        по номеру типа, не превращаясь в InfoMessage.
+        """
+        span = self.users.get(user_id)
+        wanted = None
+        if training_type is not None:
+            if training_type not in self.types:
+                return
+            wanted = self.types.index(training_type)
+        if span is None:
+            return
+        first, count = span
+        low = self._bisect(first, first + count, start)
+        high = self._bisect(low, first + count, end)
+        size = self._record.size
+        for record in range(low, high):
+            (timestamp, duration, distance, speed, calories,
+             code) = self._record.unpack_from(self._map,
+                                              HEADER.size + record * size)
+            if wanted is None or code == wanted:
+                yield timestamp, InfoMessage(self.types[code], duration,
+                                             distance, speed, calories)
+
+    def close(self) -> None:
+        self._map.close()
+
+
+class WorkoutStore:
+    """
+    Класс. Хранилище рассчитанных тренировок с запросами по времени.
+
+    Тренировки индексируются по пользователю и времени. Пока их
+    не больше memory_limit, они живут в памяти; при превышении
+    все тренировки из памяти сбрасываются в отсортированный файл
+    в directory. Когда файлов становится больше max_runs, они
+    сливаются в один. Запрос диапазона — двоичный поиск в памяти
+    и в каждом файле, O(log n) плюс размер ответа.
+
+    Атрибуты
+    --------
+    directory: str
+        каталог для сброшенных файлов
+    memory_limit: int
+        сколько тренировок держать в памяти до сброса на диск
+    max_runs: int
+        сколько файлов допускается до слияния
+
+    Методы
+    ------
+    add(self, user_id, timestamp, info) -> None:
+        Добавить тренировку.
+    range(self, user_id, start, end, training_type=None) -> List[Entry]:
+        Тренировки пользователя в интервале времени.
+    flush(self) -> None:
+        Сбросить тренировки из памяти на диск.
+    compact(self) -> None:
+        Слить файлы в один.
+    close(self) -> None:
+        Закрыть файлы.
+    """
+
+    def __init__(self,
+                 directory: str,
+                 memory_limit: int = DEFAULT_MEMORY_LIMIT,
+                 max_runs: int = DEFAULT_MAX_RUNS) -> None:
+        if memory_limit <= 0:
+            raise ValueError('memory_limit должен быть положительным')
+        if max_runs <= 0:
+            raise ValueError('max_runs должен быть положительным')
+        self.directory = directory
+        self.memory_limit = memory_limit
+        self.max_runs = max_runs
+        self._users: Dict[str, _UserIndex] = {}
+        self._in_memory = 0
+        self._runs: List[RunFile] = []
+        self._next_run = 0
+        os.makedirs(directory, exist_ok=True)
+        self._open_runs()
+
+    def _open_runs(self) -> None:
+        """Открыть файлы каталога.
+
+        Файлы, которые уже вошли в слитый файл, но не были удалены
+        из-за сбоя во время слияния, удаляются сейчас.
+        """
+        names = sorted(name for name in os.listdir(self.directory)
+                       if name.startswith('run-') and name.endswith('.wks'))
+        runs = [RunFile(os.path.join(self.directory, name))
+                for name in names]
+        replaced = {name for run in runs for name in run.replaces}
+        for name, run in zip(names, runs):
+            if name in replaced:
+                run.close()
+                os.remove(run.path)
+            else:
+                self._runs.append(run)
+        if names:
+            self._next_run = int(names[-1][4:-4]) + 1
+
+    def __len__(self) -> int:
+        return self._in_memory + sum(
+            count for run in self._runs for _, count in run.users.values())
+
+    def add(self, user_id: str, timestamp: float, info: InfoMessage) -> None:
+        """Добавить тренировку info пользователя user_id."""
+        index = self._users.get(user_id)
+        if index is None:
+            index = self._users[user_id] = _UserIndex()
+        index.add(timestamp, info)
+        self._in_memory += 1
+        if self._in_memory > self.memory_limit:
+            self.flush()
+
+    def flush(self) -> None:
+        """Сбросить тренировки из памяти в новый отсортированный файл."""
+        if not self._in_memory:
+            return
+        path = os.path.join(self.directory, f'run-{self._next_run:06d}.wks')
+        self._runs.append(RunFile.write(
+            path, ((user, self._users[user].range(-math.inf, math.inf))
+                   for user in sorted(self._users))))
+        self._next_run += 1
+        self._users = {}
+        self._in_memory = 0
+        if len(self._runs) > self.max_runs:
+            self.compact()
+
+    def compact(self) -> None:
+        """Слить все файлы в один.
+
+        Слитый файл подменяет самый новый из файлов и перечисляет
+        в индексе остальные; они удаляются после подмены, а если
+        это не удалось, — при следующем открытии хранилища.
+        """
+        if len(self._runs) < 2:
+            return
+        runs = self._runs
+        users = sorted({user for run in runs for user in run.users})
+        merged = RunFile.write(
+            runs[-1].path,
+            ((user, heapq.merge(*(run.range(user, -math.inf, math.inf)
+                                  for run in runs),
+                                key=lambda item: item[0]))
+             for user in users),
+            replaces=[os.path.basename(run.path) for run in runs[:-1]])
+        self._runs = [merged]
+        for run in runs:
+            run.close()
+        for run in runs[:-1]:
+            os.remove(run.path)
+
+    def range(self,
+              user_id: str,
+              start: float,
+              end: float,
+              training_type: Optional[str] = None) -> List[Entry]:
+        """Тренировки пользователя со временем в [start, end).
+
+        Параметры
+        ---------
+        training_type: str
+            имя класса тренировки, например 'Swimming';
+            None — все виды
+
+        Возвращаемое значение
+        ---------------------
+        Список пар (время, InfoMessage), отсортированный по времени.
+        """
+
+        sources = [run.range(user_id, start, end, training_type)
+                   for run in self._runs]
+        index = self._users.get(user_id)
+        if index is not None:
+            sources.append(index.range(start, end, training_type))
+        return list(heapq.merge(*sources, key=lambda item: item[0]))
+
+    def close(self) -> None:
+        """Сбросить память на диск и закрыть файлы."""
+        self.flush()
+        for run in self._runs:
+            run.close()
+        self._runs = []
+
+    def __enter__(self) -> 'WorkoutStore':
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
@@ -0,0 +1,435 @@
+import argparse
+import contextlib
+import csv
+import json
+import queue
+import sys
+import threading
+from typing import (IO, TYPE_CHECKING, Callable, Dict, Iterable, Iterator,
+                    List, Optional, Sequence, Tuple, Union)
+
+from compiled import iter_scored
+from homework import InfoMessage, Reject
+
+if TYPE_CHECKING:
+    from instrumentation import Instrumentation
+    from parallel import WorkerStats
+
+Package = Tuple[str, List[Union[int, float]]]
+
+FORMATS = ('csv', 'jsonl')
+OUTPUT_FORMATS = ('text', 'columnar')
+DEFAULT_BUFFER_SIZE = 1024
+
+_END = object()
+
+
+def _number(text: str) -> Union[int, float]:
+    """Преобразовать поле пакета в число, сохраняя целые целыми."""
+    text = text.strip()
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def iter_csv(lines: Iterable[str]) -> Iterator[Package]:
+    """Читать пакеты из CSV: код тренировки и параметры через запятую.
+
+    Пример строки: `SWM,720,1,80,25,40`. Пустые строки пропускаются.
+    """
+    for row in csv.reader(lines):
+        if not row:
+            continue
+        yield row[0].strip(), [_number(value) for value in row[1:]]
+
+
+def iter_jsonl(lines: Iterable[str]) -> Iterator[Package]:
+    """Читать пакеты из JSON Lines.
+
+    Каждая строка — либо список `["SWM", [720, 1, 80, 25, 40]]`,
+    либо объект `{"workout_type": "SWM", "data": [...]}`.
+    Пустые строки пропускаются.
+    """
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if isinstance(record, dict):
+            yield record['workout_type'], record['data']
+        else:
+            workout_type, data = record
+            yield workout_type, data
+
+
+def read_records(lines: Iterable[str], fmt: str = 'csv') -> Iterator[Package]:
+    """Читать пакеты (workout_type, data) из строк в формате fmt."""
+    if fmt == 'csv':
+        return iter_csv(lines)
+    if fmt == 'jsonl':
+        return iter_jsonl(lines)
+    raise ValueError(f'Неизвестный формат {fmt!r}, ожидается один из '
+                     f'{", ".join(FORMATS)}')
+
+
+def detect_format(path: str, default: str = 'csv') -> str:
+    """Определить формат входного файла по расширению."""
+    if path.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    if path.endswith('.csv'):
+        return 'csv'
+    return default
+
+
+def iter_messages(packages: Iterable[Package],
+                  rejects: Optional[List[Reject]] = None,
+                  sink: Optional[Callable[[InfoMessage], None]] = None
+                  ) -> Iterator[str]:
+    """Рассчитать пакеты и вернуть строки сообщений.
+
+    Пакеты считаются скомпилированными функциями классов
+    (compiled.iter_scored) с теми же результатами и отбраковкой,
+    что у read_packages и show_training_info. Если передан rejects,
+    некорректные пакеты складываются туда, а не прерывают поток
+    (см. homework.read_packages). Если передан sink, он получает
+    каждый InfoMessage до форматирования.
+    """
+    if sink is None:
+        for info in iter_scored(packages, rejects):
+            yield info.get_message()
+        return
+    for info in iter_scored(packages, rejects):
+        sink(info)
+        yield info.get_message()
+
+
+class RejectWriter:
+    """
+    Класс. Поток отбракованных пакетов в формате JSON Lines.
+
+    Передаётся вместо списка в read_packages / iter_messages:
+    каждый отбракованный пакет сразу пишется в output.
+    """
+
+    def __init__(self, output: IO[str]) -> None:
+        self.output = output
+        self.count = 0
+
+    def append(self, reject: Reject) -> None:
+        """Записать отбракованный пакет."""
+        self.output.write(json.dumps(
+            {'index': reject.index, 'workout_type': reject.workout_type,
+             'data': list(reject.data), 'reason': reject.reason,
+             'detail': reject.detail}, ensure_ascii=False) + '\n')
+        self.count += 1
+
+
+def _offer(buffer: queue.Queue,
+           entry: tuple,
+           stopped: threading.Event) -> bool:
+    """Положить entry в очередь; False, если раньше попросили стоп."""
+    while not stopped.is_set():
+        try:
+            buffer.put(entry, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _produce(iterable: Iterable,
+             buffer: queue.Queue,
+             stopped: threading.Event) -> None:
+    """Перекладывать элементы iterable в очередь, пока не попросят стоп.
+
+    Маркер конца кладётся так же, с проверкой стопа: если
+    потребитель ушёл, а очередь полна, поток завершается, а не
+    висит на put.
+    """
+    try:
+        for item in iterable:
+            if not _offer(buffer, (item, None), stopped):
+                return
+    except BaseException as exc:
+        _offer(buffer, (_END, exc), stopped)
+        return
+    _offer(buffer, (_END, None), stopped)
+
+
+def bounded_prefetch(iterable: Iterable, maxsize: int) -> Iterator:
+    """Читать iterable в фоновом потоке через очередь размера maxsize.
+
+    Поток-производитель блокируется, как только в очереди
+    накопилось maxsize элементов, поэтому чтение входа не убегает
+    вперёд обработки (обратное давление). Исключения производителя
+    пробрасываются потребителю.
+    """
+
+    buffer: queue.Queue = queue.Queue(maxsize)
+    stopped = threading.Event()
+    worker = threading.Thread(target=_produce,
+                              args=(iterable, buffer, stopped),
+                              daemon=True)
+    worker.start()
+    try:
+        while True:
+            item, error = buffer.get()
+            if item is _END:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stopped.set()
+
+
+def write_lines(lines: Iterable[str],
+                output: IO[str],
+                buffer_size: int = DEFAULT_BUFFER_SIZE) -> int:
+    """Записать строки в output пачками не более buffer_size строк.
+
+    Возвращаемое значение
+    ---------------------
+    Количество записанных строк: int
+    """
+
+    written = 0
+    chunk: List[str] = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= buffer_size:
+            output.write('\n'.join(chunk) + '\n')
+            written += len(chunk)
+            chunk = []
+    if chunk:
+        output.write('\n'.join(chunk) + '\n')
+        written += len(chunk)
+    output.flush()
+    return written
+
+
+def run_pipeline(source: Iterable[str],
+                 output: IO[str],
+                 fmt: str = 'csv',
+                 buffer_size: int = DEFAULT_BUFFER_SIZE,
+                 prefetch: int = 0,
+                 workers: int = 0,
+                 ordered: bool = True,
+                 stats: Optional[Dict[int, 'WorkerStats']] = None,
+                 rejects: Optional[List[Reject]] = None,
+                 instrumentation: Optional['Instrumentation'] = None,
+                 sink: Optional[Callable[[InfoMessage], None]] = None
+                 ) -> int:
+    """Потоково обработать пакеты из source и записать сообщения в output.
+
+    Параметры
+    ---------
+    source: Iterable[str]
+        строки входного файла или stdin
+    output: IO[str]
+        куда писать строки InfoMessage.get_message()
+    fmt: str
+        формат входа: 'csv' или 'jsonl'
+    buffer_size: int
+        сколько строк результата копить перед записью
+    prefetch: int
+        если больше нуля — читать строки входа в отдельном потоке
+        с очередью такого размера
+    workers: int
+        если больше нуля — считать в пуле из стольких процессов
+    ordered: bool
+        сохранять порядок входа при расчёте в пуле
+    stats: Dict[int, WorkerStats]
+        статистика воркеров пула, пополняется при workers > 0
+    rejects: List[Reject]
+        куда складывать некорректные пакеты вместо исключения
+        (в режиме пула не поддерживается)
+    instrumentation: Instrumentation
+        замеры этапов расчёта (в режиме пула не поддерживаются)
+    sink: Callable[[InfoMessage], None]
+        получатель каждого результата, например DistributionSketches
+        (не поддерживается в режиме пула и с instrumentation)
+
+    Возвращаемое значение
+    ---------------------
+    Количество обработанных пакетов: int
+    """
+
+    if sink is not None and (workers > 0 or instrumentation is not None):
+        raise ValueError('sink не поддерживается в режиме пула '
+                         'и с instrumentation')
+    if prefetch > 0:
+        source = bounded_prefetch(source, prefetch)
+    if workers > 0:
+        if rejects is not None or instrumentation is not None:
+            raise ValueError('rejects и instrumentation не поддерживаются '
+                             'в режиме пула')
+        from parallel import iter_parallel_lines
+        messages = iter_parallel_lines(source, fmt, workers, ordered=ordered,
+                                       stats=stats)
+    elif instrumentation is not None:
+        messages = instrumentation.iter_messages(read_records(source, fmt),
+                                                 rejects)
+    else:
+        messages = iter_messages(read_records(source, fmt), rejects, sink)
+    return write_lines(messages, output, buffer_size)
+
+
+def write_columnar_output(source: Iterable[str],
+                          target: Union[str, IO[bytes]],
+                          fmt: str = 'csv',
+                          prefetch: int = 0,
+                          rejects: Optional[List[Reject]] = None,
+                          sink: Optional[Callable[[InfoMessage], None]] = None,
+                          chunk_rows: int = DEFAULT_BUFFER_SIZE) -> int:
+    """Потоково обработать пакеты и записать колоночный файл результатов.
+
+    Пакеты проходят тот же путь, что в run_pipeline: отбраковка
+    в rejects, каждый InfoMessage — в sink. В файл результаты
+    уходят кусками по chunk_rows (см. columnar.ColumnarWriter),
+    так что память не зависит от длины входа.
+
+    Возвращаемое значение
+    ---------------------
+    Количество обработанных пакетов: int
+    """
+
+    from columnar import ColumnarWriter
+    if prefetch > 0:
+        source = bounded_prefetch(source, prefetch)
+    chunk: List[InfoMessage] = []
+    with ColumnarWriter(target) as writer:
+        for info in iter_scored(read_records(source, fmt), rejects):
+            if sink is not None:
+                sink(info)
+            chunk.append(info)
+            if len(chunk) >= chunk_rows:
+                writer.extend(chunk)
+                chunk = []
+        writer.extend(chunk)
+    return writer.rows
+
+
+def _parse_args(argv: Sequence[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description='Потоковая обработка пакетов фитнес-трекера.')
+    parser.add_argument('path', nargs='?', default='-',
+                        help='входной файл, "-" — stdin')
+    parser.add_argument('--format', choices=FORMATS, default=None,
+                        help='формат входа (по умолчанию по расширению)')
+    parser.add_argument('--buffer-size', type=int,
+                        default=DEFAULT_BUFFER_SIZE)
+    parser.add_argument('--prefetch', type=int, default=0)
+    parser.add_argument('--decode-threads', type=int, default=0,
+                        help='потоков распаковки членов сжатого входа, '
+                             '0 — распаковывать потоком')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='количество процессов пула, 0 — без пула')
+    parser.add_argument('--unordered', action='store_true',
+                        help='не сохранять порядок входа в режиме пула')
+    parser.add_argument('--stats', action='store_true',
+                        help='вывести статистику воркеров в stderr')
+    parser.add_argument('--output-format', choices=OUTPUT_FORMATS,
+                        default='text',
+                        help='text — строки сообщений в stdout, '
+                             'columnar — двоичный колоночный файл')
+    parser.add_argument('--output', default=None,
+                        help='файл результатов для --output-format columnar')
+    parser.add_argument('--rejects', default=None,
+                        help='файл JSON Lines для некорректных пакетов')
+    parser.add_argument('--metrics-file', default=None,
+                        help='записать метрики Prometheus в файл')
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help='отдавать метрики по HTTP на 127.0.0.1:PORT')
+    parser.add_argument('--profile', default=None,
+                        help='записать выборку стеков (collapsed) в файл')
+    parser.add_argument('--quantiles', default=None,
+                        help='записать эскизы квантилей скорости и калорий '
+                             'в JSON-файл (см. cli.py quantiles)')
+    return parser.parse_args(argv)
+
+
+def _start_instrumentation(args: argparse.Namespace,
+                           stack: contextlib.ExitStack
+                           ) -> Optional['Instrumentation']:
+    """Включить замеры, если их просили; выгрузка — при выходе из stack."""
+    if args.metrics_file is None and args.metrics_port is None \
+            and args.profile is None:
+        return None
+    from instrumentation import Instrumentation
+    instrumentation = Instrumentation()
+    if args.metrics_port is not None:
+        httpd = instrumentation.serve(args.metrics_port)
+        stack.callback(httpd.server_close)
+        stack.callback(httpd.shutdown)
+    if args.metrics_file is not None:
+        stack.callback(instrumentation.write, args.metrics_file)
+    if args.profile is not None:
+        profiler = instrumentation.start_profiler()
+
+        def write_profile() -> None:
+            profiler.stop()
+            with open(args.profile, 'w', encoding='utf-8') as output:
+                output.write(profiler.collapsed())
+
+        stack.callback(write_profile)
+    return instrumentation
+
+
+def _check_columnar_args(args: argparse.Namespace) -> None:
+    """Отказать в ключах, несовместимых с --output-format columnar."""
+    if not args.output:
+        raise SystemExit('Для --output-format columnar нужен --output')
+    unsupported = [flag for flag, value in (
+        ('--workers', args.workers > 0),
+        ('--metrics-file', args.metrics_file is not None),
+        ('--metrics-port', args.metrics_port is not None),
+        ('--profile', args.profile is not None)) if value]
+    if unsupported:
+        raise SystemExit(f'--output-format columnar не поддерживает '
+                         f'{", ".join(unsupported)}')
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """Точка входа: `python stream.py [--format csv|jsonl] [path]`."""
+    args = _parse_args(sys.argv[1:] if argv is None else argv)
+    path = args.path
+    if path != '-':
+        from compressed import iter_lines, strip_suffix
+        path = strip_suffix(path)
+    fmt = args.format or detect_format(path)
+    if args.output_format == 'columnar':
+        _check_columnar_args(args)
+    stats: Dict[int, 'WorkerStats'] = {}
+    options = dict(buffer_size=args.buffer_size, prefetch=args.prefetch,
+                   workers=args.workers, ordered=not args.unordered,
+                   stats=stats)
+    with contextlib.ExitStack() as stack:
+        source: Iterable[str] = sys.stdin
+        if args.path != '-':
+            lines = iter_lines([args.path], args.decode_threads)
+            stack.callback(lines.close)
+            source = lines
+        if args.rejects:
+            options['rejects'] = RejectWriter(stack.enter_context(
+                open(args.rejects, 'w', encoding='utf-8')))
+        instrumentation = _start_instrumentation(args, stack)
+        if instrumentation is not None:
+            options['instrumentation'] = instrumentation
+        if args.quantiles:
+            from sketches import DistributionSketches
+            options['sink'] = sketches = DistributionSketches()
+            stack.callback(sketches.dump, args.quantiles)
+        if args.output_format == 'columnar':
+            write_columnar_output(source, args.output, fmt, args.prefetch,
+                                  options.get('rejects'),
+                                  options.get('sink'), args.buffer_size)
+        else:
+            run_pipeline(source, sys.stdout, fmt, **options)
+    if args.stats and stats:
+        from parallel import format_stats
+        print(format_stats(stats), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,4 @@
+import random
 import sys
 from pathlib import Path
 from io import StringIO
@@ -25,3 +26,24 @@ class Capturing(list):
         self.extend(self._stringio.getvalue().splitlines())
         del self._stringio
         sys.stdout = self._stdout
+
+
+def make_packages(count, seed=0):
+    """
+    Generate count random packages of every workout type.
+
+    Packages are (workout_type, data) pairs as read_package accepts;
+    the same seed always gives the same packages.
+    """
+    rnd = random.Random(seed)
+    packages = []
+    for _ in range(count):
+        code = rnd.choice(('SWM', 'RUN', 'WLK'))
+        data = [rnd.randint(1, 30000), rnd.uniform(0.1, 5),
+                rnd.uniform(40, 120)]
+        if code == 'WLK':
+            data.append(rnd.randint(140, 210))
+        elif code == 'SWM':
+            data += [rnd.choice((25, 50)), rnd.randint(1, 80)]
+        packages.append((code, data))
+    return packages
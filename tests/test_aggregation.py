@@ -0,0 +1,139 @@
+import json
+
+import pytest
+
+import aggregation
+import homework
+
+DAY = aggregation.DAY
+MONDAY = 1700438400  # 2023-11-20 00:00 UTC, понедельник
+
+
+def info(code, data):
+    return homework.read_package(code, data).show_training_info()
+
+
+RUN = info('RUN', [15000, 1, 75])
+RUN_SHORT = info('RUN', [9000, 1, 75])
+SWIM = info('SWM', [720, 1, 80, 25, 40])
+
+
+def test_totals_per_user_and_type():
+    aggregator = aggregation.Aggregator('day', retention=7)
+    aggregator.add('u1', MONDAY + 10, RUN)
+    aggregator.add('u1', MONDAY + 20, RUN_SHORT)
+    aggregator.add('u1', MONDAY + DAY, SWIM)
+    aggregator.add('u2', MONDAY, RUN)
+    running = aggregator.totals('u1', 'Running')
+    assert running.count == 2
+    assert running.distance == RUN.distance + RUN_SHORT.distance
+    assert running.max_distance == RUN.distance
+    assert running.mean_speed == (RUN.speed + RUN_SHORT.speed) / 2
+    everything = aggregator.totals('u1')
+    assert everything.count == 3
+    assert everything.calories == (RUN.calories + RUN_SHORT.calories
+                                   + SWIM.calories)
+    assert aggregator.totals('nobody').count == 0
+    assert aggregator.bucket('u1', 'Swimming', MONDAY + DAY + 5).count == 1
+
+
+def test_window_expiry():
+    aggregator = aggregation.Aggregator('day', retention=2)
+    aggregator.add('u1', MONDAY, RUN)
+    aggregator.add('u1', MONDAY + DAY, RUN_SHORT)
+    aggregator.add('u1', MONDAY + 2 * DAY, RUN_SHORT)
+    totals = aggregator.totals('u1', 'Running')
+    assert totals.count == 2
+    assert totals.distance == pytest.approx(2 * RUN_SHORT.distance)
+    assert totals.max_distance == RUN_SHORT.distance, (
+        'Максимум устаревшего окна не должен учитываться'
+    )
+    aggregator.add('u1', MONDAY + 5, RUN)
+    assert aggregator.late == 1
+    assert aggregator.totals('u1', 'Running').count == 2
+
+
+def test_week_windows_start_on_monday():
+    aggregator = aggregation.Aggregator('week')
+    assert aggregator.window_start(MONDAY + 6 * DAY) == MONDAY
+    assert aggregator.window_start(MONDAY - 1) == MONDAY - 7 * DAY
+
+
+def test_snapshot_round_trip(tmp_path):
+    aggregator = aggregation.Aggregator('day', retention=3)
+    for day in range(5):
+        aggregator.add('u1', MONDAY + day * DAY, RUN)
+        aggregator.add('u2', MONDAY + day * DAY, SWIM)
+    path = str(tmp_path / 'state.json')
+    aggregator.dump(path)
+    restored = aggregation.Aggregator.load(path)
+    assert restored.snapshot() == aggregator.snapshot()
+    restored.add('u1', MONDAY + 5 * DAY, RUN)
+    aggregator.add('u1', MONDAY + 5 * DAY, RUN)
+    assert restored.totals('u1') == aggregator.totals('u1')
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        aggregation.Aggregator('month')
+    with pytest.raises(ValueError):
+        aggregation.Aggregator('day', retention=0)
+
+
+def test_gaps_and_advance():
+    aggregator = aggregation.Aggregator('day', retention=3)
+    aggregator.add('u1', MONDAY, RUN)
+    aggregator.add('u1', MONDAY + 10 * DAY, RUN_SHORT)
+    assert aggregator.totals('u1').count == 1, (
+        'Окно десятидневной давности должно устареть'
+    )
+    aggregator.add('u2', MONDAY + 10 * DAY, SWIM)
+    aggregator.advance(MONDAY + 20 * DAY)
+    assert aggregator.totals('u1').count == 0
+    assert aggregator.totals('u2').max_speed is None
+    assert aggregator.snapshot()['series'] == [], (
+        'Пользователи без окон должны удаляться'
+    )
+
+
+def test_expiry_recomputes_sums_exactly():
+    aggregator = aggregation.Aggregator('day', retention=2)
+    values = [info('RUN', [15000 + 7 * day, 1.1, 75.3]) for day in range(50)]
+    for day, value in enumerate(values):
+        aggregator.add('u1', MONDAY + day * DAY, value)
+    totals = aggregator.totals('u1', 'Running')
+    assert totals.distance == values[-2].distance + values[-1].distance
+    assert totals.calories == values[-2].calories + values[-1].calories
+
+
+def test_bad_values_are_skipped():
+    aggregator = aggregation.Aggregator('day')
+    lines = [json.dumps({'user_id': 'u', 'timestamp': MONDAY,
+                         'workout_type': 'RUN', 'data': data})
+             for data in ([15000, 1, 75], [15000, 0, 75], [15000, -1, 75],
+                          [15000, 1])]
+    lines += [json.dumps({'user_id': 'u', 'timestamp': MONDAY,
+                          'workout_type': 'WLK', 'data': data})
+              for data in ([9000, 1, 75, 0], [1e203, 1, 75, 180])]
+    assert aggregation.aggregate_lines(aggregator, lines) == 5
+    assert aggregator.totals('u').count == 1
+
+
+def test_command_keeps_snapshot_settings(tmp_path):
+    snapshot = str(tmp_path / 'state.json')
+    source = tmp_path / 'events.jsonl'
+    source.write_text(json.dumps({'user_id': 'u', 'timestamp': MONDAY,
+                                  'workout_type': 'RUN',
+                                  'data': [15000, 1, 75]}) + '\n')
+    assert aggregation.main(['--snapshot', snapshot, '--window', 'week',
+                             '--retention', '4', str(source)]) == 0
+    assert aggregation.main(['--snapshot', snapshot, str(source)]) == 0
+    assert aggregation.main(['--snapshot', snapshot, '--window', 'week',
+                             str(source)]) == 0
+    aggregator = aggregation.Aggregator.load(snapshot)
+    assert (aggregator.window, aggregator.retention) == ('week', 4)
+    assert aggregator.totals('u').count == 3
+    for option in (['--window', 'day'], ['--retention', '7']):
+        with pytest.raises(SystemExit):
+            aggregation.main(['--snapshot', snapshot, *option, str(source)])
+    assert aggregation.Aggregator.load(snapshot).totals('u').count == 3
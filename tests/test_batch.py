@@ -0,0 +1,84 @@
+import random
+
+import pytest
+
+import batch
+import homework
+
+
+def random_packages(count, seed=0):
+    rnd = random.Random(seed)
+    packages = []
+    for _ in range(count):
+        code = rnd.choice(['SWM', 'RUN', 'WLK'])
+        data = [rnd.randint(1, 30000), rnd.uniform(0.1, 5),
+                rnd.uniform(40, 120)]
+        if code == 'WLK':
+            data.append(rnd.randint(140, 210))
+        elif code == 'SWM':
+            data += [rnd.choice([25, 50]), rnd.randint(1, 80)]
+        packages.append((code, data))
+    return packages
+
+
+def test_score_packages_matches_classes():
+    packages = random_packages(500) + [
+        ('SWM', [720, 1, 80, 25, 40]),
+        ('RUN', [15000, 1, 75]),
+        ('WLK', [9000, 1, 75, 180]),
+    ]
+    result = batch.score_packages(packages)
+    assert len(result) == len(packages)
+    for index, (code, data) in enumerate(packages):
+        expected = homework.read_package(code, data).show_training_info()
+        message = result.message(index)
+        assert message.training_type == expected.training_type
+        assert message.distance == expected.distance
+        assert message.speed == expected.speed
+        assert message.calories == expected.calories, (
+            'Калории пакетного расчёта должны совпадать до бита'
+        )
+        assert message.get_message() == expected.get_message()
+
+
+def test_score_columns_keeps_input_order():
+    result = batch.score_columns(
+        ['RUN', 'WLK', 'RUN'],
+        [9000, 9000, 1206],
+        [1, 1, 12],
+        [75, 75, 6],
+        height=[0, 180, 0],
+    )
+    assert result.training_type == ['Running', 'SportsWalking', 'Running']
+    assert list(result.calories) == [383.85, 157.50000000000003,
+                                     -81.32032799999999]
+
+
+def test_score_columns_requires_extra_columns():
+    with pytest.raises(ValueError):
+        batch.score_columns(['SWM'], [720], [1], [80])
+
+
+def test_score_columns_unknown_code():
+    with pytest.raises(KeyError):
+        batch.score_columns(['XXX'], [1], [1], [1])
+
+
+def test_columns_from_packages_follow_extra_columns():
+    columns = batch.columns_from_packages([
+        ('SWM', (720, 1, 80, 25, 40)),
+        ('WLK', [9000, 1, 75, 180]),
+        ('RUN', [15000, 1, 75]),
+    ])
+    assert list(columns.height) == [0, 180, 0]
+    assert list(columns.length_pool) == [25, 0, 0]
+    assert list(columns.count_pool) == [40, 0, 0]
+
+
+def test_columns_from_packages_checks_packages():
+    with pytest.raises(homework.PackageArityError):
+        batch.columns_from_packages([('WLK', [9000, 1, 75, 180, 1])])
+    with pytest.raises(homework.PackageArityError):
+        batch.columns_from_packages([('SWM', [720, 1, 80, 25])])
+    with pytest.raises(homework.UnknownWorkoutError):
+        batch.columns_from_packages([('XXX', [1, 1, 1])])
@@ -0,0 +1,102 @@
+import os
+
+import pytest
+
+import benchmarks
+
+
+def test_hot_path_suite_runs():
+    results = benchmarks.run_suite(
+        benchmarks.hot_path_benchmarks(batch_sizes=(1, 10)),
+        min_time=0.01)
+    assert {'score_swimming', 'score_running', 'score_walking',
+            'get_message', 'end_to_end_1', 'end_to_end_10'} <= set(results)
+    for result in results.values():
+        assert result.ops_per_sec > 0
+        assert result.alloc_bytes >= 0
+
+
+def test_baseline_round_trip(tmp_path):
+    path = str(tmp_path / 'baseline.json')
+    results = {'score_running': benchmarks.BenchResult(1000.0, 64.0)}
+    benchmarks.save_baseline(results, path)
+    assert benchmarks.load_baseline(path) == results
+
+
+def test_find_regressions():
+    baseline = {'a': benchmarks.BenchResult(1000.0, 0.0),
+                'b': benchmarks.BenchResult(1000.0, 0.0)}
+    results = {'a': benchmarks.BenchResult(850.0, 0.0),
+               'b': benchmarks.BenchResult(700.0, 0.0),
+               'c': benchmarks.BenchResult(1.0, 0.0)}
+    regressions = benchmarks.find_regressions(results, baseline, 0.2)
+    assert len(regressions) == 1
+    assert regressions[0].startswith('b:')
+
+
+@pytest.mark.skipif('BENCH_BASELINE' not in os.environ,
+                    reason='задайте BENCH_BASELINE=путь к базовым значениям')
+def test_hot_path_has_no_regressions():
+    baseline = benchmarks.load_baseline(os.environ['BENCH_BASELINE'])
+    threshold = float(os.environ.get('BENCH_THRESHOLD',
+                                     benchmarks.DEFAULT_THRESHOLD))
+    results = benchmarks.run_suite(benchmarks.hot_path_benchmarks())
+    regressions = benchmarks.find_regressions(results, baseline, threshold)
+    assert not regressions, '\n'.join(regressions)
+
+
+def test_formatting_suite_runs():
+    results = benchmarks.run_suite(benchmarks.formatting_benchmarks(100),
+                                   min_time=0.01)
+    assert set(results) == {'report_get_message', 'report_format_messages',
+                            'report_format_columns'}
+
+
+def test_dispatch_suite_runs():
+    results = benchmarks.run_suite(benchmarks.dispatch_benchmarks(100),
+                                   min_time=0.01)
+    assert set(results) == {'dispatch_valid', 'dispatch_mixed_try_except',
+                            'dispatch_mixed_rejects'}
+
+
+def test_compression_suite_runs():
+    results = benchmarks.run_suite(
+        benchmarks.compression_benchmarks(200, member_bytes=1024),
+        min_time=0.01)
+    assert set(results) == {'compressed_none', 'compressed_gzip',
+                            'compressed_gzip_threads', 'compressed_bz2',
+                            'compressed_bz2_threads', 'compressed_xz',
+                            'compressed_xz_threads'}
+
+
+def test_leaderboard_suite_runs():
+    results = benchmarks.run_suite(benchmarks.leaderboard_benchmarks(300),
+                                   min_time=0.01)
+    assert set(results) == {'leaders_sorted', 'leaders_heap',
+                            'leaders_heap_columns'}
+
+
+def test_quantile_suite_runs():
+    results = benchmarks.run_suite(benchmarks.quantile_benchmarks(300),
+                                   min_time=0.01)
+    assert set(results) == {'quantiles_sorted', 'quantiles_sketch'}
+
+
+def test_rescore_suite_runs():
+    results = benchmarks.run_suite(benchmarks.rescore_benchmarks(300),
+                                   min_time=0.01)
+    assert set(results) == {'rescore_replay', 'rescore_full',
+                            'rescore_running'}
+
+
+def test_compiled_suite_runs():
+    results = benchmarks.run_suite(benchmarks.compiled_benchmarks(300),
+                                   min_time=0.01)
+    assert set(results) == {'compiled_classes', 'compiled_flat',
+                            'compiled_direct'}
+
+
+def test_cache_suite_runs():
+    results = benchmarks.run_suite(benchmarks.cache_benchmarks(300, 10),
+                                   min_time=0.01)
+    assert set(results) == {'cache_off', 'cache_on'}
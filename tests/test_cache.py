@@ -0,0 +1,96 @@
+import json
+import threading
+
+import pytest
+
+import cache
+import homework
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_cache_hits_return_same_result():
+    results = cache.PackageCache(maxsize=4)
+    first = results.get_info('RUN', [15000, 1, 75])
+    second = results.get_info('RUN', (15000, 1, 75))
+    assert first is second
+    assert first == homework.read_package('RUN', [15000, 1, 75]) \
+        .show_training_info()
+    assert (results.stats.hits, results.stats.misses) == (1, 1)
+
+
+def test_lru_eviction():
+    results = cache.PackageCache(maxsize=2)
+    results.get_info('RUN', [1, 1, 1])
+    results.get_info('RUN', [2, 1, 1])
+    results.get_info('RUN', [1, 1, 1])
+    results.get_info('RUN', [3, 1, 1])
+    assert results.stats.evictions == 1
+    results.get_info('RUN', [1, 1, 1])
+    assert results.stats.hits == 2, 'Недавно использованный пакет вытеснен'
+    results.get_info('RUN', [2, 1, 1])
+    assert results.stats.misses == 4
+
+
+def test_ttl_expiration():
+    clock = FakeClock()
+    results = cache.PackageCache(maxsize=8, ttl=10, clock=clock)
+    results.get_info('WLK', [9000, 1, 75, 180])
+    clock.now = 5
+    results.get_info('WLK', [9000, 1, 75, 180])
+    clock.now = 20
+    results.get_info('WLK', [9000, 1, 75, 180])
+    assert (results.stats.hits, results.stats.misses,
+            results.stats.expirations) == (1, 2, 1)
+
+
+def test_dump_stats():
+    results = cache.PackageCache(maxsize=8)
+    results.get_info('SWM', [720, 1, 80, 25, 40])
+    results.get_info('SWM', [720, 1, 80, 25, 40])
+    stats = json.loads(results.dump_stats())
+    assert stats['hits'] == 1
+    assert stats['size'] == 1
+    assert stats['hit_rate'] == 0.5
+
+
+def test_thread_safety():
+    results = cache.PackageCache(maxsize=16)
+
+    def worker():
+        for action in range(200):
+            results.get_info('RUN', [action % 32, 1, 75])
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results.stats.hits + results.stats.misses == 800
+    assert len(results) <= 16
+
+
+def test_invalid_size():
+    with pytest.raises(ValueError):
+        cache.PackageCache(maxsize=0)
+
+
+def test_iter_scored_rejects_like_compiled():
+    packages = [('RUN', [15000, 1, 75]), ('XXX', [1, 1, 1]),
+                ('WLK', [9000, 1, 75, 0]), ('WLK', [1e203, 1, 75, 180]),
+                ('RUN', [15000, 1, [75]]), ('RUN', [15000, 1, 75])]
+    results = cache.PackageCache()
+    rejects = []
+    infos = list(results.iter_scored(packages, rejects))
+    assert infos == [homework.read_package('RUN', [15000, 1, 75])
+                     .show_training_info()] * 2
+    assert [(reject.index, reject.reason) for reject in rejects] == [
+        (1, 'unknown_code'), (2, 'bad_value'), (3, 'bad_value'),
+        (4, 'bad_value')]
+    assert results.stats.hits == 1
@@ -0,0 +1,166 @@
+import json
+import subprocess
+import sys
+
+import aggregation
+import cache
+import cli
+import worker
+from conftest import BASE_DIR
+
+LAZY_SUBSYSTEMS = {'server', 'asyncio', 'columnar', 'mmap', 'aggregation',
+                   'store', 'parallel', 'multiprocessing', 'concurrent',
+                   'instrumentation', 'http', 'cluster', 'dedup',
+                   'sketches', 'leaderboard', 'rescore'}
+
+
+def import_times(*args):
+    """Модули, загруженные запуском, и их self-время в мкс."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', *args],
+                            cwd=BASE_DIR, capture_output=True, text=True,
+                            check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(self_us)
+    return times
+
+
+def cost(*args):
+    baseline = import_times('-c', 'pass')
+    times = import_times(*args)
+    return ({name for name in times if name not in baseline},
+            sum(us for name, us in times.items() if name not in baseline))
+
+
+def test_import_is_within_budget():
+    modules, total = cost('-c', 'import cli')
+    assert not modules & {'homework', 'stream', 'argparse', 'typing'}
+    assert total < cli.IMPORT_BUDGET_US
+
+
+def test_score_loads_no_optional_subsystems(tmp_path):
+    source = tmp_path / 'packages.csv'
+    source.write_text('RUN,15000,1,75\n')
+    modules, total = cost('cli.py', 'score', str(source))
+    assert 'stream' in modules
+    top_level = {name.split('.')[0] for name in modules}
+    assert not top_level & LAZY_SUBSYSTEMS
+    assert total < cli.SCORE_BUDGET_US
+
+
+def test_usage_and_unknown_command(capsys):
+    assert cli.main([]) == 0
+    assert 'worker' in capsys.readouterr().out
+    assert cli.main(['nope']) == 2
+    assert 'nope' in capsys.readouterr().err
+
+
+def test_score_command(tmp_path, capsys):
+    source = tmp_path / 'packages.csv'
+    source.write_text('RUN,15000,1,75\n')
+    assert cli.main(['score', str(source)]) == 0
+    assert capsys.readouterr().out.startswith('Тип тренировки: Running;')
+
+
+def test_serve_batches_answers_each_line():
+    lines = [json.dumps({'id': 1, 'packages': [['RUN', [15000, 1, 75]],
+                                               ['XXX', [1, 1, 1]]]}),
+             '',
+             'not json',
+             json.dumps({'id': 3})]
+    output = []
+
+    class Sink:
+        def write(self, text):
+            output.append(json.loads(text))
+
+        def flush(self):
+            pass
+
+    assert worker.serve_batches(lines, Sink()) == 3
+    first, broken, missing = output
+    assert first['id'] == 1
+    assert first['messages'][0].startswith('Тип тренировки: Running;')
+    assert first['rejects'] == [{'index': 1, 'reason': 'unknown_code',
+                                 'detail': "'XXX'"}]
+    assert 'error' in broken and broken['id'] is None
+    assert missing['id'] == 3 and 'KeyError' in missing['error']
+
+
+def test_serve_batches_survives_scoring_errors(monkeypatch):
+    calls = []
+    iter_scored = worker.iter_scored
+
+    def failing_once(packages, rejects):
+        calls.append(packages)
+        if len(calls) == 1:
+            raise ZeroDivisionError('float division by zero')
+        return iter_scored(packages, rejects)
+
+    monkeypatch.setattr(worker, 'iter_scored', failing_once)
+    request = json.dumps({'id': 1, 'packages': [['RUN', [15000, 1, 75]]]})
+    output = []
+
+    class Sink:
+        def write(self, text):
+            output.append(json.loads(text))
+
+        def flush(self):
+            pass
+
+    assert worker.serve_batches([request, request], Sink()) == 2
+    failed, scored = output
+    assert failed['id'] == 1 and 'ZeroDivisionError' in failed['error']
+    assert len(scored['messages']) == 1
+
+
+def test_serve_batches_with_cache():
+    request = json.dumps({'id': 1, 'packages': [['RUN', [15000, 1, 75]],
+                                                ['WLK', [9000, 1, 75, 0]]]})
+    output = []
+
+    class Sink:
+        def write(self, text):
+            output.append(json.loads(text))
+
+        def flush(self):
+            pass
+
+    results = cache.PackageCache()
+    assert worker.serve_batches([request] * 3, Sink(), results) == 3
+    assert output[0] == output[1] == output[2]
+    assert [reject['reason'] for reject in output[0]['rejects']] == [
+        'bad_value']
+    assert (results.stats.misses, results.stats.hits) == (4, 2), (
+        'Отбракованные пакеты не кэшируются')
+
+
+def test_worker_client_keeps_one_process():
+    packages = [('SWM', [720, 1, 80, 25, 40]), ('WLK', [9000, 1, 75, 180])]
+    with worker.WorkerClient() as client:
+        pid = client._process.pid
+        for _ in range(3):
+            messages, rejects = client.score(packages)
+            assert len(messages) == 2 and not rejects
+        messages, rejects = client.score(
+            [('WLK', [9000, 1, 75, 0]), ('WLK', [1e203, 1, 75, 180])])
+        assert not messages
+        assert [reject['reason'] for reject in rejects] == ['bad_value'] * 2
+        assert client._process.pid == pid
+    assert client._process.returncode == 0
+
+
+def test_aggregate_command_continues_snapshot(tmp_path):
+    events = tmp_path / 'events.jsonl'
+    snapshot = tmp_path / 'state.json'
+    events.write_text(json.dumps({'user_id': 'u', 'timestamp': 86400,
+                                  'workout_type': 'RUN',
+                                  'data': [15000, 1, 75]}) + '\n')
+    for _ in range(2):
+        assert cli.main(['aggregate', '--snapshot', str(snapshot),
+                         str(events)]) == 0
+    restored = aggregation.Aggregator.load(str(snapshot))
+    assert restored.totals('u').count == 2
@@ -0,0 +1,183 @@
+import threading
+from multiprocessing.connection import Client
+
+import pytest
+
+import cluster
+import homework
+from conftest import make_packages
+
+AUTHKEY = b'test-key'
+
+
+def write_packages(path, count, seed=0):
+    packages = make_packages(count, seed)
+    path.write_text(''.join(
+        ','.join([code, *map(repr, data)]) + '\n' for code, data in packages))
+    return [homework.read_package(*package).show_training_info()
+            .get_message() for package in packages]
+
+
+def test_shards_cover_every_line_once(tmp_path):
+    path = tmp_path / 'packages.csv'
+    write_packages(path, 500)
+    shards = cluster.make_shards([str(path), str(path)], shard_bytes=1000)
+    assert [shard.shard_id for shard in shards] == list(range(len(shards)))
+    lines = [line for shard in shards for line in cluster.read_shard(shard)]
+    assert lines == path.read_text().splitlines() * 2
+
+
+def test_local_workers_merge_in_order(tmp_path):
+    first, second = tmp_path / 'a.csv', tmp_path / 'b.csv'
+    expected = write_packages(first, 700) + write_packages(second, 300, 1)
+    shards = cluster.make_shards([str(first), str(second)],
+                                 shard_bytes=2000)
+    with cluster.Coordinator(shards, AUTHKEY) as coordinator:
+        workers = cluster.start_local_workers(coordinator.address, AUTHKEY, 2)
+        assert list(coordinator.results()) == expected
+        report = coordinator.report()
+    for worker in workers:
+        worker.join(5)
+        assert worker.exitcode == 0
+    assert report.packages == 1000
+    assert len(report.shards) == len(shards)
+    assert not report.failed
+    assert report.throughput > 0
+    assert '1000 пакетов' in report.format()
+
+
+def test_lost_worker_shard_is_retried(tmp_path):
+    path = tmp_path / 'packages.csv'
+    expected = write_packages(path, 200)
+    shards = cluster.make_shards([str(path)], shard_bytes=1500)
+    with cluster.Coordinator(shards, AUTHKEY) as coordinator:
+        with Client(coordinator.address, authkey=AUTHKEY) as flaky:
+            flaky.send(('hello', 'flaky'))
+            assert flaky.recv()[0] == 'shard'
+        worker = threading.Thread(target=cluster.run_worker,
+                                  args=(coordinator.address, AUTHKEY, 'good'))
+        worker.start()
+        assert list(coordinator.results()) == expected
+        worker.join(5)
+        report = coordinator.report()
+    assert {shard.worker for shard in report.shards} == {'good'}
+    assert max(shard.attempts for shard in report.shards) == 2
+
+
+def run_single_worker(path, max_attempts):
+    """Рассчитать файл одним воркером: строки или ShardError и отчёт."""
+    shards = cluster.make_shards([str(path)])
+    with cluster.Coordinator(shards, AUTHKEY,
+                             max_attempts=max_attempts) as coordinator:
+        worker = threading.Thread(target=cluster.run_worker,
+                                  args=(coordinator.address, AUTHKEY, 'w'))
+        worker.start()
+        try:
+            lines = list(coordinator.results())
+        except cluster.ShardError as exc:
+            lines = exc
+        worker.join(5)
+        return lines, coordinator.report(), coordinator._attempts
+
+
+def test_bad_packages_come_back_as_rejects(tmp_path):
+    path = tmp_path / 'packages.csv'
+    path.write_text('RUN,15000,1,75\nXXX,1,1,1\nWLK,1e203,1,75,180\n')
+    lines, report, attempts = run_single_worker(path, max_attempts=2)
+    assert lines == [homework.read_package('RUN', [15000, 1, 75])
+                     .show_training_info().get_message()]
+    [shard] = report.shards
+    assert shard.attempts == attempts[0] == 1
+    assert shard.packages == 1
+    assert [(reject.index, reject.reason) for reject in shard.rejects] == [
+        (1, 'unknown_code'), (2, 'bad_value')]
+    assert report.rejected == 2
+    assert 'отбраковано 2 пакетов' in report.format()
+
+
+def test_unparsable_shard_fails_without_retry(tmp_path):
+    path = tmp_path / 'packages.csv'
+    path.write_text('RUN,15000,1,75\nRUN,abc,1,75\n')
+    error, report, attempts = run_single_worker(path, max_attempts=3)
+    assert isinstance(error, cluster.ShardError)
+    assert 'ValueError' in str(error)
+    assert attempts[0] == 1
+    assert list(report.failed) == [0]
+
+
+def test_unreadable_shard_fails_after_max_attempts(tmp_path):
+    path = tmp_path / 'packages.csv'
+    path.write_text('RUN,15000,1,75\n')
+    shards = cluster.make_shards([str(path)])
+    path.unlink()
+    with cluster.Coordinator(shards, AUTHKEY, max_attempts=2) as coordinator:
+        worker = threading.Thread(target=cluster.run_worker,
+                                  args=(coordinator.address, AUTHKEY, 'w'))
+        worker.start()
+        with pytest.raises(cluster.ShardError, match='FileNotFoundError'):
+            list(coordinator.results())
+        worker.join(5)
+        report = coordinator.report()
+    assert list(report.failed) == [0]
+    assert coordinator._attempts[0] == 2
+    assert 'не рассчитан' in report.format()
+
+
+def test_report_groups_by_worker():
+    coordinator_report = cluster.ClusterReport(3, 1.0, [
+        cluster.ShardReport(0, 'a', 1, 1, 0.1),
+        cluster.ShardReport(1, 'a', 1, 1, 0.1),
+        cluster.ShardReport(2, 'b', 1, 1, 0.5),
+    ])
+    assert coordinator_report.workers() == {'a': (2, 0.2), 'b': (1, 0.5)}
+
+
+def test_report_marks_slow_shards():
+    coordinator = cluster.Coordinator([], AUTHKEY)
+    coordinator.start()
+    try:
+        for shard_id, seconds in enumerate((0.1, 0.1, 0.1, 0.9)):
+            coordinator._store(cluster.ShardReport(shard_id, 'w', 1, 10,
+                                                   seconds), [])
+        report = coordinator.report()
+    finally:
+        coordinator.close()
+    assert [shard.shard_id for shard in report.stragglers] == [3]
+
+
+def test_no_live_workers_raises(tmp_path):
+    path = tmp_path / 'packages.csv'
+    write_packages(path, 50)
+    shards = cluster.make_shards([str(path)], shard_bytes=500)
+    with cluster.Coordinator(shards, AUTHKEY,
+                             worker_timeout=0.2) as coordinator:
+        with pytest.raises(cluster.ShardError, match='нет живых'):
+            list(coordinator.results())
+    with cluster.Coordinator(shards, AUTHKEY,
+                             worker_timeout=0.2) as coordinator:
+        with Client(coordinator.address, authkey=AUTHKEY) as flaky:
+            flaky.send(('hello', 'flaky'))
+            assert flaky.recv()[0] == 'shard'
+        with pytest.raises(cluster.ShardError, match='нет живых'):
+            list(coordinator.results())
+        assert not coordinator.report().failed
+
+
+def test_dispatch_stays_within_max_ahead(tmp_path):
+    path = tmp_path / 'packages.csv'
+    write_packages(path, 100)
+    shards = cluster.make_shards([str(path)], shard_bytes=500)
+    assert len(shards) > 3
+    with cluster.Coordinator(shards, AUTHKEY, max_ahead=2) as coordinator:
+        with Client(coordinator.address, authkey=AUTHKEY) as worker:
+            worker.send(('hello', 'manual'))
+            for expected in (0, 1):
+                _, shard = worker.recv()
+                assert shard.shard_id == expected
+                worker.send(('result', shard.shard_id, 1, 0.0,
+                             [f'line {shard.shard_id}'], []))
+            assert not worker.poll(0.3)
+            results = coordinator.results()
+            assert next(results) == 'line 0'
+            assert worker.poll(5)
+            assert worker.recv()[1].shard_id == 2
@@ -0,0 +1,140 @@
+import io
+
+import pytest
+
+import batch
+import columnar
+import homework
+import sketches
+import stream
+from conftest import make_packages
+
+PACKAGES = make_packages(200)
+
+
+def test_round_trip_is_lossless(tmp_path):
+    path = str(tmp_path / 'results.wkc')
+    result = batch.score_packages(PACKAGES)
+    assert columnar.write_columnar(path, result) == len(PACKAGES)
+    with columnar.ColumnarFile(path) as stored:
+        assert len(stored) == len(PACKAGES)
+        assert list(stored.calories) == list(result.calories), (
+            'Двоичный формат не должен терять точность'
+        )
+        assert stored.to_result() == result
+        for index, package in enumerate(PACKAGES[:20]):
+            expected = homework.read_package(*package).show_training_info()
+            assert stored[index] == expected
+
+
+def test_write_info_messages(tmp_path):
+    path = str(tmp_path / 'results.wkc')
+    infos = [homework.read_package(*package).show_training_info()
+             for package in PACKAGES[:5]]
+    columnar.write_columnar(path, infos)
+    with columnar.ColumnarFile(path) as stored:
+        assert [stored[index] for index in range(len(stored))] == infos
+
+
+def test_empty_file(tmp_path):
+    path = str(tmp_path / 'empty.wkc')
+    columnar.write_columnar(path, [])
+    with columnar.ColumnarFile(path) as stored:
+        assert len(stored) == 0
+        assert stored.types == []
+
+
+@pytest.mark.parametrize('content', [b'', b'XXXX' + bytes(16), b'WK'])
+def test_bad_files(tmp_path, content):
+    path = tmp_path / 'bad.wkc'
+    path.write_bytes(content)
+    with pytest.raises(columnar.FormatError):
+        columnar.ColumnarFile(str(path))
+
+
+def test_truncated_file(tmp_path):
+    buffer = io.BytesIO()
+    columnar.write_columnar(buffer, batch.score_packages(PACKAGES[:10]))
+    path = tmp_path / 'cut.wkc'
+    path.write_bytes(buffer.getvalue()[:-8])
+    with pytest.raises(columnar.FormatError):
+        columnar.ColumnarFile(str(path))
+
+
+def test_stream_columnar_output(tmp_path):
+    source = tmp_path / 'packages.csv'
+    source.write_text('SWM,720,1,80,25,40\nRUN,15000,1,75\n')
+    output = str(tmp_path / 'out.wkc')
+    stream.main([str(source), '--output-format', 'columnar',
+                 '--output', output])
+    with columnar.ColumnarFile(output) as stored:
+        assert [stored.training_type(i) for i in range(len(stored))] == [
+            'Swimming', 'Running']
+
+
+def test_writer_in_chunks_matches_write_columnar(tmp_path):
+    whole, chunked = str(tmp_path / 'whole.wkc'), str(tmp_path / 'parts.wkc')
+    columnar.write_columnar(whole, batch.score_packages(PACKAGES))
+    assert columnar.write_packages(chunked, PACKAGES, chunk_rows=7) == (
+        len(PACKAGES))
+    with open(whole, 'rb') as expected, open(chunked, 'rb') as actual:
+        assert actual.read() == expected.read()
+
+
+def test_writer_leaves_no_file_on_error(tmp_path):
+    path = tmp_path / 'partial.wkc'
+    with pytest.raises(RuntimeError):
+        with columnar.ColumnarWriter(str(path)) as writer:
+            writer.extend(batch.score_packages(PACKAGES[:5]))
+            raise RuntimeError
+    assert not path.exists()
+
+
+def test_stream_columnar_rejects_and_quantiles(tmp_path):
+    source = tmp_path / 'packages.csv'
+    source.write_text('SWM,720,1,80,25,40\nXXX,1,1,1\nRUN,15000,0,75\n'
+                      'RUN,15000,1,75\n')
+    output = str(tmp_path / 'out.wkc')
+    rejects = tmp_path / 'rejects.jsonl'
+    quantiles = str(tmp_path / 'quantiles.json')
+    stream.main([str(source), '--output-format', 'columnar',
+                 '--output', output, '--buffer-size', '1',
+                 '--rejects', str(rejects), '--quantiles', quantiles])
+    with columnar.ColumnarFile(output) as stored:
+        assert len(stored) == 2
+    assert len(rejects.read_text().splitlines()) == 2
+    assert sketches.DistributionSketches.load(quantiles).sketch(
+        'Running', 'speed').count == 1
+
+
+@pytest.mark.parametrize('flags', [['--workers', '2'],
+                                   ['--metrics-file', 'metrics.prom']])
+def test_stream_columnar_rejects_unsupported_flags(tmp_path, flags):
+    with pytest.raises(SystemExit, match=flags[0]):
+        stream.main(['-', '--output-format', 'columnar',
+                     '--output', str(tmp_path / 'out.wkc'), *flags])
+
+
+def test_too_many_types_is_format_error(tmp_path):
+    infos = [homework.InfoMessage(f'Type{number}', 1.0, 1.0, 1.0, 1.0)
+             for number in range(columnar.MAX_TYPES + 1)]
+    result = batch.ColumnarResult(
+        [info.training_type for info in infos],
+        *([1.0] * len(infos) for _ in columnar.FLOAT_COLUMNS))
+    path = tmp_path / 'many.wkc'
+    for results in (infos, columnar.InfoMessageColumns(infos), result):
+        with pytest.raises(columnar.FormatError):
+            columnar.write_columnar(str(path), results)
+        assert not path.exists()
+    columnar.write_columnar(str(path), infos[:columnar.MAX_TYPES])
+    with columnar.ColumnarFile(str(path)) as stored:
+        assert stored[-1] == infos[columnar.MAX_TYPES - 1]
+
+
+def test_raw_file_rows_follow_extra_columns(tmp_path):
+    packages = [('SWM', [720, 1, 80, 25, 40]), ('RUN', [15000, 1, 75]),
+                ('WLK', [9000, 1, 75, 180])]
+    path = str(tmp_path / 'raw.wkrw')
+    columnar.write_raw(path, batch.columns_from_packages(packages))
+    with columnar.RawFile(path) as raw:
+        assert [raw[index] for index in range(len(raw))] == packages
@@ -0,0 +1,114 @@
+import pytest
+
+import benchmarks
+import compact
+import homework
+
+PACKAGES = [
+    ('SWM', [720, 1, 80, 25, 40]),
+    ('RUN', [15000, 1, 75]),
+    ('WLK', [9000, 1, 75, 180]),
+]
+
+
+@pytest.mark.parametrize('package', PACKAGES)
+def test_compact_matches_homework(package):
+    expected = homework.read_package(*package).show_training_info()
+    training = compact.read_package(*package)
+    assert not hasattr(training, '__dict__'), (
+        'Компактные классы не должны иметь `__dict__`'
+    )
+    info = training.show_training_info()
+    assert not hasattr(info, '__dict__')
+    assert info.get_message() == expected.get_message()
+    assert (info.distance, info.speed, info.calories) == (
+        expected.distance, expected.speed, expected.calories)
+
+
+def test_compact_keeps_public_attributes():
+    swimming = compact.read_package('SWM', [720, 1, 80, 25, 40])
+    assert (swimming.action, swimming.duration, swimming.weight,
+            swimming.length_pool, swimming.count_pool) == (720, 1, 80, 25, 40)
+    assert swimming.LEN_STEP == homework.Swimming.LEN_STEP
+
+
+def test_compact_classes_follow_registry(monkeypatch):
+    class Rowing(homework.Training):
+        LEN_STEP = 2.0
+
+        def get_spent_calories(self):
+            return self.get_mean_speed() * self.weight
+
+    monkeypatch.setitem(homework.WORKOUT_CLASSES, 'ROW', Rowing)
+    monkeypatch.setitem(homework.WORKOUT_ARITY, 'ROW', 3)
+    monkeypatch.setitem(homework.WORKOUT_POSITIVE, 'ROW', (1,))
+    rowing = compact.read_package('ROW', [1000, 1, 70])
+    assert isinstance(rowing, compact.Training)
+    assert type(rowing) is compact.compact_class(Rowing)
+    assert not hasattr(rowing, '__dict__')
+    assert rowing.show_training_info().get_message() == (
+        Rowing(1000, 1, 70).show_training_info().get_message())
+    assert not isinstance(compact.Running(15000, 1, 75), homework.Training)
+
+
+def test_compact_copies_class_attributes():
+    class Hiking(homework.Training):
+        LEN_STEP = 0.8
+
+        @staticmethod
+        def factor():
+            return 2
+
+        @property
+        def steps(self):
+            return self.action
+
+        def get_spent_calories(self):
+            return self.factor() * self.steps * self.weight
+
+    hiking = compact.compact_class(Hiking)
+    assert vars(hiking)['LEN_STEP'] == 0.8
+    assert vars(hiking)['get_distance'] is homework.Training.get_distance
+    training = hiking(1000, 2, 70)
+    assert training.steps == 1000
+    assert training.get_spent_calories() == 2 * 1000 * 70
+    assert training.show_training_info().get_message() == (
+        Hiking(1000, 2, 70).show_training_info().get_message())
+
+
+@pytest.mark.parametrize('package, error', [
+    (('XXX', [1, 1, 1]), homework.UnknownWorkoutError),
+    (('RUN', [15000, 1]), homework.PackageArityError),
+    (('RUN', [15000, 0, 75]), homework.PackageValueError),
+])
+def test_compact_read_package_errors(package, error):
+    with pytest.raises(error):
+        compact.read_package(*package)
+
+
+def test_info_message_columns_round_trip():
+    infos = [homework.read_package(*package).show_training_info()
+             for package in PACKAGES * 3]
+    columns = compact.InfoMessageColumns(infos)
+    assert len(columns) == len(infos)
+    assert columns.types == ['Swimming', 'Running', 'SportsWalking']
+    assert [info.get_message() for info in columns] == [
+        info.get_message() for info in infos]
+    assert columns.nbytes() == len(infos) * 33
+
+
+def test_info_message_columns_many_types():
+    infos = [homework.InfoMessage(f'Type{index}', 1, 2, 3, 4)
+             for index in range(300)]
+    columns = compact.InfoMessageColumns(infos)
+    assert columns.type_index.typecode == 'H'
+    assert [info.training_type for info in columns] == [
+        info.training_type for info in infos]
+
+
+def test_memory_reduction():
+    results = benchmarks.bench_memory(20000)
+    assert results['training_slots'] < results['training_dict']
+    assert results['info_dict'] / results['info_columns'] >= 3, (
+        'Колоночное хранение должно быть хотя бы в 3 раза компактнее'
+    )
@@ -0,0 +1,126 @@
+import random
+
+import pytest
+
+import compiled
+import homework
+
+
+class FastRunning(homework.Running):
+    LEN_STEP = 0.8
+    COEFF_CALORIE_2 = -3
+
+
+class HeavyWalking(homework.SportsWalking):
+    COEFF_CALORIE_1 = 1
+
+
+class LongSwimming(homework.Swimming):
+    M_IN_KM = 1609.344
+    COEFF_CALORIE_2 = 2.7
+
+
+class Rowing(homework.Training):
+    LEN_STEP = 2.0
+
+    def get_spent_calories(self):
+        return self.get_mean_speed() * self.weight
+
+
+class NanRunning(homework.Running):
+    COEFF_CALORIE_1 = float('nan')
+
+
+CLASSES = [homework.Running, homework.SportsWalking, homework.Swimming,
+           FastRunning, HeavyWalking, LongSwimming]
+
+
+def random_data(rnd, cls):
+    """Параметры конструктора cls, в том числе целые и крайние."""
+    data = [rnd.choice((rnd.randint(0, 50000), rnd.uniform(0, 50000))),
+            rnd.choice((rnd.uniform(1e-3, 10), rnd.randint(1, 5))),
+            rnd.choice((rnd.uniform(30, 150), rnd.randint(30, 150)))]
+    if issubclass(cls, homework.SportsWalking):
+        data.append(rnd.choice((rnd.randint(100, 220),
+                                rnd.uniform(100, 220))))
+    elif issubclass(cls, homework.Swimming):
+        data += [rnd.choice((25, 50, rnd.uniform(10, 100))),
+                 rnd.randint(0, 200)]
+    return data
+
+
+@pytest.mark.parametrize('cls', CLASSES, ids=lambda cls: cls.__name__)
+def test_conforms_to_show_training_info(cls):
+    assert compiled.generate_source(cls) is not None
+    score = compiled.compile_scorer(cls)
+    rnd = random.Random(cls.__name__)
+    for _ in range(5000):
+        data = random_data(rnd, cls)
+        expected = cls(*data).show_training_info()
+        assert score(*data) == expected
+        assert score(*data).get_message() == expected.get_message()
+
+
+@pytest.mark.parametrize('cls', [Rowing, NanRunning],
+                         ids=lambda cls: cls.__name__)
+def test_unknown_formulas_fall_back_to_class(cls):
+    assert compiled.generate_source(cls) is None
+    score = compiled.compile_scorer(cls)
+    assert score.__name__ == f'score_{cls.__name__}'
+    assert repr(score(15000, 1, 75)) == repr(
+        cls(15000, 1, 75).show_training_info())
+
+
+def test_constants_are_folded():
+    source = compiled.generate_source(FastRunning)
+    assert '0.8 / 1000' in source and '- (-3)' in source
+    assert 'LEN_STEP' not in source and 'self' not in source
+
+
+def test_recompiles_after_constant_change(monkeypatch):
+    before = compiled.scorer_for(FastRunning)
+    assert compiled.scorer_for(FastRunning) is before
+    monkeypatch.setattr(FastRunning, 'COEFF_CALORIE_1', 19)
+    after = compiled.scorer_for(FastRunning)
+    assert after is not before
+    assert after(9000, 1, 70) == FastRunning(9000, 1, 70).show_training_info()
+
+
+def test_compile_registry_covers_registered_classes():
+    homework.register_workout('ROW', Rowing)
+    try:
+        scorers = compiled.compile_registry()
+    finally:
+        del homework.WORKOUT_CLASSES['ROW']
+        del homework.WORKOUT_ARITY['ROW']
+    assert set(scorers) == {'SWM', 'RUN', 'WLK', 'ROW'}
+    assert scorers['ROW'](1000, 1, 70) == (
+        Rowing(1000, 1, 70).show_training_info())
+
+
+def test_iter_scored_matches_read_packages():
+    packages = [
+        ('RUN', [15000, 1, 75]),
+        ('XXX', [1, 1, 1]),
+        ('WLK', [9000, 1, 75]),
+        ('SWM', [720, 0, 80, 25, 40]),
+        ('RUN', [15000, 1, None]),
+        ('WLK', [9000, 1, 75, 180]),
+        ('SWM', [720, 1, 80, 25, 40]),
+    ]
+    expected_rejects, rejects = [], []
+    expected = [training.show_training_info() for training
+                in homework.read_packages(packages, expected_rejects)]
+    assert list(compiled.iter_scored(packages, rejects)) == expected
+    assert rejects == expected_rejects
+    with pytest.raises(homework.UnknownWorkoutError):
+        list(compiled.iter_scored(packages))
+
+
+def test_score_packages_errors_match_read_package():
+    assert compiled.score_packages([('RUN', [15000, 1, 75])]) == [
+        homework.read_package('RUN', [15000, 1, 75]).show_training_info()]
+    with pytest.raises(homework.PackageArityError):
+        compiled.score_packages([('RUN', [1, 1])])
+    with pytest.raises(homework.PackageValueError):
+        compiled.score_packages([('RUN', [1, 0, 70])])
@@ -0,0 +1,87 @@
+import gzip
+import os
+
+import pytest
+
+import compressed
+import stream
+from conftest import make_packages
+
+CODECS = list(compressed.CODECS)
+
+
+def make_lines(count):
+    return [','.join(map(str, [code, *data])) + '\n'
+            for code, data in make_packages(count)]
+
+
+@pytest.mark.parametrize('codec', CODECS)
+@pytest.mark.parametrize('workers', [0, 3])
+def test_multi_member_round_trip(tmp_path, codec, workers):
+    lines = make_lines(2000)
+    path = str(tmp_path / ('packages.csv' + compressed.SUFFIXES[codec]))
+    members = compressed.write_members(path, lines, codec, member_bytes=4096)
+    assert members > 10
+    assert compressed.detect_compression(path) == codec
+    assert list(compressed.iter_lines([path], workers,
+                                      segment_bytes=1024)) == lines
+
+
+def test_plain_and_compressed_files_mix(tmp_path):
+    lines = make_lines(100)
+    plain = str(tmp_path / 'a.csv')
+    with open(plain, 'w', encoding='utf-8') as output:
+        output.writelines(lines)
+    packed = str(tmp_path / 'b.csv.xz')
+    compressed.write_members(packed, lines, 'xz', member_bytes=512)
+    assert compressed.detect_compression(plain) is None
+    assert list(compressed.iter_lines([plain, packed], 2)) == lines * 2
+
+
+def test_decode_members_rejects_false_boundaries():
+    data = memoryview(gzip.compress(b'a' * 1000) + gzip.compress(b'b'))
+    assert compressed.decode_members(data, 0, len(data), 'gzip') == \
+        b'a' * 1000 + b'b'
+    assert compressed.decode_members(data, 0, len(data) - 5, 'gzip') is None
+    assert compressed.decode_members(data, 3, len(data), 'gzip') is None
+
+
+def test_signature_inside_member_falls_back_to_stream(tmp_path):
+    payload = os.urandom(100000) + b'\x1f\x8b\x08' + os.urandom(100000)
+    path = str(tmp_path / 'one.gz')
+    with open(path, 'wb') as output:
+        output.write(gzip.compress(payload, compresslevel=0))
+    with open(path, 'rb') as source:
+        assert len(compressed.member_segments(source.read(), 'gzip',
+                                              50000)) > 1
+    chunks = compressed.iter_chunks(path, 'gzip', 2, segment_bytes=50000)
+    assert b''.join(chunks) == payload
+
+
+def test_truncated_archive_raises(tmp_path):
+    path = str(tmp_path / 'cut.csv.bz2')
+    compressed.write_members(path, make_lines(500), 'bz2', member_bytes=1024)
+    with open(path, 'r+b') as archive:
+        archive.truncate(os.path.getsize(path) - 10)
+    with pytest.raises(EOFError):
+        list(compressed.iter_lines([path], 2, segment_bytes=256))
+
+
+def test_byte_lines_split_like_text_files():
+    chunks = [b'RUN,1,', b'1,75\r\nWLK,9\xd0', b'\xbf\n', b'tail']
+    assert list(compressed.iter_byte_lines(chunks)) == \
+        ['RUN,1,1,75\r\n', 'WLK,9п\n', 'tail']
+
+
+def test_stream_main_reads_archives(tmp_path, capsys):
+    lines = make_lines(300)
+    plain = str(tmp_path / 'packages.csv')
+    with open(plain, 'w', encoding='utf-8') as output:
+        output.writelines(lines)
+    stream.main([plain])
+    expected = capsys.readouterr().out
+    packed = plain + '.gz'
+    compressed.write_members(packed, lines, 'gzip', member_bytes=1024)
+    for threads in ('0', '2'):
+        stream.main([packed, '--decode-threads', threads])
+        assert capsys.readouterr().out == expected
@@ -0,0 +1,138 @@
+import json
+
+import pytest
+
+import benchmarks
+import cli
+import dedup
+from conftest import make_packages
+
+
+def make_events(count):
+    return [(f'device{index % 7}', 1700000000.0 + index, code, data)
+            for index, (code, data)
+            in enumerate(make_packages(count))]
+
+
+def test_drops_retransmitted_packages():
+    events = make_events(1000)
+    deduplicator = dedup.Deduplicator(capacity=10000)
+    packages = list(deduplicator.filter(events + events[::3]))
+    assert packages == [(code, data) for _, _, code, data in events]
+    stats = deduplicator.stats()
+    assert stats.seen == 1334
+    assert stats.duplicates == 334
+    assert stats.exact_entries == 1000
+    assert stats.memory_bytes == (stats.bloom_bytes
+                                  + 1000 * dedup.EXACT_ENTRY_BYTES)
+
+
+def test_same_payload_from_other_device_is_kept():
+    deduplicator = dedup.Deduplicator(capacity=100)
+    package = ('RUN', [15000, 1, 75])
+    assert not deduplicator.is_duplicate('a', 1.0, *package)
+    assert not deduplicator.is_duplicate('b', 1.0, *package)
+    assert not deduplicator.is_duplicate('a', 2.0, *package)
+    assert deduplicator.is_duplicate('a', 1.0, *package)
+
+
+def test_false_positives_are_not_dropped():
+    deduplicator = dedup.Deduplicator(capacity=50, error_rate=0.5)
+    events = make_events(2000)
+    assert len(list(deduplicator.filter(events))) == 2000
+    stats = deduplicator.stats()
+    assert stats.unconfirmed > 0
+    assert stats.rotations > 0
+    assert stats.duplicates == stats.probable == 0
+
+
+def test_bloom_catches_repeats_past_exact_window():
+    events = make_events(500)
+    bloom_blocks, _ = dedup.BloomFilter.parameters(1000, 0.001)
+    limit = 2 * bloom_blocks * dedup.BLOCK_BYTES + 100 * 104
+    deduplicator = dedup.Deduplicator(capacity=1000, error_rate=0.001,
+                                      memory_limit=limit)
+    assert len(list(deduplicator.filter(events))) == 500
+    assert list(deduplicator.filter(events[:100])) == []
+    stats = deduplicator.stats()
+    assert stats.duplicates == stats.probable == 100
+    assert stats.exact_entries == 100
+
+
+def test_integer_and_float_numbers_share_a_key():
+    assert dedup.event_digest('a', 5, 'RUN', [15000, 1, 75]) == \
+        dedup.event_digest('a', 5.0, 'RUN', [15000.0, 1.0, 75.0])
+    assert dedup.event_digest('a', 0, 'RUN', [-0.0]) == \
+        dedup.event_digest('a', 0.0, 'RUN', [0])
+    deduplicator = dedup.Deduplicator(capacity=100)
+    assert not deduplicator.is_duplicate('a', 5, 'RUN', [15000, 1, 75])
+    assert deduplicator.is_duplicate('a', 5.0, 'RUN', [15000.0, 1, 75.0])
+
+
+def test_large_integers_and_non_numbers_keep_distinct_keys():
+    big = 2 ** 53
+    assert dedup.event_digest('a', 1, 'RUN', [big]) != \
+        dedup.event_digest('a', 1, 'RUN', [big + 1])
+    assert dedup.event_digest('a', 1, 'RUN', [float(big)]) == \
+        dedup.event_digest('a', 1, 'RUN', [big])
+    assert dedup.event_digest('a', 1, 'RUN', ['5']) != \
+        dedup.event_digest('a', 1, 'RUN', [5])
+    assert dedup.event_digest('a', 1, 'RUN', [None, 'x']) == \
+        dedup.event_digest('a', 1, 'RUN', [None, 'x'])
+
+
+def test_malformed_lines_are_skipped():
+    good = json.dumps({'device_id': 'a', 'timestamp': 1,
+                       'workout_type': 'RUN', 'data': ['x', 1, 75]})
+    lines = ['not json\n', '[1, 2]\n', '{"device_id": "a"}\n',
+             json.dumps({'device_id': 'a', 'timestamp': 1,
+                         'workout_type': 5, 'data': [1]}) + '\n',
+             good + '\n', good + '\n']
+    deduplicator = dedup.Deduplicator(capacity=100)
+    assert list(dedup.filter_lines(deduplicator, lines)) == [good + '\n']
+    stats = deduplicator.stats()
+    assert stats.malformed == 4
+    assert stats.seen == 2
+    assert stats.duplicates == 1
+
+
+def test_false_positive_rate():
+    bloom = dedup.BloomFilter(20000, 0.01)
+    for index in range(20000):
+        bloom.add(dedup.event_digest('a', index, 'RUN', [1]))
+    false_positives = sum(dedup.event_digest('b', index, 'RUN', [1]) in bloom
+                          for index in range(20000))
+    assert false_positives / 20000 < 0.02
+
+
+def test_memory_cap_bounds_exact_keys():
+    events = make_events(500)
+    bloom_blocks, _ = dedup.BloomFilter.parameters(100, 0.01)
+    limit = 2 * bloom_blocks * dedup.BLOCK_BYTES + 100 * 104
+    deduplicator = dedup.Deduplicator(capacity=100, error_rate=0.01,
+                                      memory_limit=limit)
+    assert deduplicator.max_exact == 100
+    list(deduplicator.filter(events))
+    assert deduplicator.stats().exact_entries == 100
+    assert deduplicator.stats().memory_bytes <= limit
+    assert deduplicator.is_duplicate(*events[-1])
+    with pytest.raises(ValueError):
+        dedup.Deduplicator(capacity=10 ** 6, memory_limit=1024)
+
+
+def test_dedup_command(tmp_path, capsys):
+    source = tmp_path / 'events.jsonl'
+    lines = [json.dumps({'device_id': device, 'timestamp': 1,
+                         'workout_type': 'RUN', 'data': [15000, 1, 75]})
+             for device in ('a', 'b', 'a')]
+    source.write_text('\n'.join(lines) + '\n')
+    assert cli.main(['dedup', '--capacity', '100', str(source)]) == 0
+    captured = capsys.readouterr()
+    assert captured.out.splitlines() == lines[:2]
+    assert json.loads(captured.err)['duplicates'] == 1
+
+
+def test_dedup_suite_runs():
+    results = benchmarks.run_suite(benchmarks.dedup_benchmarks(100),
+                                   min_time=0.01)
+    assert set(results) == {'dedup_filter'}
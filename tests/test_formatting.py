@@ -0,0 +1,53 @@
+import io
+import tempfile
+
+import pytest
+
+import batch
+import formatting
+import homework
+from conftest import make_packages
+
+PACKAGES = make_packages(300) + [('RUN', [1206, 12, 6])]
+
+
+def expected_text(packages):
+    return ''.join(homework.read_package(*package).show_training_info()
+                   .get_message() + '\n' for package in packages)
+
+
+@pytest.mark.parametrize('info', [
+    homework.InfoMessage('Swimming', 1, 75, 1, 80),
+    homework.InfoMessage('Running', 4.0, 20.00049, 0.0004999, -81.32032),
+    homework.InfoMessage('SportsWalking', 12, 6, 12, 1e20),
+])
+def test_format_info_identical(info):
+    assert formatting.format_info(info) == info.get_message()
+
+
+def test_format_messages_identical():
+    infos = [homework.read_package(*package).show_training_info()
+             for package in PACKAGES]
+    assert formatting.format_messages(infos) == expected_text(PACKAGES)
+
+
+def test_format_columns_identical():
+    result = batch.score_packages(PACKAGES)
+    assert formatting.format_columns(result) == expected_text(PACKAGES)
+
+
+def test_write_messages_to_file_object():
+    infos = [homework.read_package(*package).show_training_info()
+             for package in PACKAGES]
+    output = io.StringIO()
+    written = formatting.write_messages(infos, output, chunk_size=7)
+    assert output.getvalue() == expected_text(PACKAGES)
+    assert written == len(output.getvalue())
+
+
+def test_write_columns_to_descriptor():
+    result = batch.score_packages(PACKAGES)
+    with tempfile.TemporaryFile() as target:
+        formatting.write_columns(result, target.fileno(), chunk_size=50)
+        target.seek(0)
+        assert target.read().decode('utf-8') == expected_text(PACKAGES)
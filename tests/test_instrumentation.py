@@ -0,0 +1,109 @@
+import time
+import urllib.request
+
+import benchmarks
+import instrumentation
+import stream
+
+PACKAGES = [
+    ('SWM', [720, 1, 80, 25, 40]),
+    ('RUN', [15000, 1, 75]),
+    ('WLK', [9000, 1, 75, 180]),
+] * 10
+
+
+def test_messages_match_plain_pipeline():
+    expected = list(stream.iter_messages(PACKAGES))
+    for enabled in (False, True):
+        metrics = instrumentation.Instrumentation(enabled=enabled)
+        assert list(metrics.iter_messages(PACKAGES)) == expected
+
+
+def test_disabled_is_plain_pipeline():
+    metrics = instrumentation.Instrumentation(enabled=False)
+    assert metrics.iter_messages(PACKAGES).gi_code is (
+        stream.iter_messages(PACKAGES).gi_code)
+
+
+def test_disabled_records_nothing():
+    metrics = instrumentation.Instrumentation(enabled=False)
+    list(metrics.iter_messages(PACKAGES))
+    assert not metrics.packages
+    assert 'workout_stage_seconds_bucket' not in metrics.to_prometheus()
+
+
+def test_stage_histograms_and_counters():
+    metrics = instrumentation.Instrumentation()
+    rejects = []
+    packages = PACKAGES + [('XXX', [1, 1, 1]), ('RUN', [15000, 0, 75]),
+                           ('WLK', [1e203, 1, 75, 180])]
+    list(metrics.iter_messages(packages, rejects))
+    assert [reject.index for reject in rejects] == [30, 31, 32]
+    assert metrics.packages == {'SWM': 10, 'RUN': 10, 'WLK': 10}
+    assert metrics.rejects == {'unknown_code': 1, 'bad_value': 2}
+    for stage in instrumentation.STAGES:
+        assert metrics.histogram(stage, 'RUN').count == 10
+    text = metrics.to_prometheus()
+    assert 'workout_packages_total{workout_type="SWM"} 10' in text
+    assert 'workout_rejects_total{reason="bad_value"} 2' in text
+    assert ('workout_stage_seconds_bucket{stage="calories",'
+            'workout_type="WLK",le="+Inf"} 10') in text
+    assert ('workout_stage_seconds_count{stage="message",'
+            'workout_type="RUN"} 10') in text
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = instrumentation.Histogram((1.0, 2.0))
+    for value in (0.5, 1.0, 1.5, 3.0):
+        histogram.observe(value)
+    assert histogram.cumulative() == [2, 3, 4]
+    assert histogram.total == 6.0
+
+
+def test_write_and_serve(tmp_path):
+    metrics = instrumentation.Instrumentation()
+    list(metrics.iter_messages(PACKAGES))
+    path = tmp_path / 'workouts.prom'
+    metrics.write(str(path))
+    assert path.read_text(encoding='utf-8') == metrics.to_prometheus()
+    httpd = metrics.serve()
+    try:
+        url = f'http://127.0.0.1:{httpd.server_address[1]}/metrics'
+        with urllib.request.urlopen(url) as response:
+            assert response.read().decode('utf-8') == metrics.to_prometheus()
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def test_sampling_profiler_collects_stacks():
+    metrics = instrumentation.Instrumentation()
+    profiler = metrics.start_profiler(interval=0.0005)
+    deadline = time.perf_counter() + 0.2
+    while time.perf_counter() < deadline:
+        list(metrics.iter_messages(PACKAGES))
+    metrics.stop_profiler()
+    assert not profiler.running
+    assert profiler.samples
+    assert profiler.top(1)[0][1] > 0
+    assert 'test_instrumentation.py:' in profiler.collapsed()
+
+
+def test_pipeline_cli_exports_metrics(tmp_path, capsys):
+    source = tmp_path / 'packages.csv'
+    source.write_text('RUN,15000,1,75\nSWM,720,1,80,25,40\n')
+    metrics = tmp_path / 'metrics.prom'
+    profile = tmp_path / 'profile.txt'
+    stream.main([str(source), '--metrics-file', str(metrics),
+                 '--profile', str(profile)])
+    assert len(capsys.readouterr().out.splitlines()) == 2
+    assert 'workout_packages_total{workout_type="RUN"} 1' in (
+        metrics.read_text(encoding='utf-8'))
+    assert profile.exists()
+
+
+def test_instrumentation_suite_runs():
+    results = benchmarks.run_suite(
+        benchmarks.instrumentation_benchmarks(100), min_time=0.01)
+    assert set(results) == {'instrumented_plain', 'instrumented_off',
+                            'instrumented_on'}
@@ -0,0 +1,128 @@
+import json
+import math
+
+import pytest
+
+import batch
+import compact
+import homework
+import leaderboard
+import series
+from conftest import make_packages
+
+TYPES = ('Running', 'SportsWalking', 'Swimming')
+
+
+def scored(count, seed=0):
+    return [homework.read_package(code, data).show_training_info()
+            for code, data in make_packages(count, seed)]
+
+
+def expected_top(infos, training_type, metric, k):
+    values = [getattr(info, metric) for info in infos
+              if info.training_type == training_type]
+    return sorted(values, reverse=True)[:k]
+
+
+def values(board, training_type, metric):
+    return [leader.value for leader in board.top(training_type, metric)]
+
+
+def test_matches_full_sort():
+    infos = scored(3000)
+    board = leaderboard.Leaderboard(k=7)
+    for index, info in enumerate(infos):
+        board.add(info, key=f'user{index}')
+    for kind in TYPES:
+        for metric in leaderboard.METRICS:
+            assert values(board, kind, metric) == expected_top(
+                infos, kind, metric, 7)
+            for leader in board.top(kind, metric):
+                assert leader.info == infos[int(leader.key[4:])]
+    assert board.seen == 3000
+    assert len(board.boards()) == 9
+
+
+def test_memory_is_bounded_by_k():
+    board = leaderboard.Leaderboard(k=3, metrics=['speed'])
+    for info in scored(2000):
+        board.add(info)
+    assert all(len(heap) == 3 for heap in board._heaps.values())
+
+
+def test_ties_keep_earliest_and_nan_is_ignored():
+    board = leaderboard.Leaderboard(k=2, metrics=['distance'])
+    for key in 'abc':
+        board.add(homework.InfoMessage('Running', 1, 5.0, 1, 1), key)
+    board.add(homework.InfoMessage('Running', 1, math.nan, 1, 1), 'nan')
+    assert [leader.key for leader in board.top('Running', 'distance')] == [
+        'a', 'b']
+
+
+@pytest.mark.parametrize('make_batch', [
+    batch.score_packages,
+    lambda packages: compact.InfoMessageColumns(
+        batch.score_packages(packages).to_messages()),
+])
+def test_columns_match_messages(make_batch):
+    packages = make_packages(2000, seed=5)
+    by_message = leaderboard.Leaderboard(k=5)
+    for info in batch.score_packages(packages).to_messages():
+        by_message.add(info)
+    by_columns = leaderboard.Leaderboard(k=5)
+    by_columns.add_columns(make_batch(packages[:700]))
+    by_columns.add_columns(make_batch(packages[700:]))
+    assert by_columns.boards() == by_message.boards()
+    for kind, metric in by_message.boards():
+        assert by_columns.top(kind, metric) == by_message.top(kind, metric)
+
+
+def test_merged_shards_equal_single_stream():
+    infos = scored(3000, seed=1)
+    whole = leaderboard.Leaderboard(k=10)
+    for info in infos:
+        whole.add(info)
+    merged = leaderboard.Leaderboard(k=10)
+    for shard in (infos[:1000], infos[1000:2500], infos[2500:]):
+        part = leaderboard.Leaderboard(k=10)
+        for info in shard:
+            part.add(info)
+        merged.merge(part)
+    assert merged.seen == whole.seen
+    for kind, metric in whole.boards():
+        assert values(merged, kind, metric) == values(whole, kind, metric)
+
+
+def test_snapshot_round_trip():
+    board = leaderboard.Leaderboard(k=4)
+    for index, info in enumerate(scored(500)):
+        board.add(info, str(index))
+    state = json.loads(json.dumps(board.snapshot()))
+    restored = leaderboard.Leaderboard.from_snapshot(state)
+    for kind, metric in board.boards():
+        assert restored.top(kind, metric) == board.top(kind, metric)
+    extra = scored(1, seed=9)[0]
+    board.add(extra)
+    restored.add(extra)
+    assert restored.snapshot() == board.snapshot()
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        leaderboard.Leaderboard(k=0)
+    with pytest.raises(ValueError):
+        leaderboard.Leaderboard(metrics=['duration', 'pace'])
+
+
+def test_segment_results():
+    timestamps = [60.0 * minute for minute in range(61)]
+    counts = [(minute * 137) % 400 * minute for minute in range(61)]
+    counts = [sum(counts[:index + 1]) for index in range(61)]
+    segments = series.score_series('RUN', timestamps, counts, 75.0)
+    board = leaderboard.Leaderboard(k=3, metrics=['speed'])
+    board.add_columns(segments, keys=[str(int(t)) for t in segments.start])
+    top = board.top('Running', 'speed')
+    assert [leader.value for leader in top] == sorted(segments.speed)[:-4:-1]
+    for leader in top:
+        index = list(segments.start).index(float(leader.key))
+        assert leader.info == segments.message(index)
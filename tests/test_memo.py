@@ -0,0 +1,79 @@
+import pytest
+
+import homework
+import memo
+
+PACKAGES = [
+    ('SWM', [720, 1, 80, 25, 40]),
+    ('RUN', [15000, 1, 75]),
+    ('WLK', [9000, 1, 75, 180]),
+]
+
+
+@pytest.mark.parametrize('package', PACKAGES)
+def test_memoized_matches_homework(package):
+    training = memo.read_package(*package)
+    assert isinstance(training, homework.Training)
+    expected = homework.read_package(*package).show_training_info()
+    assert training.show_training_info() == expected
+    assert training.show_training_info() == expected
+
+
+def test_metrics_computed_once():
+    training = memo.read_package('RUN', [15000, 1, 75])
+    training.get_spent_calories()
+    assert training.cache_stats() == {'hits': 0, 'misses': 3}
+    training.show_training_info()
+    assert training.cache_stats() == {'hits': 3, 'misses': 3}
+
+
+@pytest.mark.parametrize('package, attribute, value', [
+    (PACKAGES[0], 'count_pool', 20),
+    (PACKAGES[0], 'length_pool', 50),
+    (PACKAGES[1], 'action', 9000),
+    (PACKAGES[1], 'duration', 2),
+    (PACKAGES[1], 'weight', 60),
+    (PACKAGES[2], 'height', 150),
+])
+def test_mutation_invalidates_cache(package, attribute, value):
+    training = memo.read_package(*package)
+    training.show_training_info()
+    setattr(training, attribute, value)
+    reference = homework.read_package(*package)
+    setattr(reference, attribute, value)
+    assert training.show_training_info() == reference.show_training_info()
+
+
+def test_memoized_class_is_reused():
+    assert memo.memoized(homework.Running) is memo.memoized(homework.Running)
+    assert memo.memoized(homework.Running).__name__ == 'Running'
+
+
+def test_registered_workouts_are_memoized(monkeypatch):
+    class Rowing(homework.Training):
+        def __init__(self, action, duration, weight, resistance):
+            super().__init__(action, duration, weight)
+            self.resistance = resistance
+
+        def get_spent_calories(self):
+            return self.get_mean_speed() * self.weight * self.resistance
+
+    monkeypatch.setitem(homework.WORKOUT_CLASSES, 'ROW', Rowing)
+    monkeypatch.setitem(homework.WORKOUT_ARITY, 'ROW', 4)
+    training = memo.read_package('ROW', [1000, 1, 70, 2])
+    assert isinstance(training, Rowing)
+    assert training.get_spent_calories() == Rowing(
+        1000, 1, 70, 2).get_spent_calories()
+    training.resistance = 3
+    assert training.get_spent_calories() == Rowing(
+        1000, 1, 70, 3).get_spent_calories()
+
+
+@pytest.mark.parametrize('package, error', [
+    (('XXX', [1, 1, 1]), homework.UnknownWorkoutError),
+    (('RUN', [15000, 1]), homework.PackageArityError),
+    (('RUN', [15000, 0, 75]), homework.PackageValueError),
+])
+def test_read_package_errors(package, error):
+    with pytest.raises(error):
+        memo.read_package(*package)
@@ -0,0 +1,53 @@
+import pytest
+
+import homework
+import parallel
+
+PACKAGES = [
+    ('SWM', [720, 1, 80, 25, 40]),
+    ('RUN', [15000, 1, 75]),
+    ('WLK', [9000, 1, 75, 180]),
+    ('RUN', [1206, 12, 6]),
+] * 50
+
+
+def expected_lines(packages):
+    return [homework.read_package(*package).show_training_info()
+            .get_message() for package in packages]
+
+
+def test_small_input_runs_in_process():
+    stats = {}
+    lines = list(parallel.iter_parallel_messages(PACKAGES, workers=2,
+                                                 stats=stats))
+    assert lines == expected_lines(PACKAGES)
+    assert len(stats) == 1
+
+
+@pytest.mark.parametrize('ordered', [True, False])
+def test_pool_mode(ordered):
+    stats = {}
+    lines = list(parallel.iter_parallel_messages(
+        PACKAGES, workers=2, chunk_size=16, ordered=ordered,
+        min_parallel=1, stats=stats))
+    if ordered:
+        assert lines == expected_lines(PACKAGES), (
+            'Упорядоченный режим должен сохранять порядок входа'
+        )
+    else:
+        assert sorted(lines) == sorted(expected_lines(PACKAGES))
+    assert sum(worker.packages for worker in stats.values()) == len(PACKAGES)
+    assert all(worker.throughput > 0 for worker in stats.values())
+    assert parallel.format_stats(stats).count('pid') == len(stats)
+
+
+def test_chunked():
+    assert list(parallel.chunked(range(5), 2)) == [[0, 1], [2, 3], [4]]
+
+
+def test_text_lines_are_parsed_in_workers():
+    lines = ['SWM,720,1,80,25,40\n', 'RUN,15000,1,75\n'] * 40
+    stats = {}
+    result = list(parallel.iter_parallel_lines(
+        lines, 'csv', workers=2, chunk_size=8, min_parallel=1, stats=stats))
+    assert result == expected_lines(PACKAGES[:2] * 40)
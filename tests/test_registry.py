@@ -0,0 +1,168 @@
+import fractions
+import io
+import json
+
+import pytest
+
+import batch
+import homework
+import stream
+
+
+class Rowing(homework.Training):
+    LEN_STEP = 2.0
+
+    def get_spent_calories(self):
+        return self.get_mean_speed() * self.weight
+
+
+@pytest.fixture
+def rowing():
+    homework.register_workout('ROW', Rowing)
+    yield Rowing
+    del homework.WORKOUT_CLASSES['ROW']
+    del homework.WORKOUT_ARITY['ROW']
+
+
+def test_builtin_codes_registered():
+    assert homework.WORKOUT_CLASSES == {'SWM': homework.Swimming,
+                                        'RUN': homework.Running,
+                                        'WLK': homework.SportsWalking}
+    assert homework.WORKOUT_ARITY == {'SWM': 5, 'RUN': 3, 'WLK': 4}
+
+
+def test_register_new_workout(rowing):
+    training = homework.read_package('ROW', [1000, 1, 70])
+    assert isinstance(training, rowing)
+    assert training.show_training_info().training_type == 'Rowing'
+
+
+def test_register_rejects_bad_classes():
+    class Bad(homework.Training):
+        def __init__(self, *args):
+            super().__init__(*args)
+
+    with pytest.raises(TypeError):
+        homework.register_workout('BAD', Bad)
+    with pytest.raises(TypeError):
+        homework.register_workout('BAD', dict)
+    assert 'BAD' not in homework.WORKOUT_CLASSES
+
+
+def test_unknown_code_is_key_error():
+    with pytest.raises(KeyError) as error:
+        homework.read_package('XXX', [1, 1, 1])
+    assert isinstance(error.value, homework.UnknownWorkoutError)
+    assert error.value.reason == 'unknown_code'
+
+
+@pytest.mark.parametrize('package', [
+    ('RUN', [15000, 1]),
+    ('RUN', [15000, 1, 75, 180]),
+    ('SWM', [720, 1, 80, 25]),
+])
+def test_bad_arity_is_type_error(package):
+    with pytest.raises(TypeError) as error:
+        homework.read_package(*package)
+    assert error.value.reason == 'bad_arity'
+
+
+def test_read_packages_routes_rejects():
+    packages = [
+        ('RUN', [15000, 1, 75]),
+        ('XXX', [1, 1, 1]),
+        ('WLK', [9000, 1, 75]),
+        ('SWM', [720, 0, 80, 25, 40]),
+        ('RUN', [15000, 1, None]),
+        ('WLK', [9000, 1, 75, 180]),
+    ]
+    rejects = []
+    trainings = list(homework.read_packages(packages, rejects))
+    assert [type(t).__name__ for t in trainings] == ['Running',
+                                                     'SportsWalking']
+    assert [(r.index, r.reason) for r in rejects] == [
+        (1, 'unknown_code'), (2, 'bad_arity'), (3, 'bad_value'),
+        (4, 'bad_value')]
+
+
+def test_read_packages_raises_without_sink():
+    with pytest.raises(homework.PackageError):
+        list(homework.read_packages([('XXX', [1, 1, 1])]))
+
+
+def test_stream_reject_writer():
+    output = io.StringIO()
+    rejected = io.StringIO()
+    count = stream.run_pipeline(
+        io.StringIO('RUN,15000,1,75\nXXX,1,1,1\nRUN,1,1\n'), output,
+        rejects=stream.RejectWriter(rejected))
+    assert count == 1
+    assert [json.loads(line)['reason']
+            for line in rejected.getvalue().splitlines()] == [
+        'unknown_code', 'bad_arity']
+
+
+def test_batch_uses_registry(rowing):
+    with pytest.raises(ValueError):
+        batch.score_columns(['ROW'], [1000], [1], [70])
+
+
+class Plank(homework.Training):
+    def __init__(self, action):
+        super().__init__(action, 1, 70)
+
+
+@pytest.mark.parametrize('value', [float('nan'), float('inf'), -1.0])
+def test_non_finite_duration_is_rejected(value):
+    with pytest.raises(homework.PackageValueError):
+        homework.read_package('RUN', [15000, value, 75])
+
+
+def test_positive_parameters_follow_constructor_names():
+    homework.register_workout('PLK', Plank)
+    try:
+        assert homework.WORKOUT_POSITIVE['PLK'] == ()
+        assert homework.read_package('PLK', [10]).duration == 1
+    finally:
+        del homework.WORKOUT_CLASSES['PLK']
+        del homework.WORKOUT_ARITY['PLK']
+        del homework.WORKOUT_POSITIVE['PLK']
+
+
+@pytest.mark.parametrize('package', [
+    ('WLK', [9000, 1, 75, 0]),
+    ('WLK', [9000, 1, 75, -180]),
+    ('SWM', [720, 1, 80, 0, 40]),
+])
+def test_class_specific_values_are_rejected(package):
+    with pytest.raises(homework.PackageValueError):
+        homework.read_package(*package)
+
+
+def test_pipeline_rejects_class_specific_values():
+    rejects = []
+    output = io.StringIO()
+    count = stream.run_pipeline(
+        io.StringIO('WLK,9000,1,75,0\nWLK,1e203,1,75,180\n'
+                    'RUN,15000,1,75\n'), output, rejects=rejects)
+    assert count == 1
+    assert [(reject.index, reject.reason) for reject in rejects] == [
+        (0, 'bad_value'), (1, 'bad_value')]
+    assert 'OverflowError' in rejects[1].detail
+
+
+def test_overflow_without_rejects_is_value_error():
+    with pytest.raises(homework.PackageValueError):
+        list(stream.iter_messages([('WLK', [1e203, 1, 75, 180])]))
+
+
+def test_real_subclasses_are_numbers():
+    class Weight(float):
+        pass
+
+    info = homework.read_package('RUN', [True, 1, Weight(75)])
+    assert info.show_training_info().training_type == 'Running'
+    with pytest.raises(homework.PackageValueError):
+        homework.read_package('RUN', [15000, 1, '75'])
+    with pytest.raises(homework.PackageValueError):
+        homework.read_package('RUN', [15000, 1, fractions.Fraction(75)])
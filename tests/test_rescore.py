@@ -0,0 +1,148 @@
+import os
+
+import pytest
+
+import cli
+import columnar
+import homework
+import rescore
+from conftest import make_packages
+
+PACKAGES = make_packages(3000, seed=7)
+NEW_RUNNING = rescore.CoefficientSet(
+    'v2', {'Running': {'COEFF_CALORIE_1': 18.5, 'LEN_STEP': 0.7}})
+
+
+def reference(packages, coefficients):
+    """Результаты read_package с подставленными константами."""
+    results = []
+    for code, data in packages:
+        cls = coefficients.training_class(homework.WORKOUT_CLASSES[code])
+        results.append(cls(*data).show_training_info())
+    return results
+
+
+def stored(history, version):
+    with history.open(version) as results:
+        return [results[index] for index in range(len(results))]
+
+
+def test_raw_file_round_trip(tmp_path):
+    path = str(tmp_path / 'raw.wkrw')
+    assert columnar.write_raw(
+        path, rescore.columns_from_packages(PACKAGES)) == len(PACKAGES)
+    with columnar.RawFile(path) as raw:
+        assert [raw[index] for index in range(len(raw))] == [
+            (code, list(map(float, data))) for code, data in PACKAGES]
+        assert raw.to_columns().codes == [code for code, _ in PACKAGES]
+    with pytest.raises(columnar.FormatError):
+        columnar.ColumnarFile(path)
+
+
+def test_versions_are_bit_exact_and_coexist(tmp_path):
+    history = rescore.ScoreHistory(str(tmp_path / 'history'))
+    first = history.ingest(PACKAGES)
+    assert first.rescored == len(PACKAGES)
+    assert stored(history, 'v1') == [
+        homework.read_package(code, data).show_training_info()
+        for code, data in PACKAGES]
+    report = history.rescore(NEW_RUNNING)
+    running = sum(code == 'RUN' for code, _ in PACKAGES)
+    assert report.codes == ['RUN'] and report.rescored == running
+    assert stored(history, 'v2') == reference(PACKAGES, NEW_RUNNING)
+    assert stored(history, 'v1') == reference(
+        PACKAGES, rescore.CoefficientSet('v1'))
+
+    swimming = rescore.CoefficientSet(
+        'v3', {'Swimming': {'COEFF_CALORIE_2': 2.5}})
+    reopened = rescore.ScoreHistory(history.directory)
+    report = reopened.rescore(swimming, 'v2')
+    assert report.codes == ['RUN', 'SWM']
+    assert stored(reopened, 'v3') == reference(PACKAGES, swimming)
+    assert rescore.ScoreHistory(history.directory).versions() == [
+        'v1', 'v2', 'v3']
+
+
+def test_small_chunks(tmp_path):
+    raw = str(tmp_path / 'raw.wkrw')
+    columnar.write_raw(raw, rescore.columns_from_packages(PACKAGES))
+    base = str(tmp_path / 'base.wkcl')
+    rescore.rescore_file(raw, base, rescore.CoefficientSet('v1'),
+                         chunk_rows=100)
+    output = str(tmp_path / 'new.wkcl')
+    rescore.rescore_file(raw, output, NEW_RUNNING, base,
+                         rescore.CoefficientSet('v1'), chunk_rows=333)
+    with columnar.ColumnarFile(output) as results:
+        assert list(map(results.__getitem__, range(len(results)))) == \
+            reference(PACKAGES, NEW_RUNNING)
+
+
+def test_coefficient_validation():
+    parsed = rescore.CoefficientSet.parse(
+        'v9', ['Running.COEFF_CALORIE_1=18', 'SportsWalking.LEN_STEP=0.7'])
+    assert parsed.overrides == {'Running': {'COEFF_CALORIE_1': 18.0},
+                                'SportsWalking': {'LEN_STEP': 0.7}}
+    assert parsed.training_class(homework.Swimming) is homework.Swimming
+    patched = parsed.training_class(homework.Running)
+    assert patched.__name__ == 'Running' and patched.COEFF_CALORIE_1 == 18
+    with pytest.raises(ValueError):
+        rescore.CoefficientSet('x', {'Cycling': {'LEN_STEP': 1}})
+    with pytest.raises(ValueError):
+        rescore.CoefficientSet('x', {'Running': {'NOPE': 1}})
+    with pytest.raises(ValueError):
+        rescore.CoefficientSet.parse('x', ['Running.LEN_STEP'])
+    for version in ('../x', 'a/b', '', '.hidden', 'v 2'):
+        with pytest.raises(ValueError):
+            rescore.CoefficientSet(version)
+
+
+def test_history_errors(tmp_path):
+    history = rescore.ScoreHistory(str(tmp_path))
+    with pytest.raises(ValueError):
+        history.rescore(NEW_RUNNING)
+    history.ingest(PACKAGES[:10])
+    with pytest.raises(FileExistsError):
+        history.ingest(PACKAGES[:10])
+    with pytest.raises(ValueError):
+        history.rescore(rescore.CoefficientSet('v1'))
+
+
+def test_cli(tmp_path, capsys):
+    source = tmp_path / 'packages.csv'
+    source.write_text(''.join(','.join(map(str, [code, *data])) + '\n'
+                              for code, data in PACKAGES[:50]),
+                      encoding='utf-8')
+    directory = str(tmp_path / 'history')
+    assert cli.main(['rescore', 'ingest', directory, str(source)]) == 0
+    assert cli.main(['rescore', 'apply', directory, '--version', 'v2',
+                     '--set', 'Running.COEFF_CALORIE_1=18.5']) == 0
+    assert cli.main(['rescore', 'list', directory]) == 0
+    output = capsys.readouterr().out.splitlines()
+    assert output[0].startswith('v1: строк 50, пересчитано 50')
+    assert output[1].startswith('v2: строк 50')
+    assert output[-1] == 'v2 {"Running": {"COEFF_CALORIE_1": 18.5}}'
+
+
+def test_ingest_in_chunks(tmp_path):
+    history = rescore.ScoreHistory(str(tmp_path))
+    assert history.ingest(PACKAGES, chunk_rows=128).rows == len(PACKAGES)
+    assert stored(history, 'v1') == reference(
+        PACKAGES, rescore.CoefficientSet('v1'))
+    assert sorted(os.listdir(tmp_path)) == [
+        'raw.wkrw', 'scores-v1.wkcl', 'versions.json']
+
+
+def test_ingest_validates_and_can_be_retried(tmp_path):
+    history = rescore.ScoreHistory(str(tmp_path))
+    bad = PACKAGES[:10] + [('RUN', [15000, 0, 75])]
+    with pytest.raises(homework.PackageValueError):
+        history.ingest(bad, chunk_rows=4)
+    assert os.listdir(tmp_path) == []
+    rejects = []
+    report = history.ingest(
+        bad + [('XXX', [1, 1, 1]), ('WLK', [9000, 1, 75])], rejects=rejects)
+    assert report.rows == 10
+    assert [reject.reason for reject in rejects] == [
+        'bad_value', 'unknown_code', 'bad_arity']
+    assert stored(history, 'v1') == reference(
+        PACKAGES[:10], rescore.CoefficientSet('v1'))
@@ -0,0 +1,99 @@
+import io
+
+import pytest
+
+import batch
+import homework
+import sensor_io
+from conftest import make_packages
+
+PACKAGES = make_packages(300)
+
+
+@pytest.fixture
+def sensor_path(tmp_path):
+    path = str(tmp_path / 'packages.bin')
+    assert sensor_io.write_records(path, PACKAGES) == len(PACKAGES)
+    return path
+
+
+def test_record_layout():
+    record = sensor_io.pack_record('RUN', [15000, 1, 75])
+    assert len(record) == 48
+    assert record[:4] == b'RUN\0'
+    with pytest.raises(sensor_io.RecordError):
+        sensor_io.pack_record('SWM', [1, 2, 3, 4, 5, 6])
+    with pytest.raises(sensor_io.RecordError):
+        sensor_io.pack_record('SWIMMING', [1, 2, 3])
+    assert sensor_io.pack_record('SWIM', [1, 2])[:4] == b'SWIM'
+
+
+def test_random_access(sensor_path):
+    with sensor_io.SensorFile(sensor_path) as packages:
+        assert len(packages) == len(PACKAGES)
+        for index in (0, 17, len(PACKAGES) - 1, -1):
+            code, fields = packages.record(index)
+            assert (code, list(fields)) == (
+                PACKAGES[index][0], [float(v) for v in PACKAGES[index][1]])
+            fields.release()
+        training = packages.training(42)
+        expected = homework.read_package(*PACKAGES[42])
+        assert training.show_training_info() == expected.show_training_info()
+        with pytest.raises(IndexError):
+            packages.record(len(PACKAGES))
+
+
+def test_columns_are_views(sensor_path):
+    with sensor_io.SensorFile(sensor_path) as packages:
+        assert isinstance(packages.duration, memoryview)
+        assert packages.duration[5] == PACKAGES[5][1][1]
+
+
+@pytest.mark.parametrize('start, stop', [(0, None), (100, 150), (299, 300)])
+def test_score_slice_matches_batch(sensor_path, start, stop):
+    with sensor_io.SensorFile(sensor_path) as packages:
+        result = packages.score(start, stop)
+    assert result == batch.score_packages(PACKAGES[start:stop])
+
+
+def test_bad_size(tmp_path):
+    path = tmp_path / 'bad.bin'
+    buffer = io.BytesIO()
+    sensor_io.write_records(buffer, PACKAGES[:2])
+    path.write_bytes(buffer.getvalue()[:-1])
+    with pytest.raises(sensor_io.RecordError):
+        sensor_io.SensorFile(str(path))
+    path.write_bytes(b'')
+    with pytest.raises(sensor_io.RecordError):
+        sensor_io.SensorFile(str(path))
+
+
+def test_close_with_live_records(sensor_path):
+    with sensor_io.SensorFile(sensor_path) as packages:
+        records = [(code, fields)
+                   for code, fields in packages.iter_records(0, 5)]
+        for code, fields in packages.iter_records():
+            assert code in homework.WORKOUT_CLASSES
+    assert [list(fields) for _, fields in records] == [
+        [float(v) for v in data] for _, data in PACKAGES[:5]]
+    packages.close()
+
+
+def test_score_unknown_code(tmp_path):
+    path = str(tmp_path / 'unknown.bin')
+    sensor_io.write_records(path, [('RUN', [15000, 1, 75]),
+                                   ('XXX', [1, 1, 1])])
+    with sensor_io.SensorFile(path) as packages:
+        with pytest.raises(homework.UnknownWorkoutError):
+            packages.score()
+
+
+def test_corrupt_field_count(tmp_path):
+    record = bytearray(sensor_io.pack_record('RUN', [15000, 1, 75]))
+    record[4] = sensor_io.MAX_FIELDS + 1
+    path = tmp_path / 'corrupt.bin'
+    path.write_bytes(bytes(record) + sensor_io.pack_record('RUN', [1, 1, 1]))
+    with sensor_io.SensorFile(str(path)) as packages:
+        with pytest.raises(sensor_io.RecordError):
+            packages.record(0)
+        assert list(packages.record(1)[1]) == [1.0, 1.0, 1.0]
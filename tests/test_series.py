@@ -0,0 +1,103 @@
+import random
+from array import array
+
+import pytest
+
+import homework
+import series
+
+
+def make_series(seconds, rate, seed=0):
+    rnd = random.Random(seed)
+    timestamps, counts = array('d'), array('d')
+    total = 0
+    for second in range(seconds):
+        timestamps.append(1700000000 + second)
+        counts.append(total)
+        total += rnd.randint(0, rate)
+    return timestamps, counts
+
+
+def package(code, action, seconds, extra):
+    return homework.read_package(
+        code, [action, seconds / series.SECONDS_IN_HOUR, 70, *extra])
+
+
+@pytest.mark.parametrize('code, options, extra', [
+    ('RUN', {}, []),
+    ('WLK', {'height': 175}, [175]),
+])
+def test_segments_match_read_package(code, options, extra):
+    timestamps, counts = make_series(600, 4)
+    result = series.score_series(code, timestamps, counts, 70, **options)
+    assert len(result) == 599
+    for index in (0, 17, 598):
+        action = counts[index + 1] - counts[index]
+        expected = package(code, action, 1, extra).show_training_info()
+        assert result.message(index) == expected
+    expected_total = package(code, counts[-1] - counts[0], 599,
+                             extra).show_training_info()
+    assert result.total == expected_total
+
+
+def test_swimming_uses_laps():
+    timestamps, strokes = make_series(120, 1)
+    laps = array('d', [second // 30 for second in range(120)])
+    result = series.score_series('SWM', timestamps, strokes, 70,
+                                 length_pool=25, laps=laps,
+                                 segment_seconds=30)
+    assert list(result.start) == [timestamps[i] for i in (0, 30, 60, 90)]
+    action = strokes[30] - strokes[0]
+    assert result.message(0) == package(
+        'SWM', action, 30, [25, 1]).show_training_info()
+    assert result.message(3) == package(
+        'SWM', strokes[119] - strokes[90], 29, [25, 0]).show_training_info()
+
+
+def test_windowed_segments_cover_session():
+    timestamps, counts = make_series(3600, 3)
+    result = series.score_series('RUN', timestamps, counts, 70,
+                                 segment_seconds=60)
+    assert len(result) == 60
+    assert sum(result.duration) == pytest.approx(result.total.duration)
+    assert sum(result.distance) == pytest.approx(result.total.distance)
+
+
+def test_segment_bounds_skip_empty_windows():
+    timestamps = array('d', [0, 1, 59, 60, 61, 300, 301, 422])
+    assert list(series.segment_bounds(timestamps, 60)) == [0, 3, 5, 7]
+    assert list(series.segment_bounds(timestamps, 1000)) == [0, 7]
+    assert list(series.segment_bounds(timestamps)) == list(range(8))
+
+
+def test_multi_hour_session_in_chunks():
+    timestamps, counts = make_series(4 * 3600, 3)
+    whole = series.score_series('RUN', timestamps, counts, 70)
+    chunked = series.score_series('RUN', timestamps, counts, 70,
+                                  chunk_size=1000)
+    assert isinstance(whole.calories, array)
+    assert whole == chunked
+
+
+@pytest.mark.parametrize('timestamps, counts, options, error', [
+    ([0], [0], {}, 'двух'),
+    ([0, 1], [0], {}, 'Длины'),
+    ([0, 1, 1], [0, 1, 2], {}, 'возрастать'),
+    ([0, 1, 2], [0, 5, 4], {}, 'уменьшается'),
+    ([0, 1], [0, 1], {'segment_seconds': 0}, 'положительным'),
+])
+def test_invalid_series(timestamps, counts, options, error):
+    with pytest.raises(ValueError, match=error):
+        series.score_series('RUN', timestamps, counts, 70, **options)
+
+
+def test_unknown_code():
+    with pytest.raises(homework.UnknownWorkoutError):
+        series.score_series('XXX', [0, 1], [0, 1], 70)
+
+
+def test_missing_parameters():
+    with pytest.raises(ValueError, match='height'):
+        series.score_series('WLK', [0, 1], [0, 1], 70)
+    with pytest.raises(ValueError, match='count_pool'):
+        series.score_series('SWM', [0, 1], [0, 1], 70, length_pool=25)
@@ -0,0 +1,170 @@
+import asyncio
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import cache
+import homework
+import server
+
+PACKAGES = [
+    ('SWM', [720, 1, 80, 25, 40]),
+    ('RUN', [15000, 1, 75]),
+    ('WLK', [9000, 1, 75, 180]),
+] * 20
+
+
+def expected_messages(packages):
+    return [homework.read_package(*package).show_training_info()
+            .get_message() for package in packages]
+
+
+async def score_over_tcp(packages, **options):
+    scoring = server.ScoringServer(**options)
+    tcp = await scoring.start_tcp('127.0.0.1', 0)
+    port = tcp.sockets[0].getsockname()[1]
+    async with tcp:
+        client = await server.ScoringClient.connect_tcp('127.0.0.1', port)
+        try:
+            return await client.score_many(packages)
+        finally:
+            await client.close()
+
+
+@pytest.mark.parametrize('max_in_flight, threads', [
+    (server.DEFAULT_MAX_IN_FLIGHT, 0),
+    (2, 0),
+    (server.DEFAULT_MAX_IN_FLIGHT, 2),
+])
+def test_pipelined_tcp(max_in_flight, threads):
+    executor = ThreadPoolExecutor(threads) if threads else None
+    try:
+        responses = asyncio.run(score_over_tcp(
+            PACKAGES, max_in_flight=max_in_flight, executor=executor))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    assert [response['message'] for response in responses] == (
+        expected_messages(PACKAGES)), 'Ответы должны идти в порядке запросов'
+    assert [response['id'] for response in responses] == list(
+        range(1, len(PACKAGES) + 1))
+
+
+def test_shared_cache_serves_repeated_packages():
+    results = cache.PackageCache()
+    responses = asyncio.run(score_over_tcp(PACKAGES, cache=results))
+    assert [response['message'] for response in responses] == (
+        expected_messages(PACKAGES))
+    assert (results.stats.misses, results.stats.hits) == (
+        3, len(PACKAGES) - 3)
+
+
+def test_error_response_keeps_connection():
+    responses = asyncio.run(score_over_tcp(
+        [('XXX', [1, 1, 1]), ('RUN', [15000, 1]), ('RUN', [15000, 1, 75])]))
+    assert responses[0]['reason'] == 'unknown_code'
+    assert responses[1]['reason'] == 'bad_arity'
+    assert responses[2]['training_type'] == 'Running'
+    assert responses[2]['calories'] == homework.Running(
+        15000, 1, 75).get_spent_calories()
+
+
+def test_disconnect_mid_pipeline_releases_permits():
+    frame = b'{"workout_type": "RUN", "data": [15000, 1, 75]}\n'
+
+    async def run():
+        scoring = server.ScoringServer(max_in_flight=4)
+        tcp = await scoring.start_tcp('127.0.0.1', 0)
+        port = tcp.sockets[0].getsockname()[1]
+        async with tcp:
+            for _ in range(5):
+                reader, writer = await asyncio.open_connection(
+                    '127.0.0.1', port)
+                writer.write(frame * 5000)
+                await writer.drain()
+                await reader.readline()
+                writer.transport.abort()
+            client = await server.ScoringClient.connect_tcp(
+                '127.0.0.1', port)
+            try:
+                return await asyncio.wait_for(
+                    client.score_many(PACKAGES), timeout=5)
+            finally:
+                await client.close()
+
+    responses = asyncio.run(run())
+    assert [response['message'] for response in responses] == (
+        expected_messages(PACKAGES))
+
+
+def test_slow_reader_bounds_finished_responses(monkeypatch):
+    frame = b'{"workout_type": "RUN", "data": [15000, 1, 75]}\n'
+    scored = []
+
+    def large_response(request, cache=None):
+        scored.append(request)
+        return {'id': None, 'padding': 'x' * 60000}
+
+    monkeypatch.setattr(server, 'score_frame', large_response)
+
+    async def run():
+        scoring = server.ScoringServer(max_in_flight=4)
+        tcp = await scoring.start_tcp('127.0.0.1', 0)
+        port = tcp.sockets[0].getsockname()[1]
+        async with tcp:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            try:
+                writer.write(frame * 2000)
+                seen = -1
+                while seen != len(scored):
+                    seen = len(scored)
+                    await asyncio.sleep(0.2)
+                return len(scored), await reader.readline()
+            finally:
+                writer.transport.abort()
+
+    stalled, first = asyncio.run(run())
+    assert json.loads(first)['padding']
+    assert stalled < 1000, (
+        'Сервер не должен считать кадры, пока клиент не читает ответы')
+
+
+def test_oversized_frame_gets_error_response():
+    async def run():
+        tcp = await server.ScoringServer().start_tcp('127.0.0.1', 0)
+        port = tcp.sockets[0].getsockname()[1]
+        async with tcp:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(b'x' * (2 * server.FRAME_LIMIT) + b'\n'
+                         + b'{"id": 7, "workout_type": "RUN",'
+                         b' "data": [15000, 1, 75]}\n')
+            await writer.drain()
+            lines = [await reader.readline() for _ in range(2)]
+            writer.close()
+            await writer.wait_closed()
+        return [json.loads(line) for line in lines]
+
+    oversized, response = asyncio.run(run())
+    assert oversized['id'] is None and 'error' in oversized
+    assert response['id'] == 7
+    assert response['message'] == expected_messages([PACKAGES[1]])[0]
+
+
+@pytest.mark.skipif(not hasattr(asyncio, 'start_unix_server'),
+                    reason='Unix-сокеты недоступны')
+def test_unix_socket():
+    async def run(path):
+        tcp = await server.ScoringServer().start_unix(path)
+        async with tcp:
+            client = await server.ScoringClient.connect_unix(path)
+            try:
+                return await client.score('RUN', [15000, 1, 75])
+            finally:
+                await client.close()
+
+    with tempfile.TemporaryDirectory() as directory:
+        response = asyncio.run(run(os.path.join(directory, 'scoring.sock')))
+    assert response['message'] == expected_messages([PACKAGES[1]])[0]
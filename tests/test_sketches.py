@@ -0,0 +1,125 @@
+import json
+import math
+import random
+
+import pytest
+
+import batch
+import homework
+import sketches
+import stream
+from conftest import make_packages
+
+
+def exact(values, q):
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+def assert_close(sketch, values, qs, accuracy):
+    for q in qs:
+        expected = exact(values, q)
+        assert abs(sketch.quantile(q) - expected) <= (
+            accuracy * abs(expected) + 1e-12), q
+
+
+@pytest.mark.parametrize('accuracy', [0.01, 0.05])
+def test_quantiles_within_relative_error(accuracy):
+    rnd = random.Random(1)
+    values = [rnd.lognormvariate(2, 1.5) for _ in range(20000)]
+    values += [-rnd.expovariate(0.01) for _ in range(5000)] + [0.0] * 100
+    sketch = sketches.QuantileSketch(accuracy)
+    for value in values:
+        sketch.add(value)
+    qs = [0, 0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 0.999, 1]
+    assert_close(sketch, values, qs, accuracy)
+    assert sketch.quantile(0) == min(values)
+    assert sketch.quantile(1) == max(values)
+    assert sketch.count == len(values)
+    assert sketch.nbytes < 16 * 1024
+
+
+def test_merge_equals_single_sketch():
+    rnd = random.Random(2)
+    values = [rnd.uniform(-50, 500) for _ in range(9000)]
+    whole = sketches.QuantileSketch()
+    for value in values:
+        whole.add(value)
+    merged = sketches.QuantileSketch()
+    for shard in (values[:1000], values[1000:6000], values[6000:]):
+        part = sketches.QuantileSketch()
+        for value in shard:
+            part.add(value)
+        merged.merge(part)
+    assert merged.snapshot() == whole.snapshot()
+    with pytest.raises(ValueError):
+        merged.merge(sketches.QuantileSketch(0.02))
+
+
+def test_collapsing_keeps_upper_quantiles():
+    values = [10.0 ** (exponent / 100) for exponent in range(-600, 600)]
+    sketch = sketches.QuantileSketch(0.01, max_bins=200)
+    for value in values:
+        sketch.add(value)
+    assert len(sketch._positive.counts) == 200
+    assert_close(sketch, values, [0.9, 0.95, 0.99], 0.01)
+    assert sketch.quantile(0.1) > exact(values, 0.1)
+
+
+def test_rejects_bad_input():
+    sketch = sketches.QuantileSketch()
+    assert math.isnan(sketch.quantile(0.5))
+    with pytest.raises(ValueError):
+        sketch.add(math.nan)
+    with pytest.raises(ValueError):
+        sketch.quantile(1.5)
+    with pytest.raises(ValueError):
+        sketches.QuantileSketch(0)
+
+
+def test_distribution_sketches_on_scoring_results():
+    packages = make_packages(6000, seed=3)
+    infos = [homework.read_package(code, data).show_training_info()
+             for code, data in packages]
+    by_message = sketches.DistributionSketches()
+    for info in infos:
+        by_message.add(info)
+    by_columns = sketches.DistributionSketches()
+    by_columns.add_columns(batch.score_packages(packages))
+    assert by_columns.snapshot() == by_message.snapshot()
+    state = json.loads(json.dumps(by_message.snapshot()))
+    restored = sketches.DistributionSketches.from_snapshot(state)
+    assert restored.summary() == by_message.summary()
+    for kind in restored.training_types():
+        for metric in sketches.METRICS:
+            values = [getattr(info, metric) for info in infos
+                      if info.training_type == kind]
+            sketch = restored.sketch(kind, metric)
+            assert_close(sketch, values, sketches.QUANTILES, 0.01)
+            assert sketch.nbytes < 8 * 1024
+
+
+def test_pipeline_sink_and_cli(tmp_path, capsys):
+    lines = [','.join(map(str, [code, *data])) + '\n'
+             for code, data in make_packages(600, seed=4)]
+    paths = []
+    for index, shard in enumerate((lines[:200], lines[200:])):
+        path = tmp_path / f'shard{index}.csv'
+        path.write_text(''.join(shard), encoding='utf-8')
+        paths.append(str(tmp_path / f'shard{index}.json'))
+        stream.main([str(path), '--quantiles', paths[-1]])
+    capsys.readouterr()
+    merged = str(tmp_path / 'merged.json')
+    assert sketches.main([*paths, '--output', merged]) == 0
+    output = capsys.readouterr().out
+    assert 'Running speed: p50=' in output
+    whole = sketches.DistributionSketches()
+    for info in stream.read_records(lines):
+        whole.add(homework.read_package(*info).show_training_info())
+    assert sketches.DistributionSketches.load(merged).snapshot() == \
+        whole.snapshot()
+
+
+def test_sink_is_rejected_with_pool():
+    with pytest.raises(ValueError):
+        stream.run_pipeline([], None, sink=print, workers=2)
@@ -0,0 +1,119 @@
+import random
+
+import pytest
+
+import homework
+import store
+from conftest import make_packages
+
+DAY = 86400
+START = 1700000000
+
+
+def make_workouts(count, users=5, seed=0):
+    rnd = random.Random(seed)
+    workouts = []
+    for package in make_packages(count, seed):
+        workouts.append((f'user{rnd.randrange(users)}',
+                         START + rnd.uniform(0, 30 * DAY),
+                         homework.read_package(*package)
+                         .show_training_info()))
+    return workouts
+
+
+def naive_range(workouts, user, start, end, training_type=None):
+    return sorted(((timestamp, info) for who, timestamp, info in workouts
+                   if who == user and start <= timestamp < end
+                   and training_type in (None, info.training_type)),
+                  key=lambda item: item[0])
+
+
+@pytest.mark.parametrize('memory_limit', [10, 1000])
+def test_range_matches_scan(tmp_path, memory_limit):
+    workouts = make_workouts(400)
+    with store.WorkoutStore(str(tmp_path), memory_limit) as workout_store:
+        for workout in workouts:
+            workout_store.add(*workout)
+        assert len(workout_store) == len(workouts)
+        for user, training_type in [('user0', None), ('user1', 'Swimming'),
+                                    ('user4', 'Running'), ('nobody', None)]:
+            start, end = START + 3 * DAY, START + 17 * DAY
+            assert workout_store.range(user, start, end, training_type) == (
+                naive_range(workouts, user, start, end, training_type))
+
+
+def test_spills_to_disk_and_reopens(tmp_path):
+    workouts = make_workouts(100)
+    with store.WorkoutStore(str(tmp_path), memory_limit=30) as workout_store:
+        for workout in workouts:
+            workout_store.add(*workout)
+    assert len(list(tmp_path.glob('run-*.wks'))) >= 3
+    with store.WorkoutStore(str(tmp_path)) as reopened:
+        assert reopened.range('user2', 0, float('inf')) == naive_range(
+            workouts, 'user2', 0, float('inf'))
+
+
+def test_invalid_limit(tmp_path):
+    with pytest.raises(ValueError):
+        store.WorkoutStore(str(tmp_path), memory_limit=0)
+
+
+def test_runs_are_compacted(tmp_path):
+    workouts = make_workouts(300)
+    with store.WorkoutStore(str(tmp_path), memory_limit=20,
+                            max_runs=3) as workout_store:
+        for workout in workouts:
+            workout_store.add(*workout)
+            assert len(list(tmp_path.glob('run-*.wks'))) <= 3
+        assert len(workout_store) == len(workouts)
+    assert not list(tmp_path.glob('*.tmp'))
+    with store.WorkoutStore(str(tmp_path)) as reopened:
+        for user in ('user0', 'user3'):
+            assert reopened.range(user, 0, float('inf')) == naive_range(
+                workouts, user, 0, float('inf'))
+
+
+def test_interrupted_compaction_is_finished_on_open(tmp_path):
+    workouts = make_workouts(100)
+    with store.WorkoutStore(str(tmp_path), memory_limit=30) as workout_store:
+        for workout in workouts:
+            workout_store.add(*workout)
+    paths = sorted(tmp_path.glob('run-*.wks'))
+    runs = [store.RunFile(str(path)) for path in paths]
+    users = sorted({user for run in runs for user in run.users})
+    entries = {user: sorted((entry for run in runs
+                             for entry in run.range(user, 0, float('inf'))),
+                            key=lambda item: item[0]) for user in users}
+    for run in runs:
+        run.close()
+    store.RunFile.write(str(paths[-1]), entries.items(),
+                        [path.name for path in paths[:-1]]).close()
+    with store.WorkoutStore(str(tmp_path)) as reopened:
+        assert len(reopened) == len(workouts)
+        assert reopened.range('user1', 0, float('inf')) == naive_range(
+            workouts, 'user1', 0, float('inf'))
+    assert sorted(tmp_path.glob('run-*.wks')) == [paths[-1]]
+
+
+def test_type_limit_and_failed_write(tmp_path, monkeypatch):
+    monkeypatch.setattr(store, 'MAX_TYPES', 2)
+    workout_store = store.WorkoutStore(str(tmp_path), memory_limit=10)
+    for timestamp, code in enumerate(['Running', 'Swimming', 'Rowing']):
+        workout_store.add('u', timestamp,
+                          homework.InfoMessage(code, 1, 1, 1, 1))
+    with pytest.raises(ValueError):
+        workout_store.flush()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_reads_version_1_files(tmp_path, monkeypatch):
+    workouts = make_workouts(50)
+    with monkeypatch.context() as patch:
+        patch.setattr(store, 'VERSION', 1)
+        patch.setattr(store, 'RECORD', store.RECORDS[1])
+        with store.WorkoutStore(str(tmp_path)) as workout_store:
+            for workout in workouts:
+                workout_store.add(*workout)
+    with store.WorkoutStore(str(tmp_path)) as reopened:
+        assert reopened.range('user0', 0, float('inf'), 'Running') == (
+            naive_range(workouts, 'user0', 0, float('inf'), 'Running'))
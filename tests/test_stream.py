@@ -0,0 +1,91 @@
+import io
+import itertools
+import threading
+import time
+
+import pytest
+
+import stream
+
+EXPECTED = [
+    'Тип тренировки: Swimming; '
+    'Длительность: 1.000 ч.; '
+    'Дистанция: 0.994 км; '
+    'Ср. скорость: 1.000 км/ч; '
+    'Потрачено ккал: 336.000.',
+    'Тип тренировки: Running; '
+    'Длительность: 12.000 ч.; '
+    'Дистанция: 0.784 км; '
+    'Ср. скорость: 0.065 км/ч; '
+    'Потрачено ккал: -81.320.',
+    'Тип тренировки: SportsWalking; '
+    'Длительность: 1.000 ч.; '
+    'Дистанция: 5.850 км; '
+    'Ср. скорость: 5.850 км/ч; '
+    'Потрачено ккал: 157.500.',
+]
+
+
+@pytest.mark.parametrize('fmt, text', [
+    ('csv', 'SWM,720,1,80,25,40\nRUN,1206,12,6\n\nWLK,9000,1,75,180\n'),
+    ('jsonl', '["SWM", [720, 1, 80, 25, 40]]\n'
+              '{"workout_type": "RUN", "data": [1206, 12, 6]}\n'
+              '\n'
+              '["WLK", [9000, 1, 75, 180]]\n'),
+])
+@pytest.mark.parametrize('prefetch', [0, 2])
+def test_run_pipeline(fmt, text, prefetch):
+    output = io.StringIO()
+    count = stream.run_pipeline(io.StringIO(text), output, fmt,
+                                buffer_size=2, prefetch=prefetch)
+    assert count == 3
+    assert output.getvalue().splitlines() == EXPECTED
+
+
+def test_read_records_unknown_format():
+    with pytest.raises(ValueError):
+        stream.read_records([], 'xml')
+
+
+def test_pipeline_is_lazy():
+    lines = itertools.cycle(['RUN,15000,1,75\n'])
+    messages = stream.iter_messages(stream.read_records(lines, 'csv'))
+    assert len(list(itertools.islice(messages, 5))) == 5
+
+
+def test_bounded_prefetch_limits_read_ahead():
+    produced = []
+
+    def source():
+        for value in range(100):
+            produced.append(value)
+            yield value
+
+    items = stream.bounded_prefetch(source(), 4)
+    assert next(items) == 0
+    time.sleep(0.3)
+    assert len(produced) <= 6, 'Производитель не должен убегать вперёд'
+    assert list(items) == list(range(1, 100))
+
+
+def test_bounded_prefetch_propagates_errors():
+    def source():
+        yield 1
+        raise RuntimeError('broken input')
+
+    items = stream.bounded_prefetch(source(), 2)
+    assert next(items) == 1
+    with pytest.raises(RuntimeError):
+        next(items)
+
+
+def test_bounded_prefetch_producer_exits_after_close():
+    before = threading.active_count()
+    items = stream.bounded_prefetch(iter(range(2)), 1)
+    assert next(items) == 0
+    time.sleep(0.2)
+    items.close()
+    deadline = time.monotonic() + 2
+    while threading.active_count() > before and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert threading.active_count() == before
@@ -0,0 +1,176 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import IO, Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from cache import PackageCache
+from compiled import iter_scored
+from homework import Reject
+
+Package = Tuple[str, Sequence[float]]
+
+
+def score_batch(request: Dict[str, Any],
+                cache: Optional[PackageCache] = None) -> Dict[str, Any]:
+    """Рассчитать одну пачку запроса постоянного процесса.
+
+    Параметры
+    ---------
+    request: Dict[str, Any]
+        {"id": ..., "packages": [[код, [параметры]], ...]}
+    cache: Optional[PackageCache]
+        кэш результатов между пачками; None — считать каждый пакет
+
+    Возвращаемое значение
+    ---------------------
+    {"id": ..., "messages": [...], "rejects": [...]}, где rejects —
+    отбракованные пакеты {"index", "reason", "detail"}.
+    """
+
+    rejects: List[Reject] = []
+    packages = [(code, data) for code, data in request['packages']]
+    scored = (iter_scored(packages, rejects) if cache is None
+              else cache.iter_scored(packages, rejects))
+    messages = [info.get_message() for info in scored]
+    return {'id': request.get('id'),
+            'messages': messages,
+            'rejects': [{'index': reject.index, 'reason': reject.reason,
+                         'detail': reject.detail} for reject in rejects]}
+
+
+def serve_batches(source: Iterable[str],
+                  output: IO[str],
+                  cache: Optional[PackageCache] = None) -> int:
+    """Отвечать на пачки из source, пока вход не закончится.
+
+    Одна строка входа — один JSON-запрос score_batch, одна строка
+    выхода — ответ на него; после каждого ответа выход сбрасывается,
+    чтобы вызывающий процесс мог читать ответы по мере готовности.
+    Некорректный запрос или любая ошибка при расчёте пачки дают
+    ответ {"id": ..., "error": "..."}, после которого процесс
+    продолжает отвечать на следующие пачки. Если передан cache,
+    повторные пакеты всех пачек берутся из него.
+
+    Возвращаемое значение
+    ---------------------
+    Количество обработанных пачек: int
+    """
+
+    count = 0
+    for line in source:
+        if not line.strip():
+            continue
+        request = None
+        try:
+            request = json.loads(line)
+            response = score_batch(request, cache)
+        except Exception as exc:
+            request_id = (request.get('id') if isinstance(request, dict)
+                          else None)
+            response = {'id': request_id,
+                        'error': f'{type(exc).__name__}: {exc}'}
+        output.write(json.dumps(response, ensure_ascii=False) + '\n')
+        output.flush()
+        count += 1
+    return count
+
+
+class WorkerClient:
+    """
+    Класс. Постоянный процесс расчёта, управляемый через канал.
+
+    Запускает `cli.py worker` один раз; каждый вызов score
+    передаёт пачку строкой JSON в stdin процесса и читает ответ
+    из его stdout. Интерпретатор и модули загружаются один раз.
+
+    Методы
+    ------
+    score(self, packages) -> Tuple[List[str], List[Dict[str, Any]]]:
+        Сообщения и отбракованные пакеты пачки.
+    close(self) -> int:
+        Закрыть канал и дождаться завершения процесса.
+    """
+
+    def __init__(self, command: Optional[Sequence[str]] = None) -> None:
+        if command is None:
+            cli = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                               'cli.py')
+            command = [sys.executable, cli, 'worker']
+        self._process = subprocess.Popen(
+            command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            encoding='utf-8', bufsize=1)
+        self._next_id = 0
+
+    def score(self, packages: Iterable[Package]
+              ) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """Рассчитать пачку в постоянном процессе.
+
+        Исключения
+        ----------
+        RuntimeError
+            процесс завершился или вернул ошибку запроса
+        """
+
+        self._next_id += 1
+        request = {'id': self._next_id,
+                   'packages': [[code, list(data)]
+                                for code, data in packages]}
+        self._process.stdin.write(json.dumps(request) + '\n')
+        self._process.stdin.flush()
+        line = self._process.stdout.readline()
+        if not line:
+            raise RuntimeError('Процесс расчёта завершился')
+        response = json.loads(line)
+        if 'error' in response:
+            raise RuntimeError(response['error'])
+        return response['messages'], response['rejects']
+
+    def close(self) -> int:
+        """Закрыть stdin процесса и вернуть его код завершения."""
+        self._process.stdin.close()
+        code = self._process.wait()
+        self._process.stdout.close()
+        return code
+
+    def __enter__(self) -> 'WorkerClient':
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Точка входа: `python cli.py worker [--input PATH] [--output PATH]`.
+
+    По умолчанию пачки читаются из stdin и ответы пишутся в stdout;
+    --input и --output могут указывать на именованные каналы.
+    """
+    parser = argparse.ArgumentParser(
+        prog='cli.py worker',
+        description='Постоянный процесс расчёта пачек пакетов.')
+    parser.add_argument('--input', default=None,
+                        help='файл или именованный канал запросов')
+    parser.add_argument('--output', default=None,
+                        help='файл или именованный канал ответов')
+    parser.add_argument('--cache-size', type=int, default=0,
+                        help='записей в кэше результатов; 0 — без кэша')
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    cache = PackageCache(args.cache_size) if args.cache_size > 0 else None
+    source = (open(args.input, encoding='utf-8')
+              if args.input else sys.stdin)
+    output = (open(args.output, 'w', encoding='utf-8')
+              if args.output else sys.stdout)
+    try:
+        serve_batches(source, output, cache)
+    finally:
+        if args.input:
+            source.close()
+        if args.output:
+            output.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())